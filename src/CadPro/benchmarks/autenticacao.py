@@ -0,0 +1,83 @@
+"""Custo da autenticação por token por requisição, com e sem cache.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.autenticacao --requisicoes 2000
+
+Mede ``GET /api/auth/perfil/`` pelo URLconf real com a
+``TokenAuthentication`` do DRF e com ``CacheTokenAuthentication``,
+reportando latência e queries por requisição.
+"""
+import argparse
+import json
+
+from .comum import configurar_django, cronometrar, resumo
+
+CLASSES = {
+    'TokenAuthentication': 'rest_framework.authentication.TokenAuthentication',
+    'CacheTokenAuthentication': 'core.authentication.CacheTokenAuthentication',
+}
+
+
+def medir(classe, cliente, requisicoes):
+    from unittest import mock
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils.module_loading import import_string
+
+    from core import authentication, views
+
+    # As classes de autenticação são resolvidas quando a view é criada,
+    # então trocamos direto na classe da view
+    with mock.patch.object(
+        views.perfil_usuario.cls, 'authentication_classes',
+        [import_string(classe)]
+    ):
+        authentication.cache_local.clear()
+        cliente.get('/api/auth/perfil/')  # aquece o cache
+
+        with CaptureQueriesContext(connection) as queries:
+            amostras = cronometrar(
+                lambda: cliente.get('/api/auth/perfil/'), requisicoes
+            )
+    return {
+        **resumo(amostras),
+        'queries_por_requisicao': len(queries) / requisicoes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.core.management import call_command
+    from django.test import Client
+    from rest_framework.authtoken.models import Token
+
+    from core.models import Usuario
+
+    call_command('migrate', verbosity=0)
+    usuario = Usuario.objects.create(username='bench', password='!')
+    token = Token.objects.create(user=usuario)
+    cliente = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    resultado = {
+        nome: medir(classe, cliente, args.requisicoes)
+        for nome, classe in CLASSES.items()
+    }
+    for nome, medida in resultado.items():
+        print(f'{nome:>26}: p50={medida["p50_ms"]}ms '
+              f'p95={medida["p95_ms"]}ms '
+              f'queries/req={medida["queries_por_requisicao"]}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""Teste de carga pelo URLconf real sobre a massa de ``semear_dados``.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.carga --escala 5 --concorrencia 8 \\
+        --saida benchmarks/baseline.json
+    python -m benchmarks.carga --comparar benchmarks/baseline.json
+
+Cada cenário (login, perfil, criar/listar/aprovar propostas e os feeds
+públicos) roda ``--requisicoes`` vezes em ``--concorrencia`` threads, cada
+uma com seu ``Client`` e sua conexão. O resultado traz vazão, p50/p95/p99
+e queries por requisição (contadas pelo ``MetricasMiddleware``) e vai para
+um JSON que pode servir de baseline para as próximas execuções.
+
+A aprovação só enfileira (202); depois do cenário as tarefas que ele
+gerou (aprovação e e-mails, ``core.tarefas``) são executadas como o
+``processar_tarefas`` faria, e o tempo entra em ``tarefas``.
+"""
+import argparse
+import itertools
+import json
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .comum import configurar_django, resumo
+
+
+class Contexto:
+    """Usuários, tokens e ids compartilhados pelos cenários."""
+
+    def __init__(self, senha):
+        from rest_framework.authtoken.models import Token
+
+        from core import semeadura
+        from core.models import Proposta, Usuario
+
+        self.senha = senha
+        usuarios = Usuario.objects.filter(
+            username__startswith=f'{semeadura.PREFIXO}-'
+        )
+        self.logins = itertools.cycle(list(usuarios.filter(
+            tipo_usuario='comunidade'
+        ).values_list('username', flat=True)))
+        self.token_comunidade = Token.objects.get_or_create(
+            user=usuarios.filter(tipo_usuario='comunidade').first()
+        )[0].key
+        self.token_coordenador = Token.objects.get_or_create(
+            user=usuarios.filter(tipo_usuario='coordenador').first()
+        )[0].key
+        self.pendentes = iter(list(Proposta.objects.filter(
+            status__in=('enviada', 'em_analise')
+        ).order_by('pk').values_list('pk', flat=True)))
+        self.lock = threading.Lock()
+
+    def proximo(self, iterador):
+        with self.lock:
+            return next(iterador, None)
+
+
+def login(cliente, contexto):
+    return cliente.post('/api/auth/login/', {
+        'username': contexto.proximo(contexto.logins),
+        'password': contexto.senha,
+    }), 200
+
+
+def perfil(cliente, contexto):
+    return cliente.get(
+        '/api/auth/perfil/',
+        HTTP_AUTHORIZATION=f'Token {contexto.token_comunidade}'
+    ), 200
+
+
+def criar_proposta(cliente, contexto):
+    return cliente.post('/api/propostas/', {
+        'titulo': 'Proposta de carga',
+        'descricao': 'Descrição ' * 20,
+        'problema_resolver': 'Problema',
+        'publico_alvo': 'Público',
+        'relevancia_social': 'Relevância',
+    }, HTTP_AUTHORIZATION=f'Token {contexto.token_comunidade}'), 201
+
+
+def listar_propostas(cliente, contexto):
+    return cliente.get(
+        '/api/propostas/',
+        HTTP_AUTHORIZATION=f'Token {contexto.token_coordenador}'
+    ), 200
+
+
+def aprovar_proposta(cliente, contexto):
+    pk = contexto.proximo(contexto.pendentes)
+    if pk is None:
+        raise RuntimeError(
+            'Propostas pendentes esgotadas; aumente --escala.'
+        )
+    return cliente.post(
+        f'/api/propostas/{pk}/aprovar/',
+        HTTP_AUTHORIZATION=f'Token {contexto.token_coordenador}'
+    ), 202
+
+
+def publico_projetos(cliente, contexto):
+    return cliente.get('/api/publico/projetos/'), 200
+
+
+def publico_relatorios(cliente, contexto):
+    return cliente.get('/api/publico/relatorios/'), 200
+
+
+def publico_busca(cliente, contexto):
+    return cliente.get('/api/publico/relatorios/', {'q': 'horta'}), 200
+
+
+CENARIOS = {
+    'auth_login': login,
+    'auth_perfil': perfil,
+    'propostas_criar': criar_proposta,
+    'propostas_listar': listar_propostas,
+    'propostas_aprovar': aprovar_proposta,
+    'publico_projetos': publico_projetos,
+    'publico_relatorios': publico_relatorios,
+    'publico_busca': publico_busca,
+}
+
+
+def executar(cenario, contexto, requisicoes, concorrencia):
+    from django.db import connections
+    from django.test import Client
+
+    from core import metricas
+
+    restantes = itertools.count()
+    local = threading.local()
+
+    def trabalhador():
+        if not hasattr(local, 'cliente'):
+            # Erros 500 contam como erro em vez de derrubar a thread
+            local.cliente = Client(raise_request_exception=False)
+        amostras, erros = [], 0
+        while next(restantes) < requisicoes:
+            inicio = time.perf_counter()
+            response, esperado = cenario(local.cliente, contexto)
+            amostras.append((time.perf_counter() - inicio) * 1000)
+            erros += response.status_code != esperado
+        connections.close_all()
+        return amostras, erros
+
+    metricas.registro.limpar()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        parciais = [
+            executor.submit(trabalhador) for _ in range(concorrencia)
+        ]
+        parciais = [futuro.result() for futuro in parciais]
+    duracao = time.perf_counter() - inicio
+
+    amostras = [tempo for tempos, _ in parciais for tempo in tempos]
+    series = [serie for _, serie in metricas.registro.copia().values()]
+    queries = sum(serie['queries'] for serie in series)
+    contagem = sum(serie['contagem'] for serie in series)
+    return {
+        'requisicoes': len(amostras),
+        'erros': sum(erros for _, erros in parciais),
+        'vazao_rps': round(len(amostras) / duracao, 1),
+        **resumo(amostras),
+        'queries_por_requisicao': round(queries / max(contagem, 1), 2),
+    }
+
+
+def processar_tarefas():
+    """Esvazia a fila de ``core.tarefas`` e mede o trabalho adiado."""
+    from core import tarefas
+    from core.models import Tarefa
+
+    inicio = time.perf_counter()
+    executadas = tarefas.processar('carga')
+    duracao = (time.perf_counter() - inicio) * 1000
+    return {
+        'executadas': executadas,
+        'falhas': Tarefa.objects.filter(status='falhou').count(),
+        'duracao_ms': round(duracao, 1),
+        'por_tarefa_ms': round(duracao / max(executadas, 1), 2),
+    }
+
+
+def comparar(resultado, base):
+    print('\nComparação com a baseline (p50 / p95 / vazão):')
+    for nome, medida in resultado['cenarios'].items():
+        anterior = base.get('cenarios', {}).get(nome)
+        if anterior is None:
+            continue
+        variacoes = [
+            f'{chave} {(medida[chave] / anterior[chave] - 1) * 100:+.0f}%'
+            for chave in ('p50_ms', 'p95_ms', 'vazao_rps')
+            if anterior[chave]
+        ]
+        print(f'{nome:>20}: {", ".join(variacoes)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', type=float, default=1)
+    parser.add_argument('--requisicoes', type=int, default=200)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument(
+        '--cenario', choices=sorted(CENARIOS), action='append',
+        help='Cenário a rodar (padrão: todos). Pode repetir.'
+    )
+    parser.add_argument('--saida', help='Grava o resultado neste arquivo')
+    parser.add_argument('--comparar', help='Baseline JSON para comparação')
+    args = parser.parse_args()
+
+    configurar_django()
+    import logging
+
+    import django
+    from django.core.management import call_command
+    from django.db import connection
+
+    from core import semeadura
+
+    # O log de requisições lentas inundaria a saída durante a carga
+    logging.getLogger('core.lento').setLevel(logging.ERROR)
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    call_command('migrate', verbosity=0)
+    criados = semeadura.semear(escala=args.escala)
+    contexto = Contexto(semeadura.SENHA_PADRAO)
+
+    banco = connection.vendor
+    if banco == 'sqlite':
+        banco += f' {connection.Database.sqlite_version}'
+    resultado = {
+        'ambiente': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': banco,
+            'maquina': platform.platform(),
+        },
+        'parametros': {
+            'escala': args.escala,
+            'requisicoes': args.requisicoes,
+            'concorrencia': args.concorrencia,
+            'dados': criados,
+        },
+        'cenarios': {},
+    }
+    for nome in args.cenario or CENARIOS:
+        medida = executar(
+            CENARIOS[nome], contexto, args.requisicoes, args.concorrencia
+        )
+        resultado['cenarios'][nome] = medida
+        print(f'{nome:>20}: {medida["vazao_rps"]} req/s '
+              f'p50={medida["p50_ms"]}ms p95={medida["p95_ms"]}ms '
+              f'p99={medida["p99_ms"]}ms '
+              f'queries/req={medida["queries_por_requisicao"]} '
+              f'erros={medida["erros"]}')
+        tarefas = processar_tarefas()
+        if tarefas['executadas']:
+            medida['tarefas'] = tarefas
+            print(f'{"":>20}  + {tarefas["executadas"]} tarefas em '
+                  f'{tarefas["duracao_ms"]}ms '
+                  f'({tarefas["por_tarefa_ms"]}ms/tarefa, '
+                  f'falhas={tarefas["falhas"]})')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(resultado, json.load(arquivo))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Utilitários compartilhados pelos benchmarks.
+
+Os scripts rodam a partir de ``src/CadPro`` com ``python -m benchmarks.<nome>``
+e usam um banco SQLite temporário, para nunca tocar no ``db.sqlite3``.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def configurar_django(banco_temporario=True, caminho=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'extensao.settings')
+    import django
+    from django.conf import settings
+    from django.test.utils import setup_test_environment
+
+    from extensao import banco
+
+    if banco_temporario and caminho is None:
+        pasta = tempfile.mkdtemp(prefix='cadpro-bench-')
+        caminho = os.path.join(pasta, 'bench.sqlite3')
+    if caminho is not None:
+        # Mesmo perfil do db.sqlite3 (WAL, IMMEDIATE, busy timeout): os
+        # cenários concorrentes disputam o lock de escrita do SQLite
+        settings.DATABASES['default'] = banco.sqlite(
+            {'CADPRO_DB_NAME': caminho, 'CADPRO_SQLITE_TIMEOUT': '30'}, None
+        )
+    django.setup()
+    # DEBUG desligado e 'testserver' em ALLOWED_HOSTS para o Client de teste
+    setup_test_environment()
+    return caminho
+
+
+def cronometrar(funcao, repeticoes):
+    """Executa ``funcao`` ``repeticoes`` vezes e devolve os tempos em ms."""
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return amostras
+
+
+def percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    indice = min(len(ordenadas) - 1, round(p / 100 * (len(ordenadas) - 1)))
+    return ordenadas[indice]
+
+
+def resumo(amostras):
+    return {
+        'media_ms': round(statistics.fmean(amostras), 3),
+        'p50_ms': round(percentil(amostras, 50), 3),
+        'p95_ms': round(percentil(amostras, 95), 3),
+        'p99_ms': round(percentil(amostras, 99), 3),
+    }
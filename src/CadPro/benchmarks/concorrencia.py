@@ -0,0 +1,278 @@
+"""WSGI x ASGI com centenas de conexões simultâneas.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.concorrencia --conexoes 500 --requisicoes 5000
+    python -m benchmarks.concorrencia --latencia-banco 2 --json saida.json
+
+Sem servidor HTTP no ambiente, o script faz o papel do servidor e chama as
+aplicações direto (``environ``/``start_response`` e ``scope``/``receive``/
+``send``), cada modo num processo próprio sobre o mesmo banco semeado:
+
+* ``wsgi``: ``extensao.wsgi`` atrás de ``--threads`` threads, como o
+  gunicorn ``gthread``; as conexões excedentes esperam na fila;
+* ``asgi_sync``: ``extensao.asgi`` com as views do DRF (``CADPRO_ASYNC=0``),
+  cada requisição numa thread do ``sync_to_async``;
+* ``asgi``: ``extensao.asgi`` com as views nativas de ``core.assincrono``.
+
+Cada uma das ``--conexoes`` mantém uma requisição em voo (perfil, lista de
+propostas e os feeds públicos, em rodízio) até somar ``--requisicoes``; a
+latência inclui a espera na fila. ``--latencia-banco`` soma um atraso a
+cada query, como um banco na rede. Sem ele o SQLite local responde em
+microssegundos e a diferença fica no custo de CPU e de threads.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .comum import configurar_django, resumo
+
+# Modo -> CADPRO_ASYNC (ROOT_URLCONF de extensao/settings.py)
+MODOS = {'wsgi': '0', 'asgi_sync': '0', 'asgi': '1'}
+
+
+def pedidos(tokens):
+    return [
+        ('/api/auth/perfil/', tokens['comunidade']),
+        ('/api/propostas/', tokens['coordenador']),
+        ('/api/publico/projetos/', None),
+        ('/api/publico/relatorios/', None),
+    ]
+
+
+def chamar_wsgi(aplicacao, caminho, token):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'testserver',
+        'HTTP_ACCEPT': '*/*', 'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True,
+        'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+    status = []
+    corpo = aplicacao(
+        environ, lambda linha, cabecalhos, exc_info=None: status.append(linha)
+    )
+    try:
+        b''.join(corpo)
+    finally:
+        if hasattr(corpo, 'close'):
+            corpo.close()
+    return int(status[0].split()[0])
+
+
+async def chamar_asgi(aplicacao, caminho, token):
+    cabecalhos = [(b'host', b'testserver'), (b'accept', b'*/*')]
+    if token:
+        cabecalhos.append((b'authorization', f'Token {token}'.encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': caminho,
+        'raw_path': caminho.encode(), 'query_string': b'', 'root_path': '',
+        'headers': cabecalhos, 'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    corpo = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    respondido = asyncio.Event()
+    status = []
+
+    async def receive():
+        if corpo:
+            return corpo.pop()
+        # O Django escuta a desconexão enquanto a view roda
+        await respondido.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+        elif not mensagem.get('more_body'):
+            respondido.set()
+
+    await aplicacao(scope, receive, send)
+    return status[0]
+
+
+def atrasar_queries(segundos):
+    from django.db.backends.signals import connection_created
+
+    def atraso(execute, sql, params, many, context):
+        time.sleep(segundos)
+        return execute(sql, params, many, context)
+
+    def instalar(sender, connection, **kwargs):
+        if atraso not in connection.execute_wrappers:
+            connection.execute_wrappers.append(atraso)
+
+    connection_created.connect(instalar, weak=False)
+
+
+async def carga(chamar, lista, conexoes, requisicoes):
+    numeros = itertools.count()
+    amostras = []
+    erros = 0
+    pico_threads = threading.active_count()
+
+    async def cliente():
+        nonlocal erros
+        while (numero := next(numeros)) < requisicoes:
+            caminho, token = lista[numero % len(lista)]
+            inicio = time.perf_counter()
+            try:
+                status = await chamar(caminho, token)
+            except Exception:
+                status = None
+            amostras.append((time.perf_counter() - inicio) * 1000)
+            erros += status != 200
+
+    async def observar_threads():
+        nonlocal pico_threads
+        while True:
+            pico_threads = max(pico_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    observador = asyncio.create_task(observar_threads())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(conexoes)))
+    duracao = time.perf_counter() - inicio
+    observador.cancel()
+    return {
+        'requisicoes': len(amostras),
+        'erros': erros,
+        'vazao_rps': round(len(amostras) / duracao, 1),
+        **resumo(amostras),
+        'pico_threads': pico_threads,
+    }
+
+
+def medir_modo(args):
+    """Roda no processo filho: um modo, já com CADPRO_ASYNC no ambiente."""
+    configurar_django(caminho=args.banco)
+    import logging
+
+    logging.getLogger('core.lento').setLevel(logging.ERROR)
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    if args.latencia_banco:
+        atrasar_queries(args.latencia_banco / 1000)
+    lista = pedidos(json.loads(args.tokens))
+
+    if args.modo == 'wsgi':
+        from django.core.wsgi import get_wsgi_application
+
+        aplicacao = get_wsgi_application()
+        executor = ThreadPoolExecutor(args.threads)
+
+        def chamar(caminho, token):
+            return asyncio.get_running_loop().run_in_executor(
+                executor, chamar_wsgi, aplicacao, caminho, token
+            )
+    else:
+        from django.core.asgi import get_asgi_application
+
+        aplicacao = get_asgi_application()
+
+        def chamar(caminho, token):
+            return chamar_asgi(aplicacao, caminho, token)
+
+    async def rodar():
+        # Aquece caches (token, feeds públicos) e conexões
+        await carga(chamar, lista, 1, len(lista) * 2)
+        return await carga(chamar, lista, args.conexoes, args.requisicoes)
+
+    print(json.dumps(asyncio.run(rodar())))
+
+
+def preparar(escala):
+    caminho = configurar_django()
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from core import semeadura
+    from core.models import Usuario
+
+    call_command('migrate', verbosity=0)
+    semeadura.semear(escala=escala)
+    tokens = {
+        tipo: Token.objects.get_or_create(
+            user=Usuario.objects.filter(tipo_usuario=tipo).first()
+        )[0].key
+        for tipo in ('comunidade', 'coordenador')
+    }
+    return caminho, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conexoes', type=int, default=500)
+    parser.add_argument('--requisicoes', type=int, default=5000)
+    parser.add_argument(
+        '--threads', type=int, default=32,
+        help='Threads do servidor WSGI simulado'
+    )
+    parser.add_argument(
+        '--latencia-banco', type=float, default=0,
+        help='Atraso em ms somado a cada query'
+    )
+    parser.add_argument('--escala', type=float, default=1)
+    parser.add_argument(
+        '--modo', choices=sorted(MODOS), action='append',
+        help='Modo a medir (padrão: todos). Pode repetir.'
+    )
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    # Uso interno: o processo pai chama um filho por modo
+    parser.add_argument('--banco', help=argparse.SUPPRESS)
+    parser.add_argument('--tokens', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.banco:
+        args.modo = args.modo[0]
+        return medir_modo(args)
+
+    caminho, tokens = preparar(args.escala)
+    resultado = {
+        'parametros': {
+            'conexoes': args.conexoes, 'requisicoes': args.requisicoes,
+            'threads_wsgi': args.threads,
+            'latencia_banco_ms': args.latencia_banco,
+        },
+        'modos': {},
+    }
+    for modo in args.modo or MODOS:
+        comando = [
+            sys.executable, '-m', 'benchmarks.concorrencia',
+            '--modo', modo, '--banco', caminho, '--tokens', json.dumps(tokens),
+            '--conexoes', str(args.conexoes),
+            '--requisicoes', str(args.requisicoes),
+            '--threads', str(args.threads),
+            '--latencia-banco', str(args.latencia_banco),
+        ]
+        saida = subprocess.run(
+            comando, check=True, capture_output=True, text=True,
+            env={**os.environ, 'CADPRO_ASYNC': MODOS[modo]},
+            cwd=os.getcwd(),
+        ).stdout
+        medida = json.loads(saida.strip().splitlines()[-1])
+        resultado['modos'][modo] = medida
+        print(f'{modo:>10}: {medida["vazao_rps"]} req/s '
+              f'p50={medida["p50_ms"]}ms p95={medida["p95_ms"]}ms '
+              f'p99={medida["p99_ms"]}ms threads={medida["pico_threads"]} '
+              f'erros={medida["erros"]}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
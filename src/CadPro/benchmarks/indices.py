@@ -0,0 +1,208 @@
+"""Planos de execução e latência das listagens antes e depois dos índices.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.indices --propostas 100000
+
+Semeia um banco SQLite temporário com o schema atual, remove os índices
+criados por ``0004_indices_listagens``, mede as querysets de
+``core/views.py``, recria os índices e mede de novo. Os índices de
+migrations posteriores ficam nas duas medições.
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from .comum import configurar_django, cronometrar, resumo
+
+MIGRACAO_INDICES = '0004_indices_listagens'
+
+
+def indices_medidos():
+    """``(modelo, índice)`` de cada ``AddIndex`` da migration medida."""
+    from django.apps import apps
+    from django.db.migrations.loader import MigrationLoader
+    from django.db.migrations.operations import AddIndex
+
+    migracao = MigrationLoader(None, ignore_no_migrations=True).get_migration(
+        'core', MIGRACAO_INDICES
+    )
+    return [
+        (apps.get_model('core', operacao.model_name), operacao.index)
+        for operacao in migracao.operations
+        if isinstance(operacao, AddIndex)
+    ]
+
+
+def alterar_indices(indices, criar):
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for modelo, indice in indices:
+            if criar:
+                editor.add_index(modelo, indice)
+            else:
+                editor.remove_index(modelo, indice)
+
+
+def semear(total_propostas, lote=5000):
+    from django.db import connection
+
+    from core.models import Projeto, Proposta, Relatorio, Usuario
+
+    aleatorio = random.Random(42)
+    total_usuarios = max(1, total_propostas // 50)
+    Usuario.objects.bulk_create(
+        [
+            Usuario(
+                username=f'usuario{i}', password='!',
+                first_name='Usuário', last_name=str(i),
+                tipo_usuario='professor' if i % 20 == 0 else 'comunidade',
+            )
+            for i in range(total_usuarios)
+        ],
+        batch_size=lote
+    )
+    ids_usuarios = list(Usuario.objects.values_list('id', flat=True))
+    status = [codigo for codigo, _ in Proposta.STATUS_CHOICES]
+
+    for inicio in range(0, total_propostas, lote):
+        Proposta.objects.bulk_create([
+            Proposta(
+                titulo=f'Proposta {i}',
+                descricao='Descrição ' * 40,
+                problema_resolver='Problema ' * 40,
+                publico_alvo='Público',
+                relevancia_social='Relevância ' * 40,
+                usuario_id=aleatorio.choice(ids_usuarios),
+                status=aleatorio.choice(status),
+            )
+            for i in range(inicio, min(inicio + lote, total_propostas))
+        ])
+    # auto_now_add grava o mesmo instante em todo o lote; espalha as datas
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE core_proposta SET data_submissao = datetime("
+            "'2020-01-01 00:00:00', '+' || ((id * 7919) % 2000000) "
+            "|| ' minutes')"
+        )
+
+    professores = ids_usuarios[::20]
+    situacoes = ['em_execucao', 'concluido', 'suspenso']
+    origens = Proposta.objects.filter(status='aprovada').values_list(
+        'id', flat=True
+    )
+    projetos = [
+        Projeto(
+            titulo=f'Projeto {id_proposta}',
+            descricao='Descrição', objetivos='Objetivos',
+            impacto_esperado='Impacto',
+            status=aleatorio.choice(situacoes),
+            data_inicio=date(2020, 1, 1) + timedelta(
+                days=aleatorio.randrange(2000)
+            ),
+            proposta_origem_id=id_proposta,
+            professor_responsavel_id=aleatorio.choice(professores),
+        )
+        for id_proposta in origens.iterator()
+    ]
+    Projeto.objects.bulk_create(projetos, batch_size=lote)
+
+    ids_projetos = list(Projeto.objects.values_list('id', flat=True))
+    relatorios = [
+        Relatorio(
+            projeto_id=id_projeto,
+            titulo='Relatório',
+            conteudo='Conteúdo ' * 100,
+            data_relatorio=date(2020, 1, 1) + timedelta(
+                days=aleatorio.randrange(2000)
+            ),
+            publico=aleatorio.random() < 0.3,
+        )
+        for id_projeto in ids_projetos
+        for _ in range(3)
+    ]
+    Relatorio.objects.bulk_create(relatorios, batch_size=lote)
+    return aleatorio.choice(ids_usuarios)
+
+
+def consultas(id_usuario):
+    from core import views
+    from core.models import Usuario
+
+    def propostas(tipo_usuario):
+        viewset = views.PropostaViewSet()
+        viewset.request = SimpleNamespace(
+            user=Usuario(id=id_usuario, tipo_usuario=tipo_usuario)
+        )
+        return viewset.get_queryset()
+
+    return {
+        'propostas (coordenador)': propostas('coordenador'),
+        'propostas (comunidade)': propostas('comunidade'),
+        'propostas por status': propostas('coordenador').filter(
+            status='em_analise'
+        ),
+        'projetos': views.ProjetoViewSet.queryset.all(),
+        'projetos públicos': views.ProjetoPublicoViewSet.queryset.all(),
+        'relatórios públicos': views.RelatorioPublicoViewSet.queryset.all(),
+    }
+
+
+def medir(id_usuario, repeticoes):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    resultado = {}
+    for nome, queryset in consultas(id_usuario).items():
+        # Reproduz o que a paginação faz: COUNT(*) e a primeira página
+        def pagina(queryset=queryset):
+            queryset.count()
+            list(queryset[:20])
+
+        resultado[nome] = {
+            'plano': queryset[:20].explain(),
+            **resumo(cronometrar(pagina, repeticoes)),
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--propostas', type=int, default=100_000)
+    parser.add_argument('--repeticoes', type=int, default=30)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    caminho = configurar_django()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    indices = indices_medidos()
+    alterar_indices(indices, criar=False)
+    print(f'Semeando {args.propostas} propostas em {caminho}...')
+    id_usuario = semear(args.propostas)
+
+    antes = medir(id_usuario, args.repeticoes)
+    alterar_indices(indices, criar=True)
+    depois = medir(id_usuario, args.repeticoes)
+
+    for nome in antes:
+        print(f'\n== {nome}')
+        for rotulo, medida in (('antes', antes[nome]), ('depois', depois[nome])):
+            print(f'  {rotulo}: p50={medida["p50_ms"]}ms '
+                  f'p95={medida["p95_ms"]}ms')
+            for linha in medida['plano'].splitlines():
+                print(f'    {linha}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'antes': antes, 'depois': depois}, arquivo,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
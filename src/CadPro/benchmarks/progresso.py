@@ -0,0 +1,119 @@
+"""Custo do progresso dos projetos nas listagens, por tamanho de página.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.progresso --requisicoes 100
+
+Semeia um banco temporário e mede ``GET /api/projetos/`` e
+``GET /api/publico/projetos/`` (cache público limpo a cada requisição)
+com páginas de 20 e 200 linhas. O progresso vem do JOIN com
+``ResumoProjeto``, então o número de queries não muda com a página. Para
+comparar, ``por_linha`` monta os mesmos campos com dois agregados por
+projeto (atividades e último relatório), o que o serializer faria sem o
+resumo.
+"""
+import argparse
+import json
+
+from .comum import configurar_django, cronometrar, resumo
+
+TAMANHOS = (20, 200)
+
+
+def por_linha(tamanho):
+    from django.db.models import Count, Max, Q
+
+    from core.models import Atividade, Projeto, Relatorio
+
+    pagina = list(
+        Projeto.objects.order_by('-data_inicio').values('id', 'titulo')[
+            :tamanho
+        ]
+    )
+    for projeto in pagina:
+        projeto.update(Atividade.objects.filter(
+            projeto_id=projeto['id']
+        ).aggregate(
+            total=Count('pk'),
+            concluidas=Count('pk', filter=Q(status='concluida')),
+        ))
+        projeto.update(Relatorio.objects.filter(
+            projeto_id=projeto['id']
+        ).aggregate(ultimo_relatorio=Max('data_relatorio')))
+    return pagina
+
+
+def contar_queries(funcao):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # O log guarda no máximo 9000 queries; cheio, a contagem sairia errada
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as queries:
+        funcao()
+    return len(queries)
+
+
+def medir(funcao, tamanho, requisicoes):
+    funcao()  # aquece
+    medidas = resumo(cronometrar(funcao, requisicoes))
+    medidas['queries'] = contar_queries(funcao)
+    medidas['ms_por_linha'] = round(medidas['p50_ms'] / tamanho, 4)
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requisicoes', type=int, default=100)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+
+    from core import cache as cache_publico
+    from core import semeadura
+    from core.models import Usuario
+    from core.pagination import PaginacaoKeyset, PaginacaoPadrao
+
+    call_command('migrate', verbosity=0)
+    # ~210 projetos em execução: a página de 200 sai cheia nas duas listas
+    semeadura.semear(escala=1)
+    coordenador = Usuario.objects.filter(tipo_usuario='coordenador').first()
+    cliente = APIClient()
+    cliente.force_authenticate(coordenador)
+
+    def publico():
+        cache_publico.obter_cache().clear()
+        return cliente.get('/api/publico/projetos/')
+
+    resultado = {}
+    for tamanho in TAMANHOS:
+        # O PAGE_SIZE é lido na definição das classes de paginação
+        PaginacaoPadrao.page_size = PaginacaoKeyset.page_size = tamanho
+        cenarios = {
+            'projetos': lambda: cliente.get('/api/projetos/'),
+            'publico_projetos': publico,
+            'por_linha': lambda: por_linha(tamanho),
+        }
+        resultado[tamanho] = {
+            nome: medir(funcao, tamanho, args.requisicoes)
+            for nome, funcao in cenarios.items()
+        }
+
+    for nome in resultado[TAMANHOS[0]]:
+        medidas = [resultado[tamanho][nome] for tamanho in TAMANHOS]
+        print(f'{nome:>18}: ' + ' | '.join(
+            f'{tamanho} linhas: {m["queries"]} queries, p50={m["p50_ms"]}ms, '
+            f'{m["ms_por_linha"]}ms/linha'
+            for tamanho, m in zip(TAMANHOS, medidas)
+        ))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
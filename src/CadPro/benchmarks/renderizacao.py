@@ -0,0 +1,164 @@
+"""Renderers e compressão no feed público de relatórios.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.renderizacao --linhas 500 --requisicoes 300
+
+Mede, sobre os dados de uma página do feed (``conteudo`` longo):
+
+* tempo e bytes de cada renderer (JSON do DRF, orjson, MessagePack);
+* tempo e bytes do JSON comprimido com gzip e Brotli;
+* latência de ``GET /api/publico/relatorios/`` pelo URLconf real, já com
+  a página no cache público, para cada combinação de Accept e
+  Accept-Encoding.
+"""
+import argparse
+import json
+
+from .comum import configurar_django, cronometrar, resumo
+
+CONTEUDO_PALAVRAS = 400
+
+
+def semear(linhas):
+    from core import semeadura
+    from core.models import Relatorio
+
+    # ~1,4 relatório público por proposta na escala padrão
+    semeadura.semear(escala=max(1, linhas / 1400))
+    # Relatórios reais têm vários parágrafos; alonga o conteúdo semeado
+    relatorios = list(Relatorio.objects.filter(publico=True)[:linhas])
+    for relatorio in relatorios:
+        relatorio.conteudo = ' '.join(
+            [relatorio.conteudo] * (CONTEUDO_PALAVRAS // 120 + 1)
+        )
+    Relatorio.objects.bulk_update(relatorios, ['conteudo'], batch_size=500)
+
+
+def renderizadores():
+    from rest_framework.renderers import JSONRenderer
+
+    from core import renderers
+
+    opcoes = {
+        'drf_json': JSONRenderer(),
+        'orjson': renderers.OrjsonRenderer(),
+    }
+    if renderers.msgpack is not None:
+        opcoes['msgpack'] = renderers.MessagePackRenderer()
+    return opcoes
+
+
+def compressores():
+    from django.utils.text import compress_string
+
+    from core import middleware
+
+    opcoes = {'gzip': compress_string}
+    if middleware.brotli is not None:
+        opcoes['brotli'] = lambda dados: middleware.brotli.compress(
+            dados, quality=5
+        )
+    return opcoes
+
+
+def medir_renderizacao(dados, repeticoes):
+    resultado = {}
+    for nome, renderer in renderizadores().items():
+        amostras = cronometrar(lambda: renderer.render(dados), repeticoes)
+        resultado[nome] = {
+            **resumo(amostras), 'bytes': len(renderer.render(dados)),
+        }
+    corpo = renderizadores()['orjson'].render(dados)
+    for nome, comprimir in compressores().items():
+        resultado[f'orjson+{nome}'] = {
+            **resumo(cronometrar(lambda: comprimir(corpo), repeticoes)),
+            'bytes': len(comprimir(corpo)),
+        }
+    return resultado
+
+
+def medir_requisicoes(requisicoes):
+    from unittest import mock
+
+    from django.test import Client
+    from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+    from core import views
+
+    cliente = Client()
+    url = '/api/publico/relatorios/'
+    cenarios = {
+        'json': {},
+        'json+gzip': {'HTTP_ACCEPT_ENCODING': 'gzip'},
+        'json+br': {'HTTP_ACCEPT_ENCODING': 'br'},
+        'msgpack': {'HTTP_ACCEPT': 'application/msgpack'},
+    }
+    resultado = {}
+    # Renderer padrão do DRF, trocado direto na classe da view
+    with mock.patch.object(
+        views.RelatorioPublicoViewSet, 'renderer_classes',
+        [JSONRenderer, BrowsableAPIRenderer]
+    ):
+        cliente.get(url)
+        resultado['drf_json'] = resumo(
+            cronometrar(lambda: cliente.get(url), requisicoes)
+        )
+    for nome, cabecalhos in cenarios.items():
+        response = cliente.get(url, **cabecalhos)
+        resultado[nome] = {
+            **resumo(cronometrar(
+                lambda: cliente.get(url, **cabecalhos), requisicoes
+            )),
+            'bytes': len(response.content),
+            'content_encoding': response.get('Content-Encoding'),
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    parser.add_argument('--requisicoes', type=int, default=300)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.core.management import call_command
+    from rest_framework.settings import api_settings
+
+    from core.models import Relatorio
+    from core.serializers import RelatorioPublicoRapido
+
+    call_command('migrate', verbosity=0)
+    semear(args.linhas)
+
+    consulta = Relatorio.objects.filter(publico=True).order_by(
+        '-data_relatorio'
+    )
+    resultado = {}
+    for nome, linhas in (
+        ('pagina', api_settings.PAGE_SIZE), ('lote', args.linhas)
+    ):
+        pagina = RelatorioPublicoRapido.consultar(consulta[:linhas])
+        dados = {'results': RelatorioPublicoRapido(list(pagina)).data}
+        resultado[f'renderizacao_{nome}'] = medir_renderizacao(
+            dados, args.repeticoes
+        )
+    resultado['requisicoes'] = medir_requisicoes(args.requisicoes)
+
+    for secao, medidas in resultado.items():
+        print(secao)
+        for nome, medida in medidas.items():
+            tamanho = medida.get('bytes', '-')
+            print(f'{nome:>20}: p50={medida["p50_ms"]}ms '
+                  f'p95={medida["p95_ms"]}ms bytes={tamanho}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Latência de uma rota barata durante uma rajada de logins.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.senhas --logins 8 --segundos 10
+
+``--logins`` threads fazem ``POST /api/auth/login/`` sem parar enquanto
+outra thread mede ``GET /api/auth/perfil/`` (token em cache, sem hash).
+Compara o hash na thread de cada login (``na_thread``, como antes de
+``core.senhas``) com o pool limitado de ``SENHAS``. Os limites de
+tentativas (``core.throttling``) ficam desligados para a rajada passar.
+"""
+import argparse
+import json
+import threading
+import time
+
+from .comum import configurar_django, resumo
+
+MODOS = {
+    'na_thread': lambda logins: {
+        'PROCESSOS': 0, 'CONCORRENCIA': logins, 'ESPERA_MAXIMA': 60,
+    },
+    'pool': lambda logins: {
+        'PROCESSOS': 2, 'CONCORRENCIA': 2, 'ESPERA_MAXIMA': 60,
+    },
+}
+
+
+def medir(senhas_config, logins, segundos, token):
+    from django.test import Client, override_settings
+
+    parar = threading.Event()
+    feitos = []
+
+    def logar():
+        cliente = Client()
+        while not parar.is_set():
+            response = cliente.post(
+                '/api/auth/login/',
+                {'username': 'rajada', 'password': 'senha-da-rajada'},
+                content_type='application/json'
+            )
+            feitos.append(response.status_code)
+
+    with override_settings(SENHAS=senhas_config):
+        cliente = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        cliente.get('/api/auth/perfil/')  # aquece o cache de tokens
+        threads = [threading.Thread(target=logar) for _ in range(logins)]
+        for thread in threads:
+            thread.start()
+        amostras = []
+        fim = time.perf_counter() + segundos
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            cliente.get('/api/auth/perfil/')
+            amostras.append((time.perf_counter() - inicio) * 1000)
+        parar.set()
+        for thread in threads:
+            thread.join()
+    return {
+        'perfil': resumo(amostras),
+        'logins_por_segundo': round(len(feitos) / segundos, 2),
+        'erros_login': sum(status != 200 for status in feitos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    configurar_django()
+    import logging
+
+    # Todo login passa do limite de requisição lenta
+    logging.getLogger('core.lento').setLevel(logging.ERROR)
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+    from rest_framework.throttling import SimpleRateThrottle
+
+    from core.models import Usuario
+
+    call_command('migrate', verbosity=0)
+    Usuario.objects.create_user('rajada', password='senha-da-rajada')
+    leitor = Usuario.objects.create_user('leitor')
+    token = Token.objects.create(user=leitor).key
+    SimpleRateThrottle.THROTTLE_RATES = {
+        'autenticacao': None, 'login_usuario': None,
+    }
+
+    resultado = {}
+    for modo, config in MODOS.items():
+        medidas = resultado[modo] = medir(
+            config(args.logins), args.logins, args.segundos, token
+        )
+        perfil = medidas['perfil']
+        print(f'{modo:>10}: perfil p50={perfil["p50_ms"]}ms '
+              f'p95={perfil["p95_ms"]}ms p99={perfil["p99_ms"]}ms | '
+              f'{medidas["logins_por_segundo"]} logins/s '
+              f'erros={medidas["erros_login"]}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Linhas por segundo das listagens: ModelSerializer x ``LeituraRapida``.
+
+Uso (a partir de ``src/CadPro``)::
+
+    python -m benchmarks.serializacao --linhas 1000 --repeticoes 20
+
+Semeia um banco temporário com ``core.semeadura`` e, para cada listagem,
+mede a busca de ``--linhas`` registros mais a montagem da saída: antes
+com o queryset de objetos e o serializer do DRF, depois com ``values()``
+e a classe rápida equivalente.
+"""
+import argparse
+import json
+
+from .comum import configurar_django, cronometrar, resumo
+
+
+def listagens():
+    from core import serializers
+    from core.models import Projeto, Proposta, Relatorio
+
+    return {
+        'propostas': (
+            Proposta.objects.select_related('usuario').order_by(
+                '-data_submissao'
+            ),
+            serializers.PropostaListSerializer,
+            serializers.PropostaListaRapida,
+        ),
+        'projetos': (
+            Projeto.objects.select_related('resumo').order_by(
+                '-data_inicio'
+            ),
+            serializers.ProjetoListSerializer,
+            serializers.ProjetoListaRapida,
+        ),
+        'relatorios_publicos': (
+            Relatorio.objects.select_related('projeto').filter(
+                publico=True
+            ).order_by('-data_relatorio'),
+            serializers.RelatorioPublicoSerializer,
+            serializers.RelatorioPublicoRapido,
+        ),
+    }
+
+
+def medir(funcao, linhas, repeticoes):
+    funcao()  # aquece
+    medidas = resumo(cronometrar(funcao, repeticoes))
+    medidas['linhas_por_segundo'] = round(linhas / medidas['p50_ms'] * 1000)
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.core.management import call_command
+
+    from core import semeadura
+
+    call_command('migrate', verbosity=0)
+    # Escala suficiente para ter --linhas projetos (~35% das propostas)
+    semeadura.semear(escala=max(1, args.linhas / 350))
+
+    resultado = {}
+    for nome, (queryset, serializer, rapida) in listagens().items():
+        pagina = queryset[:args.linhas]
+        linhas = pagina.count()
+        antes = medir(
+            lambda: serializer(list(pagina), many=True).data,
+            linhas, args.repeticoes
+        )
+        depois = medir(
+            lambda: rapida(list(rapida.consultar(pagina)), many=True).data,
+            linhas, args.repeticoes
+        )
+        ganho = depois['linhas_por_segundo'] / antes['linhas_por_segundo']
+        resultado[nome] = {
+            'serializer': antes, 'leitura_rapida': depois,
+            'ganho': round(ganho, 2),
+        }
+        print(f'{nome:>20}: {antes["linhas_por_segundo"]} -> '
+              f'{depois["linhas_por_segundo"]} linhas/s ({ganho:.1f}x)')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
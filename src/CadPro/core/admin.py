@@ -2,9 +2,20 @@ from django.contrib import admin
 
 from .models import Proposta, Projeto, Relatorio, Entrega, Atividade
 
-# Register your models here.
-admin.site.register(Proposta)
+
+# O __str__ de Relatorio, Entrega e Atividade lê o título do projeto,
+# então a listagem do admin precisa trazer o projeto no mesmo SELECT
+class ProjetoFilhoAdmin(admin.ModelAdmin):
+    list_select_related = ('projeto',)
+
+
+@admin.register(Proposta)
+class PropostaAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'usuario', 'status', 'data_submissao')
+    list_select_related = ('usuario',)
+
+
 admin.site.register(Projeto)
-admin.site.register(Relatorio)
-admin.site.register(Entrega)
-admin.site.register(Atividade)
+admin.site.register(Relatorio, ProjetoFilhoAdmin)
+admin.site.register(Entrega, ProjetoFilhoAdmin)
+admin.site.register(Atividade, ProjetoFilhoAdmin)
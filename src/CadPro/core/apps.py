@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        # Registram os tipos de core.tarefas
+        from . import aprovacao, envios, notificacoes  # noqa: F401
+        from .metricas import instrumentar_conexao
+
+        connection_created.connect(instrumentar_conexao)
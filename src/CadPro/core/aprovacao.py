@@ -0,0 +1,140 @@
+"""Aprovação e rejeição de propostas, uma a uma ou em lote.
+
+Tudo roda numa transação: um ``UPDATE ... WHERE status IN (pendentes)``
+muda só as propostas que ainda podem ser decididas e, na aprovação, um
+único ``bulk_create`` gera os projetos. Ids que não puderam ser decididos
+voltam com o motivo em vez de levantar erro. Como ``update()`` e
+``bulk_create`` não disparam signals, os contadores de ``core.painel`` são
+ajustados aqui, na mesma transação, assim como os e-mails ao autor
+(``core.notificacoes``) são enfileirados.
+
+As views enfileiram a aprovação (tarefa ``aprovar_propostas``, ver
+``core.tarefas``), que cria projetos e mexe no painel, e devolvem 202; a
+rejeição é um único ``UPDATE`` e continua na requisição.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from . import notificacoes, painel
+from .models import Projeto, Proposta
+from .signals import invalidar_no_commit
+from .tarefas import tarefa
+
+STATUS_PENDENTES = ('enviada', 'em_analise')
+
+
+def motivos_para_ignorar(ids, decididas):
+    motivos = {}
+    restantes = set(ids) - set(decididas)
+    if not restantes:
+        return motivos
+    situacao = Proposta.objects.filter(pk__in=restantes).values_list(
+        'pk', 'status', 'projeto_gerado'
+    )
+    for pk, status, projeto in situacao:
+        if projeto is not None:
+            motivos[pk] = 'Proposta já possui projeto.'
+        else:
+            motivos[pk] = f'Proposta com status "{status}".'
+    for pk in restantes - set(motivos):
+        motivos[pk] = 'Proposta não encontrada.'
+    return motivos
+
+
+def resultados(ids, decididas, motivos, resultado, projetos=None):
+    projetos = projetos or {}
+    saida = []
+    for pk in ids:
+        if pk in decididas:
+            item = {'id': pk, 'resultado': resultado}
+            if pk in projetos:
+                item['projeto_id'] = projetos[pk]
+        else:
+            item = {'id': pk, 'resultado': 'ignorada', 'motivo': motivos[pk]}
+        saida.append(item)
+    return saida
+
+
+def pendente(pk):
+    """Se a proposta ainda pode ser aprovada (checagem da view)."""
+    return Proposta.objects.filter(
+        pk=pk, status__in=STATUS_PENDENTES, projeto_gerado__isnull=True
+    ).exists()
+
+
+def aprovar_propostas(ids):
+    """Aprova as propostas pendentes de ``ids`` e cria seus projetos."""
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        # select_for_update faz um lote concorrente esperar e reavaliar o
+        # status; no SQLite a própria transação de escrita serializa
+        pendentes = list(
+            Proposta.objects.select_for_update(of=('self',)).filter(
+                pk__in=ids, status__in=STATUS_PENDENTES,
+                projeto_gerado__isnull=True
+            ).values(
+                'pk', 'status', 'titulo', 'descricao', 'problema_resolver',
+                'relevancia_social'
+            )
+        )
+        decididas = [proposta['pk'] for proposta in pendentes]
+        Proposta.objects.filter(
+            pk__in=decididas, status__in=STATUS_PENDENTES
+        ).update(status='aprovada', data_atualizacao=Now())
+        hoje = timezone.now().date()
+        criados = Projeto.objects.bulk_create([
+            Projeto(
+                titulo=proposta['titulo'],
+                descricao=proposta['descricao'],
+                objetivos=proposta['problema_resolver'],
+                impacto_esperado=proposta['relevancia_social'],
+                proposta_origem_id=proposta['pk'],
+                data_inicio=hoje,
+            )
+            for proposta in pendentes
+        ])
+        deltas = Counter('aprovada' for _ in decididas)
+        deltas.subtract(proposta['status'] for proposta in pendentes)
+        painel.somar_varios('propostas', deltas)
+        painel.somar_varios('projetos', Counter(p.status for p in criados))
+        painel.criar_resumos(projeto.pk for projeto in criados)
+        if criados:
+            # bulk_create não dispara post_save
+            invalidar_no_commit('projetos')
+        notificacoes.decisao(decididas, 'aprovada')
+        motivos = motivos_para_ignorar(ids, decididas)
+
+    projetos = {
+        projeto.proposta_origem_id: projeto.pk for projeto in criados
+    }
+    return resultados(ids, set(decididas), motivos, 'aprovada', projetos)
+
+
+def rejeitar_propostas(ids):
+    """Rejeita as propostas de ``ids`` que ainda estão pendentes."""
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        pendentes = dict(
+            Proposta.objects.select_for_update().filter(
+                pk__in=ids, status__in=STATUS_PENDENTES
+            ).values_list('pk', 'status')
+        )
+        decididas = list(pendentes)
+        Proposta.objects.filter(
+            pk__in=decididas, status__in=STATUS_PENDENTES
+        ).update(status='rejeitada', data_atualizacao=Now())
+        deltas = Counter('rejeitada' for _ in decididas)
+        deltas.subtract(pendentes.values())
+        painel.somar_varios('propostas', deltas)
+        notificacoes.decisao(decididas, 'rejeitada')
+        motivos = motivos_para_ignorar(ids, decididas)
+    return resultados(ids, set(decididas), motivos, 'rejeitada')
+
+
+# Aprovações não esperam atrás de e-mails e montagens na fila
+@tarefa('aprovar_propostas', prioridade=10)
+def aprovar_em_segundo_plano(ids):
+    return {'resultados': aprovar_propostas(ids)}
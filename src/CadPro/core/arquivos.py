@@ -0,0 +1,53 @@
+"""Campos de arquivo dos modelos e quem pode ler e alterar cada um.
+
+Cada alvo (``proposta.documentos``, ``entrega.arquivo``,
+``relatorio.arquivo``) liga um nome estável da API ao modelo e ao
+FileField. Coordenadores alteram qualquer arquivo; o autor da proposta
+altera os documentos dela; entregas e relatórios são do professor
+responsável e do autor da proposta de origem do projeto. Quem altera
+também lê, e o arquivo de um relatório público é aberto a todos.
+"""
+from .models import Entrega, Proposta, Relatorio
+
+ALVOS = {
+    'proposta.documentos': (Proposta, 'documentos'),
+    'entrega.arquivo': (Entrega, 'arquivo'),
+    'relatorio.arquivo': (Relatorio, 'arquivo'),
+}
+
+
+def buscar(alvo, objeto_id):
+    """Objeto dono do arquivo, já com o que ``pode_alterar`` consulta."""
+    modelo, _ = ALVOS[alvo]
+    queryset = modelo.objects.all()
+    if modelo is not Proposta:
+        queryset = queryset.select_related('projeto__proposta_origem')
+    return queryset.filter(pk=objeto_id).first()
+
+
+def responsaveis(objeto):
+    """Ids dos usuários (fora os coordenadores) donos do objeto."""
+    if isinstance(objeto, Proposta):
+        return {objeto.usuario_id}
+    projeto = objeto.projeto
+    return {
+        projeto.professor_responsavel_id,
+        projeto.proposta_origem.usuario_id,
+    } - {None}
+
+
+def pode_alterar(usuario, objeto):
+    if not usuario.is_authenticated:
+        return False
+    return (
+        usuario.tipo_usuario == 'coordenador' or
+        usuario.pk in responsaveis(objeto)
+    )
+
+
+def publico(objeto):
+    return isinstance(objeto, Relatorio) and objeto.publico
+
+
+def pode_ler(usuario, objeto):
+    return publico(objeto) or pode_alterar(usuario, objeto)
@@ -0,0 +1,218 @@
+"""Views nativas async (ASGI) das leituras mais acessadas.
+
+Sob ASGI, uma view síncrona ocupa uma thread do ``sync_to_async`` da
+entrada à saída, inclusive enquanto espera o banco. Aqui o perfil, a
+listagem de propostas e os feeds públicos de projetos e relatórios rodam
+no event loop: cache público e cache de tokens sem trocar de thread e o
+ORM assíncrono (``aget``, ``acount``, ``aiterator``) só para as queries.
+
+Cada view nativa cobre o caso comum (``GET`` em JSON, paginação por
+página ou cursor) e devolve ``None`` para todo o resto, que segue para a
+view do DRF numa thread: MessagePack e API navegável, ``?q=``,
+``?fields=``, credenciais recusadas, página inválida. Queryset, paginação,
+serializer, ETag e cache saem do próprio viewset, então os bytes e os
+validadores são os mesmos do caminho síncrono (conferido em
+``core.tests``). ``extensao.urls_asgi`` põe estas rotas na frente das do
+DRF, com os mesmos nomes.
+
+Ficam desligadas até ``CADPRO_ASYNC=1`` (``extensao/settings.py``), e
+não deve ser o padrão. No ``benchmarks.concorrencia`` (1 CPU, SQLite
+local) o WSGI com 32 threads venceu os dois modos ASGI. Com 500
+conexões: wsgi ~400-500 req/s, asgi ~220-275, asgi_sync ~220. Com
+``--latencia-banco 20`` e 200 conexões: wsgi 355 req/s, asgi 156,
+asgi_sync 108. O custo fixo do ``ASGIHandler`` do Django domina. As views
+nativas só ganham do ASGI com as views do DRF (``asgi_sync``). Elas
+podem compensar quando a aplicação já precisa rodar sob ASGI (websockets,
+streaming longo), com várias CPUs e um banco na rede, em que as conexões
+simultâneas passam bem do pool de threads do WSGI. Meça com
+``benchmarks.concorrencia`` nesse ambiente antes de ligar.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from . import authentication
+from . import cache as cache_publico
+from .condicional import aplicar_validadores, resposta_condicional
+from .renderers import OrjsonRenderer
+from .serializers import UsuarioSerializer
+from .urls import router
+from .views import (PropostaViewSet, ProjetoPublicoViewSet,
+                    RelatorioPublicoViewSet, perfil_usuario)
+
+JSON = 'application/json'
+# Accept que o DRF resolve para o OrjsonRenderer com o media type acima
+ACCEPT_JSON = ('*/*', JSON)
+# Parâmetros das listagens tratados aqui; qualquer outro vai para o DRF
+PARAMETROS = {'page', 'cursor'}
+
+
+def aceita_json(request):
+    return (
+        'format' not in request.GET and
+        request.headers.get('Accept', '*/*').strip() in ACCEPT_JSON
+    )
+
+
+def responder(dados):
+    return HttpResponse(
+        OrjsonRenderer().render(dados, JSON), content_type=JSON
+    )
+
+
+def instanciar(classe, request):
+    """Viewset do DRF para as partes sem I/O: queryset, paginação,
+    serializer e validadores."""
+    return classe(
+        request=request, action='list', format_kwarg=None, args=(),
+        kwargs={}
+    )
+
+
+def cabecalhos_do_drf(view_sincrona):
+    """``Allow`` e ``Vary`` que o DRF põe em toda resposta da view."""
+    instancia = view_sincrona.cls(**view_sincrona.initkwargs)
+    acoes = getattr(view_sincrona, 'actions', {})
+    for metodo, acao in acoes.items():
+        setattr(instancia, metodo, getattr(instancia, acao))
+    if hasattr(instancia, 'get') and not hasattr(instancia, 'head'):
+        instancia.head = instancia.get
+    return instancia.default_response_headers
+
+
+async def usuario_autenticado(request):
+    """Usuário do token (via ``core.authentication``) ou da sessão.
+
+    ``None`` quando só o DRF sabe responder: anônimo, token inválido ou
+    cabeçalho malformado.
+    """
+    partes = request.headers.get('Authorization', '').split()
+    if partes and partes[0].lower() == 'token':
+        if len(partes) != 2:
+            return None
+        return await authentication.autenticar_async(partes[1])
+    usuario = await request.auser()
+    return usuario if usuario.is_authenticated else None
+
+
+async def perfil(request):
+    usuario = await usuario_autenticado(request)
+    if usuario is None:
+        return None
+    return responder(UsuarioSerializer(usuario).data)
+
+
+async def listar_propostas(request):
+    if request.query_params.keys() - PARAMETROS:
+        return None
+    usuario = await usuario_autenticado(request)
+    if usuario is None:
+        return None
+    request.user = usuario
+    view = instanciar(PropostaViewSet, request)
+    try:
+        view.check_permissions(request)
+        queryset = view.filter_queryset(view.get_queryset())
+        pagina = await view.paginator.apaginate_queryset(
+            queryset, request, view
+        )
+    except APIException:
+        return None
+
+    # Como em RequisicaoCondicionalMixin.list
+    etag, ultima_modificacao = view.validadores(pagina)
+    response = resposta_condicional(request, etag)
+    if response is None:
+        serializer = view.get_serializer(pagina, many=True)
+        response = responder(
+            view.get_paginated_response(serializer.data).data
+        )
+    return aplicar_validadores(response, etag, ultima_modificacao)
+
+
+async def listar_publico(request, classe):
+    """Feed público com ``core.cache``, como ``CachePublicoMixin.list``."""
+    if request.query_params.keys() - PARAMETROS:
+        return None
+    namespace = classe.cache_namespace
+    versao_atual, etag, ultima_modificacao = await cache_publico.executar(
+        cache_publico.validadores, request, namespace
+    )
+    response = resposta_condicional(request, etag, ultima_modificacao)
+    if response is not None:
+        return aplicar_validadores(response, etag, ultima_modificacao)
+
+    dados = await cache_publico.executar(
+        cache_publico.ler, namespace, versao_atual, request
+    )
+    if dados is None:
+        view = instanciar(classe, request)
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            pagina = await view.paginator.apaginate_queryset(
+                queryset, request, view
+            )
+        except APIException:
+            return None
+        serializer = view.get_serializer(pagina, many=True)
+        dados = view.get_paginated_response(serializer.data).data
+        await cache_publico.executar(
+            cache_publico.guardar, namespace, versao_atual, request, dados
+        )
+    return aplicar_validadores(responder(dados), etag, ultima_modificacao)
+
+
+async def projetos_publicos(request):
+    return await listar_publico(request, ProjetoPublicoViewSet)
+
+
+async def relatorios_publicos(request):
+    return await listar_publico(request, RelatorioPublicoViewSet)
+
+
+def com_repasse(view_sincrona, nativa):
+    """View async que tenta ``nativa`` e, se ela devolver ``None``, chama
+    a ``view_sincrona`` do DRF numa thread."""
+    repassar = sync_to_async(view_sincrona)
+    cabecalhos = cabecalhos_do_drf(view_sincrona)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and aceita_json(request):
+            pedido = Request(request)
+            pedido.accepted_media_type = JSON
+            response = await nativa(pedido)
+            if response is not None:
+                for nome, valor in cabecalhos.items():
+                    response[nome] = valor
+                return response
+        return await repassar(request, *args, **kwargs)
+
+    # cls/initkwargs: o ReplicaMiddleware (usar_replica) e o DRF
+    # reconhecem a view como a original
+    view.__dict__.update({
+        nome: valor for nome, valor in view_sincrona.__dict__.items()
+        if nome != '__wrapped__'
+    })
+    return view
+
+
+# (caminho, nome da rota do DRF, view nativa)
+ROTAS = (
+    ('propostas/', 'propostas-list', listar_propostas),
+    ('publico/projetos/', 'publico-projetos-list', projetos_publicos),
+    ('publico/relatorios/', 'publico-relatorios-list', relatorios_publicos),
+    ('auth/perfil/', 'perfil', perfil),
+)
+
+
+def rotas():
+    sincronas = {rota.name: rota.callback for rota in router.urls}
+    sincronas['perfil'] = perfil_usuario
+    return [
+        path(caminho, com_repasse(sincronas[nome], nativa), name=nome)
+        for caminho, nome, nativa in ROTAS
+    ]
@@ -0,0 +1,209 @@
+"""Autenticação por token com cache das buscas token → usuário.
+
+Por padrão o cache é um LRU com TTL local ao processo. Com vários
+processos, configure ``AUTH_TOKEN_CACHE['ALIAS']`` com um alias de
+``CACHES`` compartilhado (ex.: Redis): a invalidação feita por um processo
+passa a valer para todos. No modo local, outros processos só esquecem a
+entrada quando o TTL vence, então mantenha o TTL curto.
+
+As entradas são invalidadas pelos signals de ``core.signals`` quando o
+token é apagado (logout) ou quando o usuário é salvo (senha, tipo_usuario,
+is_active...) ou excluído. ``autenticar_async`` faz a mesma busca para
+as views nativas de ``core.assincrono``.
+
+``SenhaEmProcessoBackend`` é o backend de login (usuário e senha) do
+Django, com a senha conferida no pool de ``core.senhas``.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import senhas
+
+PADRAO = {
+    'MAX_ENTRADAS': 10000,
+    'TTL': 60,
+    'ALIAS': None,
+}
+
+
+def configuracao():
+    return {**PADRAO, **getattr(settings, 'AUTH_TOKEN_CACHE', {})}
+
+
+class CacheLRU:
+    """Dicionário limitado por tamanho e por tempo, seguro entre threads."""
+
+    def __init__(self):
+        self.entradas = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, chave):
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is None:
+                return None
+            expira_em, valor = entrada
+            if expira_em < time.monotonic():
+                del self.entradas[chave]
+                return None
+            self.entradas.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl, max_entradas):
+        with self.lock:
+            self.entradas[chave] = (time.monotonic() + ttl, valor)
+            self.entradas.move_to_end(chave)
+            while len(self.entradas) > max_entradas:
+                self.entradas.popitem(last=False)
+
+    def delete_many(self, chaves):
+        with self.lock:
+            for chave in chaves:
+                self.entradas.pop(chave, None)
+
+    def clear(self):
+        with self.lock:
+            self.entradas.clear()
+
+
+cache_local = CacheLRU()
+
+
+def chave_cache(key):
+    return f'auth:token:{key}'
+
+
+def obter(key):
+    alias = configuracao()['ALIAS']
+    if alias:
+        return caches[alias].get(chave_cache(key))
+    return cache_local.get(key)
+
+
+def guardar(key, valor):
+    config = configuracao()
+    if config['ALIAS']:
+        caches[config['ALIAS']].set(chave_cache(key), valor, config['TTL'])
+    else:
+        cache_local.set(key, valor, config['TTL'], config['MAX_ENTRADAS'])
+
+
+async def obter_async(key):
+    alias = configuracao()['ALIAS']
+    if alias:
+        return await caches[alias].aget(chave_cache(key))
+    # O LRU local não faz I/O: pode rodar direto no event loop
+    return cache_local.get(key)
+
+
+async def guardar_async(key, valor):
+    config = configuracao()
+    if config['ALIAS']:
+        await caches[config['ALIAS']].aset(
+            chave_cache(key), valor, config['TTL']
+        )
+    else:
+        cache_local.set(key, valor, config['TTL'], config['MAX_ENTRADAS'])
+
+
+async def autenticar_async(key):
+    """Usuário do token, ou ``None`` se o DRF recusaria a credencial.
+
+    Mesmas regras de ``TokenAuthentication.authenticate_credentials``; quem
+    chama repassa as recusas ao DRF, que monta a resposta de erro.
+    """
+    valor = await obter_async(key)
+    if valor is None:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        if not token.user.is_active:
+            return None
+        valor = (token.user, token)
+        await guardar_async(key, valor)
+    return copy.copy(valor[0])
+
+
+def invalidar(*keys):
+    alias = configuracao()['ALIAS']
+    if alias:
+        caches[alias].delete_many([chave_cache(key) for key in keys])
+    else:
+        cache_local.delete_many(keys)
+
+
+def invalidar_usuario(usuario_id):
+    invalidar(*Token.objects.filter(user_id=usuario_id).values_list(
+        'key', flat=True
+    ))
+
+
+class CacheTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` que só vai ao banco na primeira requisição.
+
+    Falhas não são guardadas, para que tokens inválidos não ocupem o
+    cache. Cada requisição recebe uma cópia do usuário, então uma view que
+    altere ``request.user`` não contamina as outras.
+    """
+
+    def authenticate_credentials(self, key):
+        valor = obter(key)
+        if valor is None:
+            valor = super().authenticate_credentials(key)
+            guardar(key, valor)
+        user, token = valor
+        return copy.copy(user), copy.copy(token)
+
+
+class SenhaEmProcessoBackend(ModelBackend):
+    """``ModelBackend`` que confere a senha com ``core.senhas``.
+
+    Com a fila de hashes cheia o login é recusado (``PermissionDenied``
+    faz o ``authenticate`` do Django devolver ``None``), o que vale para o
+    admin e o login por sessão. A API passa ``propagar_ocupadas=True``
+    para receber ``SenhasOcupadas`` e responder 503.
+    """
+
+    def authenticate(self, request, username=None, password=None,
+                     propagar_ocupadas=False, **kwargs):
+        try:
+            return self.conferir(username, password, **kwargs)
+        except senhas.SenhasOcupadas:
+            if propagar_ocupadas:
+                raise
+            raise PermissionDenied
+
+    def conferir(self, username, password, **kwargs):
+        modelo = get_user_model()
+        if username is None:
+            username = kwargs.get(modelo.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = modelo._default_manager.get_by_natural_key(username)
+        except modelo.DoesNotExist:
+            # Mesmo custo de um usuário existente, como no Django (#20760)
+            senhas.gerar_hash(password)
+            return None
+        if senhas.conferir_usuario(user, password) and \
+                self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None,
+                            **kwargs):
+        return await sync_to_async(self.authenticate)(
+            request, username, password, **kwargs
+        )
@@ -0,0 +1,245 @@
+"""Busca textual em propostas e relatórios.
+
+No SQLite cada índice é uma tabela virtual FTS5 (rowid = id da linha); no
+PostgreSQL, uma tabela com ``tsvector`` ponderado e índice GIN. As tabelas
+são criadas pela migration ``0006_busca_textual``, mantidas pelos signals
+de ``core.signals`` e reconstruídas com ``manage.py reindexar_busca``.
+Outros bancos caem num ``icontains`` sem ranking.
+
+O ``trecho`` sai do banco com os caracteres de controle de ``MARCADORES``
+em volta dos termos encontrados; ``destacar`` escapa o HTML do texto
+guardado e só então os troca por ``<mark>``.
+"""
+import html
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import CharField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+IDIOMA_POSTGRES = 'portuguese'
+MARCADORES = ('\x02', '\x03')
+MARCACAO = ('<mark>', '</mark>')
+
+
+class Indice:
+    def __init__(self, nome, tabela, colunas, pesos_sqlite, pesos_postgres):
+        self.nome = nome
+        self.tabela = tabela
+        self.tabela_busca = f'core_busca_{nome}'
+        self.colunas = colunas
+        self.pesos_sqlite = pesos_sqlite
+        self.pesos_postgres = pesos_postgres
+
+
+INDICES = {
+    'proposta': Indice(
+        'proposta', 'core_proposta',
+        ('titulo', 'descricao', 'problema_resolver', 'publico_alvo',
+         'relevancia_social'),
+        (10.0, 2.0, 2.0, 1.0, 1.0),
+        ('A', 'B', 'B', 'C', 'C'),
+    ),
+    'relatorio': Indice(
+        'relatorio', 'core_relatorio',
+        ('titulo', 'conteudo'),
+        (5.0, 1.0),
+        ('A', 'B'),
+    ),
+}
+
+
+def tokens(termo):
+    return re.findall(r'\w+', termo)
+
+
+def documento_postgres(indice):
+    return ' || '.join(
+        f"setweight(to_tsvector('{IDIOMA_POSTGRES}', "
+        f"coalesce({coluna}, '')), '{peso}')"
+        for coluna, peso in zip(indice.colunas, indice.pesos_postgres)
+    )
+
+
+def destacar(trecho):
+    """``trecho`` do banco como HTML seguro, com os termos em ``<mark>``."""
+    if trecho is None:
+        return None
+    texto = html.escape(trecho)
+    for marcador, tag in zip(MARCADORES, MARCACAO):
+        texto = texto.replace(marcador, tag)
+    return texto
+
+
+def indexar(nome, ids, using=DEFAULT_DB_ALIAS):
+    """Insere ou atualiza as linhas ``ids`` a partir da tabela do modelo."""
+    indice = INDICES[nome]
+    ids = list(ids)
+    if not ids:
+        return
+    connection = connections[using]
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            colunas = ', '.join(indice.colunas)
+            cursor.execute(
+                f'DELETE FROM {indice.tabela_busca} '
+                f'WHERE rowid IN ({marcadores})', ids
+            )
+            cursor.execute(
+                f'INSERT INTO {indice.tabela_busca} (rowid, {colunas}) '
+                f'SELECT id, {colunas} FROM {indice.tabela} '
+                f'WHERE id IN ({marcadores})', ids
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {indice.tabela_busca} (id, documento) '
+                f'SELECT id, {documento_postgres(indice)} '
+                f'FROM {indice.tabela} WHERE id IN ({marcadores}) '
+                f'ON CONFLICT (id) DO UPDATE '
+                f'SET documento = EXCLUDED.documento', ids
+            )
+
+
+def remover(nome, ids, using=DEFAULT_DB_ALIAS):
+    indice = INDICES[nome]
+    ids = list(ids)
+    connection = connections[using]
+    if not ids or connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    coluna_id = 'rowid' if connection.vendor == 'sqlite' else 'id'
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {indice.tabela_busca} '
+            f'WHERE {coluna_id} IN ({marcadores})', ids
+        )
+
+
+def reconstruir(nome, modelo, lote=1000, using=DEFAULT_DB_ALIAS):
+    """Reindexa tudo em lotes de ``lote`` ids; gera o total a cada lote.
+
+    Roda numa transação só: as buscas continuam vendo o índice antigo até
+    o fim, e uma reconstrução interrompida não deixa o índice pela metade.
+    """
+    indice = INDICES[nome]
+    connection = connections[using]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {indice.tabela_busca}')
+        ids = modelo.objects.using(using).order_by('pk').values_list(
+            'pk', flat=True
+        )
+        total = 0
+        ultimo = 0
+        while True:
+            bloco = list(ids.filter(pk__gt=ultimo)[:lote])
+            if not bloco:
+                break
+            indexar(nome, bloco, using)
+            total += len(bloco)
+            ultimo = bloco[-1]
+            yield total
+
+
+def sem_relevancia(queryset):
+    # Mantém as colunas anotadas para quem lê com values()
+    return queryset.annotate(
+        relevancia=Value(None, output_field=FloatField()),
+        trecho=Value(None, output_field=CharField())
+    )
+
+
+def buscar(queryset, nome, termo):
+    """Filtra ``queryset`` pelo termo e anota ``relevancia`` e ``trecho``.
+
+    O resultado vem ordenado por relevância (maior primeiro) e desempata
+    pelo id mais recente.
+    """
+    indice = INDICES[nome]
+    palavras = tokens(termo)
+    if not palavras:
+        return sem_relevancia(queryset.none())
+
+    tabela = queryset.model._meta.db_table
+    # Pode ser uma réplica (core.roteamento)
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        # Cada palavra entre aspas evita erros de sintaxe do MATCH; o *
+        # habilita busca por prefixo ("educ" encontra "educação")
+        consulta = ' '.join(f'"{palavra}"*' for palavra in palavras)
+        pesos = ', '.join(str(peso) for peso in indice.pesos_sqlite)
+        casa = (f'FROM {indice.tabela_busca} WHERE {indice.tabela_busca} '
+                f'MATCH %s AND {indice.tabela_busca}.rowid = {tabela}.id')
+        relevancia = RawSQL(
+            f'SELECT -bm25({indice.tabela_busca}, {pesos}) {casa}',
+            [consulta]
+        )
+        trecho = RawSQL(
+            f"SELECT snippet({indice.tabela_busca}, -1, %s, %s, '…', 16) "
+            f"{casa}", [*MARCADORES, consulta]
+        )
+        ids = RawSQL(
+            f'SELECT rowid FROM {indice.tabela_busca} '
+            f'WHERE {indice.tabela_busca} MATCH %s', [consulta]
+        )
+    elif connection.vendor == 'postgresql':
+        consulta = ' & '.join(f'{palavra}:*' for palavra in palavras)
+        tsquery = f"to_tsquery('{IDIOMA_POSTGRES}', %s)"
+        relevancia = RawSQL(
+            f'SELECT ts_rank(documento, {tsquery}) '
+            f'FROM {indice.tabela_busca} '
+            f'WHERE {indice.tabela_busca}.id = {tabela}.id', [consulta]
+        )
+        texto = ', '.join(f'{tabela}.{coluna}' for coluna in indice.colunas)
+        trecho = RawSQL(
+            f"ts_headline('{IDIOMA_POSTGRES}', concat_ws(' ', {texto}), "
+            f"{tsquery}, %s)", [
+                consulta,
+                f'StartSel={MARCADORES[0]}, StopSel={MARCADORES[1]}, '
+                'MaxWords=25, MinWords=10',
+            ]
+        )
+        ids = RawSQL(
+            f'SELECT id FROM {indice.tabela_busca} '
+            f'WHERE documento @@ {tsquery}', [consulta]
+        )
+    else:
+        filtro = reduce(or_, (
+            Q(**{f'{coluna}__icontains': palavra})
+            for coluna in indice.colunas
+            for palavra in palavras
+        ))
+        return sem_relevancia(queryset.filter(filtro)).order_by('-pk')
+
+    return queryset.filter(pk__in=ids).annotate(
+        relevancia=relevancia, trecho=trecho
+    ).order_by(F('relevancia').desc(), '-pk')
+
+
+class BuscaTextualMixin:
+    """Adiciona ``?q=`` à listagem de um viewset.
+
+    Com busca ativa a ordenação passa a ser por relevância, então o modo
+    cursor (ordenado por data) fica desligado nessa requisição.
+    """
+
+    busca_parametro = 'q'
+    busca_indice = None
+
+    def termo_de_busca(self):
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get(self.busca_parametro, '').strip()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        termo = self.termo_de_busca()
+        if termo:
+            self.ordenacao_cursor = None
+            queryset = buscar(queryset, self.busca_indice, termo)
+        return queryset
@@ -0,0 +1,160 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.response import Response
+
+from .condicional import (aplicar_validadores, gerar_etag,
+                          resposta_condicional)
+
+ALIAS = 'publico'
+NAMESPACES = ('projetos', 'relatorios')
+
+
+def obter_cache():
+    return caches[ALIAS]
+
+
+def chave_versao(namespace):
+    return f'publico:{namespace}:versao'
+
+
+def versao(namespace):
+    # A versão inicial usa o relógio para que uma chave de versão
+    # despejada da memória nunca volte a apontar para entradas antigas
+    cache = obter_cache()
+    atual = cache.get(chave_versao(namespace))
+    if atual is None:
+        atual = time.time_ns()
+        cache.add(chave_versao(namespace), atual, None)
+        atual = cache.get(chave_versao(namespace), atual)
+    return atual
+
+
+def invalidar(*namespaces):
+    """Troca a versão dos namespaces; entradas antigas expiram sozinhas."""
+    agora = time.time_ns()
+    obter_cache().set_many(
+        {chave_versao(namespace): agora for namespace in namespaces}, None
+    )
+
+
+def chave_da_requisicao(namespace, versao_atual, request):
+    parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+    resumo = hashlib.md5(
+        f'{request.path}?{parametros}'.encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'publico:{namespace}:{versao_atual}:{resumo}'
+
+
+def registrar(namespace, evento):
+    cache = obter_cache()
+    chave = f'publico:{namespace}:{evento}'
+    # add() é atômico; incr() numa chave inexistente levantaria ValueError
+    if not cache.add(chave, 1, None):
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.add(chave, 1, None)
+
+
+def validadores(request, namespace):
+    """Versão do namespace, ETag e Last-Modified (o instante da versão)."""
+    versao_atual = versao(namespace)
+    etag = gerar_etag(request, namespace, versao_atual)
+    return versao_atual, etag, versao_atual // 1_000_000_000
+
+
+def ler(namespace, versao_atual, request):
+    """``response.data`` guardado, ou ``None``; conta o hit ou o miss."""
+    dados = obter_cache().get(
+        chave_da_requisicao(namespace, versao_atual, request)
+    )
+    registrar(namespace, 'misses' if dados is None else 'hits')
+    return dados
+
+
+def guardar(namespace, versao_atual, request, dados):
+    obter_cache().set(
+        chave_da_requisicao(namespace, versao_atual, request), dados
+    )
+
+
+async def executar(funcao, *args):
+    """Chama uma função deste módulo a partir de código assíncrono.
+
+    O LocMemCache não faz I/O e roda direto no event loop; os outros
+    backends vão para uma thread, como os métodos ``a*`` do Django.
+    """
+    if isinstance(obter_cache(), LocMemCache):
+        return funcao(*args)
+    return await sync_to_async(funcao, thread_sensitive=False)(*args)
+
+
+def estatisticas():
+    cache = obter_cache()
+    chaves = [
+        f'publico:{namespace}:{evento}'
+        for namespace in NAMESPACES
+        for evento in ('hits', 'misses')
+    ]
+    valores = cache.get_many(chaves)
+    resultado = {}
+    for namespace in NAMESPACES:
+        hits = valores.get(f'publico:{namespace}:hits', 0)
+        misses = valores.get(f'publico:{namespace}:misses', 0)
+        total = hits + misses
+        resultado[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return resultado
+
+
+class CachePublicoMixin:
+    """Guarda em cache o ``response.data`` das leituras públicas.
+
+    A chave combina caminho e query string com a versão do namespace, que
+    os signals de ``core.signals`` trocam quando Projeto/Relatorio mudam.
+    Só respostas 200 são guardadas; a renderização continua por requisição,
+    então a negociação de conteúdo não é afetada.
+
+    A mesma versão gera o ETag e o Last-Modified (a versão é o instante da
+    última invalidação), então um 304 sai sem tocar no banco nem no cache
+    de respostas.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.responder_com_cache(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.responder_com_cache(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def responder_com_cache(self, request, gerar, *args, **kwargs):
+        versao_atual, etag, ultima_modificacao = validadores(
+            request, self.cache_namespace
+        )
+        response = resposta_condicional(request, etag, ultima_modificacao)
+        if response is None:
+            response = self.buscar_no_cache(
+                request, versao_atual, gerar, *args, **kwargs
+            )
+        return aplicar_validadores(response, etag, ultima_modificacao)
+
+    def buscar_no_cache(self, request, versao_atual, gerar, *args, **kwargs):
+        dados = ler(self.cache_namespace, versao_atual, request)
+        if dados is not None:
+            return Response(dados)
+
+        response = gerar(request, *args, **kwargs)
+        if response.status_code == 200:
+            guardar(self.cache_namespace, versao_atual, request, response.data)
+        return response
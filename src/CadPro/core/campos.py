@@ -0,0 +1,122 @@
+"""Seleção de campos por requisição: ``?fields=`` e ``?omit=``.
+
+``?fields=id,titulo,status`` devolve só esses campos e ``?omit=descricao``
+tira campos da resposta completa. As colunas que nenhum campo pedido usa
+saem do SQL: com ``.defer()`` nas leituras com ModelSerializer e do
+``values()`` nas listagens rápidas (``core.leitura``), então os
+TextFields grandes deixam de ser lidos do banco. Nomes inexistentes
+respondem 400.
+"""
+from rest_framework.exceptions import ValidationError
+
+PARAMETRO_CAMPOS = 'fields'
+PARAMETRO_OMITIR = 'omit'
+ACOES = ('list', 'retrieve')
+
+
+def nomes(valor):
+    return [nome.strip() for nome in valor.split(',') if nome.strip()]
+
+
+def campos_pedidos(request):
+    """``(campos, omitir)`` da query string; ``campos`` é ``None`` se
+    ausente."""
+    campos = request.query_params.get(PARAMETRO_CAMPOS)
+    omitir = request.query_params.get(PARAMETRO_OMITIR, '')
+    return (None if campos is None else nomes(campos)), nomes(omitir)
+
+
+def selecionar(disponiveis, campos=None, omitir=()):
+    """Filtra ``disponiveis`` mantendo a ordem original."""
+    desconhecidos = (set(campos or ()) | set(omitir)) - set(disponiveis)
+    if desconhecidos:
+        raise ValidationError({
+            PARAMETRO_CAMPOS: (
+                f'Campos inexistentes: {", ".join(sorted(desconhecidos))}. '
+                f'Disponíveis: {", ".join(disponiveis)}.'
+            )
+        })
+    return [
+        nome for nome in disponiveis
+        if (campos is None or nome in campos) and nome not in omitir
+    ]
+
+
+class CamposDinamicosMixin:
+    """ModelSerializer que aceita ``campos=`` e ``omitir=`` no construtor."""
+
+    aceita_campos = True
+
+    def __init__(self, *args, campos=None, omitir=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is None and not omitir:
+            return
+        manter = set(selecionar(list(self.fields), campos, omitir))
+        for nome in list(self.fields):
+            if nome not in manter:
+                self.fields.pop(nome)
+
+    def colunas_dispensaveis(self, obrigatorias=()):
+        """Colunas do modelo que nenhum campo selecionado lê."""
+        origens = set()
+        for campo in self.fields.values():
+            if campo.source == '*':
+                # O campo recebe a instância inteira
+                return []
+            origens.add(campo.source.split('.')[0])
+        return [
+            campo.name for campo in self.Meta.model._meta.concrete_fields
+            if not campo.primary_key and
+            campo.name not in origens and campo.attname not in origens and
+            campo.name not in obrigatorias
+        ]
+
+
+def adiar(queryset, colunas):
+    """``defer()`` que também tira do ``select_related`` as FKs adiadas."""
+    if not colunas:
+        return queryset
+    relacionados = queryset.query.select_related
+    if isinstance(relacionados, dict):
+        mantidos = [nome for nome in relacionados if nome not in colunas]
+        queryset = queryset.select_related(None)
+        if mantidos:
+            queryset = queryset.select_related(*mantidos)
+    return queryset.defer(*colunas)
+
+
+class SelecaoDeCamposMixin:
+    """Liga ``?fields=`` / ``?omit=`` ao serializer e ao queryset da view.
+
+    Vale para ``list`` e ``retrieve``. Nunca adia as colunas de
+    ``colunas_obrigatorias`` (ex.: ``data_atualizacao`` dos validadores
+    de GET condicional) nem as da ordenação do cursor.
+    """
+
+    def selecao_de_campos(self):
+        if self.action not in ACOES:
+            return None, ()
+        return campos_pedidos(self.request)
+
+    def get_serializer(self, *args, **kwargs):
+        campos, omitir = self.selecao_de_campos()
+        aceita = getattr(self.get_serializer_class(), 'aceita_campos', False)
+        if aceita and (campos is not None or omitir):
+            kwargs.setdefault('campos', campos)
+            kwargs.setdefault('omitir', omitir)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        campos, omitir = self.selecao_de_campos()
+        classe = self.get_serializer_class()
+        if (campos is None and not omitir) or \
+                not issubclass(classe, CamposDinamicosMixin):
+            return queryset
+        obrigatorias = {
+            *getattr(self, 'colunas_obrigatorias', ()),
+            *(campo.lstrip('-')
+              for campo in getattr(self, 'ordenacao_cursor', None) or ()),
+        }
+        serializer = classe(campos=campos, omitir=omitir)
+        return adiar(queryset, serializer.colunas_dispensaveis(obrigatorias))
@@ -0,0 +1,108 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def gerar_etag(request, *partes):
+    """ETag forte: muda com a versão dos dados e com a representação.
+
+    O media type negociado entra no hash porque JSON e API navegável,
+    por exemplo, não têm os mesmos bytes.
+    """
+    media_type = getattr(request, 'accepted_media_type', '')
+    texto = '|'.join(
+        str(parte) for parte in (request.get_full_path(), media_type, *partes)
+    )
+    return quote_etag(
+        hashlib.md5(texto.encode(), usedforsecurity=False).hexdigest()
+    )
+
+
+def resposta_condicional(request, etag, ultima_modificacao=None):
+    """Devolve 304/412 quando as pré-condições pedem, ou ``None``."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=ultima_modificacao
+    )
+
+
+def aplicar_validadores(response, etag, ultima_modificacao=None):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if ultima_modificacao is not None:
+            response['Last-Modified'] = http_date(ultima_modificacao)
+    return response
+
+
+def calcular_validadores(request, objetos, partes=(), extras=()):
+    """ETag e Last-Modified de ``objetos`` (``pk`` e ``data_atualizacao``).
+
+    ``partes`` (ação e metadados da paginação) entram no ETag antes das
+    versões das linhas e ``extras`` depois.
+    """
+    versoes = [versao(objeto) for objeto in objetos]
+    atualizado = max((data for _, data in versoes), default=None)
+    etag = gerar_etag(request, *partes, *(
+        f'{pk}@{data.isoformat()}' for pk, data in versoes
+    ), *extras)
+    ultima_modificacao = int(atualizado.timestamp()) if atualizado else None
+    return etag, ultima_modificacao
+
+
+def versao(objeto):
+    # Linhas de values() (core.leitura) chegam como dicionários
+    if isinstance(objeto, dict):
+        return objeto['id'], objeto['data_atualizacao']
+    return objeto.pk, objeto.data_atualizacao
+
+
+class RequisicaoCondicionalMixin:
+    """GET condicional (ETag / Last-Modified / 304) para list e retrieve.
+
+    Os validadores saem das linhas que a view já carrega: ``pk`` e
+    ``data_atualizacao`` de cada linha da página (ou do objeto, no detalhe)
+    mais os metadados da paginação, que cobrem exclusões. Não há query
+    extra, e o 304 sai antes de instanciar o serializer. Mudanças só em
+    linhas relacionadas (ex.: o nome do usuário) não alteram o ETag.
+    """
+
+    # Lidas por validadores(); ?fields= nunca as adia (core.campos)
+    colunas_obrigatorias = ('data_atualizacao',)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objetos = list(queryset) if page is None else page
+        etag, ultima_modificacao = self.validadores(objetos)
+
+        # Uma exclusão pode não mover a data máxima da página, então na
+        # listagem só o ETag decide o 304; o Last-Modified é informativo
+        response = resposta_condicional(request, etag)
+        if response is None:
+            serializer = self.get_serializer(objetos, many=True)
+            if page is None:
+                response = Response(serializer.data)
+            else:
+                response = self.get_paginated_response(serializer.data)
+        return aplicar_validadores(response, etag, ultima_modificacao)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, ultima_modificacao = self.validadores([instance])
+
+        response = resposta_condicional(request, etag, ultima_modificacao)
+        if response is None:
+            response = Response(self.representar(instance))
+        return aplicar_validadores(response, etag, ultima_modificacao)
+
+    def representar(self, instance):
+        return self.get_serializer(instance).data
+
+    def validadores(self, objetos, *extras):
+        paginacao = ()
+        if self.action == 'list' and hasattr(self.paginator, 'assinatura'):
+            paginacao = self.paginator.assinatura()
+        return calcular_validadores(
+            self.request, objetos, (self.action, *paginacao), extras
+        )
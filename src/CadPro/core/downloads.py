@@ -0,0 +1,172 @@
+"""Download dos arquivos enviados: Range, validadores e sendfile.
+
+``responder()`` serve um FieldFile já autorizado pela view. Sem proxy,
+``FileResponse`` transmite o arquivo em blocos (o arquivo inteiro pode
+sair por ``wsgi.file_wrapper``/sendfile do servidor WSGI), com ETag,
+Last-Modified, 304 e ``Range``/``If-Range`` de um intervalo; pedidos com
+vários intervalos recebem o arquivo inteiro, como a RFC 9110 permite.
+
+Com ``ARQUIVOS['SENDFILE']`` o worker só confere a permissão e devolve o
+cabeçalho para o proxy da frente, que faz a transferência:
+
+* ``'x-accel-redirect'`` (nginx): ``X-Accel-Redirect`` com
+  ``ARQUIVOS['PREFIXO_INTERNO']`` + nome do arquivo; a location interna
+  (``internal; alias <MEDIA_ROOT>/;``) trata Range e validadores;
+* ``'x-sendfile'`` (Apache mod_xsendfile, lighttpd): ``X-Sendfile`` com
+  o caminho absoluto.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .condicional import resposta_condicional
+
+MODOS_SENDFILE = ('x-accel-redirect', 'x-sendfile')
+INSATISFAZIVEL = object()
+
+
+class Trecho:
+    """Leitor limitado a ``tamanho`` bytes a partir da posição atual."""
+
+    def __init__(self, arquivo, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def read(self, quantidade=-1):
+        if quantidade < 0 or quantidade > self.restante:
+            quantidade = self.restante
+        if quantidade <= 0:
+            return b''
+        dados = self.arquivo.read(quantidade)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def intervalo(cabecalho, tamanho):
+    """``(inicio, fim)`` inclusivo, ``None`` (ignorar) ou INSATISFAZIVEL."""
+    unidade, _, faixa = cabecalho.partition('=')
+    if unidade.strip().lower() != 'bytes' or ',' in faixa:
+        return None
+    inicio, separador, fim = faixa.strip().partition('-')
+    if not separador:
+        return None
+    try:
+        if not inicio:
+            # bytes=-N: os últimos N bytes
+            sufixo = int(fim)
+            if sufixo <= 0 or tamanho == 0:
+                return INSATISFAZIVEL
+            return max(0, tamanho - sufixo), tamanho - 1
+        inicio = int(inicio)
+        fim = int(fim) if fim else tamanho - 1
+    except ValueError:
+        return None
+    if inicio >= tamanho:
+        return INSATISFAZIVEL
+    if fim < inicio:
+        return None
+    return inicio, min(fim, tamanho - 1)
+
+
+def if_range_confere(request, etag, ultima_modificacao):
+    valor = request.headers.get('If-Range')
+    if valor is None:
+        return True
+    if valor.startswith(('"', 'W/')):
+        # If-Range só vale com ETag forte
+        return valor == etag
+    return parse_http_date_safe(valor) == ultima_modificacao
+
+
+def validadores(arquivo):
+    storage, nome = arquivo.storage, arquivo.name
+    try:
+        tamanho = storage.size(nome)
+        modificado = storage.get_modified_time(nome)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404('Arquivo não encontrado.')
+    ultima_modificacao = int(modificado.timestamp())
+    etag = quote_etag(f'{tamanho:x}-{modificado.timestamp():.6f}')
+    return tamanho, etag, ultima_modificacao
+
+
+def controle_de_cache(response, publico):
+    # no-cache: caches guardam, mas revalidam (304) a cada uso
+    if publico:
+        patch_cache_control(response, public=True, no_cache=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def cabecalhos(response, etag, ultima_modificacao, publico):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima_modificacao)
+    response['Accept-Ranges'] = 'bytes'
+    return controle_de_cache(response, publico)
+
+
+def delegar(arquivo, modo, nome_download, tipo):
+    response = HttpResponse(content_type=tipo)
+    response['Content-Disposition'] = (
+        f"inline; filename*=UTF-8''{quote(nome_download)}"
+    )
+    if modo == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.ARQUIVOS['PREFIXO_INTERNO'] + quote(arquivo.name)
+        )
+    else:
+        response['X-Sendfile'] = arquivo.path
+    return response
+
+
+def responder(request, arquivo, publico=False):
+    if not arquivo:
+        raise Http404('Nenhum arquivo enviado.')
+    nome_download = os.path.basename(arquivo.name)
+    tipo = mimetypes.guess_type(nome_download)[0] or (
+        'application/octet-stream'
+    )
+    modo = settings.ARQUIVOS['SENDFILE']
+    if modo in MODOS_SENDFILE:
+        return controle_de_cache(
+            delegar(arquivo, modo, nome_download, tipo), publico
+        )
+
+    tamanho, etag, ultima_modificacao = validadores(arquivo)
+    response = resposta_condicional(request, etag, ultima_modificacao)
+    if response is not None:
+        return cabecalhos(response, etag, ultima_modificacao, publico)
+
+    faixa = None
+    if 'Range' in request.headers and \
+            if_range_confere(request, etag, ultima_modificacao):
+        faixa = intervalo(request.headers['Range'], tamanho)
+    if faixa is INSATISFAZIVEL:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamanho}'
+        return cabecalhos(response, etag, ultima_modificacao, publico)
+
+    fluxo = arquivo.storage.open(arquivo.name, 'rb')
+    if faixa is None:
+        response = FileResponse(
+            fluxo, content_type=tipo, filename=nome_download
+        )
+    else:
+        inicio, fim = faixa
+        fluxo.seek(inicio)
+        response = FileResponse(
+            Trecho(fluxo, fim - inicio + 1), status=206,
+            content_type=tipo, filename=nome_download
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        response['Content-Length'] = str(fim - inicio + 1)
+    return cabecalhos(response, etag, ultima_modificacao, publico)
@@ -0,0 +1,233 @@
+"""Envio retomável de arquivos grandes, em pedaços.
+
+Protocolo (no espírito do tus):
+
+1. ``POST /api/envios/`` com ``alvo`` (ver ``core.arquivos.ALVOS``),
+   ``objeto_id``, ``nome_arquivo``, ``tamanho`` e, opcional, o ``sha256``
+   do arquivo inteiro;
+2. ``PATCH /api/envios/{id}/`` com o pedaço no corpo cru
+   (``application/offset+octet-stream``), ``Upload-Offset`` com os bytes
+   já aceitos e ``Upload-Checksum: sha256 <base64>`` do pedaço;
+3. ``HEAD /api/envios/{id}/`` devolve ``Upload-Offset`` para retomar
+   depois de uma queda.
+
+Cada pedaço é lido do socket em blocos direto para um arquivo próprio e
+só é aceito com o checksum certo. O último pedaço responde 202 e
+enfileira a montagem (tarefa ``montar_envio``, ver ``core.tarefas``): os
+pedaços são concatenados num arquivo temporário, conferidos contra
+``sha256`` e movidos com ``rename`` para o storage, já ligados ao
+FileField do alvo. O cliente acompanha pela tarefa ou pelo envio:
+``concluido`` verdadeiro, ou ``Upload-Offset`` de volta a 0 quando o
+arquivo montado não confere e precisa ser reenviado.
+``manage.py limpar_envios`` remove envios parados.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .arquivos import ALVOS
+from .models import EnvioParcial
+from .tarefas import FalhaDefinitiva, enfileirar, tarefa
+
+BLOCO = 64 * 1024
+SUFIXO_PEDACO = '.pedaco'
+
+
+class Conflito(Exception):
+    """O ``Upload-Offset`` não bate com os bytes já aceitos."""
+
+
+class ArquivoMontado(File):
+    # Com temporary_file_path() o FileSystemStorage move o arquivo em vez
+    # de copiá-lo (rename atômico no mesmo sistema de arquivos)
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def pasta_do_envio(envio):
+    return Path(settings.ENVIOS['PASTA']) / str(envio.pk)
+
+
+def iniciar(envio):
+    pasta_do_envio(envio).mkdir(parents=True, exist_ok=True)
+
+
+def ler_checksum(cabecalho):
+    """``sha256 <base64>`` -> digest; ``ValidationError`` se inválido."""
+    algoritmo, _, valor = (cabecalho or '').partition(' ')
+    if algoritmo.lower() != 'sha256':
+        raise ValidationError(
+            {'Upload-Checksum': 'Envie "sha256 <base64>" do pedaço.'}
+        )
+    try:
+        return base64.b64decode(valor.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValidationError({'Upload-Checksum': 'Base64 inválido.'})
+
+
+def gravar(fluxo, destino, tamanho):
+    """Copia ``tamanho`` bytes em blocos; devolve (lidos, sha256)."""
+    resumo = hashlib.sha256()
+    lidos = 0
+    while lidos < tamanho:
+        bloco = fluxo.read(min(BLOCO, tamanho - lidos))
+        if not bloco:
+            break
+        resumo.update(bloco)
+        destino.write(bloco)
+        lidos += len(bloco)
+    return lidos, resumo.digest()
+
+
+def receber_pedaco(envio, fluxo, offset, tamanho, checksum):
+    """Aceita um pedaço em ``offset``.
+
+    No último byte enfileira a montagem e devolve a tarefa; antes disso,
+    ``None``.
+    """
+    if envio.concluido or offset != envio.recebido:
+        raise Conflito(f'Offset esperado: {envio.recebido}.')
+    limite = min(
+        envio.tamanho - offset, settings.ENVIOS['TAMANHO_MAXIMO_PEDACO']
+    )
+    if not 0 < tamanho <= limite:
+        raise ValidationError(
+            {'Content-Length': f'O pedaço deve ter de 1 a {limite} bytes.'}
+        )
+
+    pasta = pasta_do_envio(envio)
+    pasta.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=pasta, suffix='.tmp', delete=False
+    ) as destino:
+        lidos, digest = gravar(fluxo, destino, tamanho)
+    try:
+        if lidos != tamanho:
+            raise ValidationError(
+                {'Content-Length': f'Recebidos {lidos} de {tamanho} bytes.'}
+            )
+        if digest != checksum:
+            raise ValidationError(
+                {'Upload-Checksum': 'Checksum do pedaço não confere.'}
+            )
+        # Dois envios do mesmo pedaço: só o primeiro avança o offset
+        aceito = EnvioParcial.objects.filter(
+            pk=envio.pk, recebido=offset, concluido=False
+        ).update(recebido=offset + lidos, data_atualizacao=timezone.now())
+        if not aceito:
+            envio.refresh_from_db()
+            raise Conflito(f'Offset esperado: {envio.recebido}.')
+        os.replace(destino.name, pasta / f'{offset:020d}{SUFIXO_PEDACO}')
+    finally:
+        if os.path.exists(destino.name):
+            os.remove(destino.name)
+
+    envio.recebido = offset + lidos
+    if envio.recebido < envio.tamanho:
+        return None
+    return enfileirar(
+        'montar_envio', {'envio_id': str(envio.pk)}, usuario=envio.usuario
+    )
+
+
+def reiniciar(envio):
+    """Descarta os pedaços; o cliente recomeça do offset 0."""
+    shutil.rmtree(pasta_do_envio(envio), ignore_errors=True)
+    envio.recebido = 0
+    envio.save(update_fields=['recebido', 'data_atualizacao'])
+
+
+def concluir(envio):
+    """Monta os pedaços e liga o arquivo ao FileField do alvo."""
+    modelo, campo = ALVOS[envio.alvo]
+    pasta = pasta_do_envio(envio)
+    with tempfile.NamedTemporaryFile(
+        dir=pasta, suffix='.montagem', delete=False
+    ) as destino:
+        resumo = hashlib.sha256()
+        for pedaco in sorted(pasta.glob(f'*{SUFIXO_PEDACO}')):
+            with open(pedaco, 'rb') as origem:
+                while bloco := origem.read(BLOCO):
+                    resumo.update(bloco)
+                    destino.write(bloco)
+        montado = destino.tell()
+    if montado != envio.tamanho or (
+        envio.sha256 and resumo.hexdigest() != envio.sha256
+    ):
+        reiniciar(envio)
+        raise ValidationError(
+            {'sha256': 'O arquivo montado não confere; reenvie do início.'}
+        )
+
+    with transaction.atomic():
+        objeto = modelo.objects.select_for_update().filter(
+            pk=envio.objeto_id
+        ).first()
+        if objeto is None:
+            raise ValidationError(
+                {'objeto_id': 'O objeto do envio não existe mais.'}
+            )
+        with open(destino.name, 'rb') as arquivo:
+            getattr(objeto, campo).save(
+                envio.nome_arquivo, ArquivoMontado(arquivo), save=False
+            )
+        # save() completo dispara os sinais (cache público, busca)
+        objeto.save()
+        envio.concluido = True
+        envio.save(update_fields=['concluido', 'data_atualizacao'])
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+# Cópia de arquivos grandes: poucas de cada vez para não saturar o disco
+@tarefa('montar_envio', limite=2, prioridade=5)
+def montar(envio_id):
+    envio = EnvioParcial.objects.filter(pk=envio_id).first()
+    if envio is None:
+        raise FalhaDefinitiva('Envio cancelado ou expirado.')
+    if not envio.concluido:
+        try:
+            concluir(envio)
+        except ValidationError as erro:
+            raise FalhaDefinitiva(' '.join(map(str, erro.detail.values())))
+    return {'envio_id': envio_id, 'concluido': True}
+
+
+def cancelar(envio):
+    shutil.rmtree(pasta_do_envio(envio), ignore_errors=True)
+    envio.delete()
+
+
+def limpar(expiracao_horas=None):
+    """Remove envios parados e pastas sem envio; devolve as contagens."""
+    if expiracao_horas is None:
+        expiracao_horas = settings.ENVIOS['EXPIRACAO_HORAS']
+    limite = timezone.now() - timedelta(hours=expiracao_horas)
+    parados = EnvioParcial.objects.filter(data_atualizacao__lt=limite)
+    removidos = 0
+    for envio in parados.iterator():
+        shutil.rmtree(pasta_do_envio(envio), ignore_errors=True)
+        removidos += 1
+    parados.delete()
+
+    orfas = 0
+    raiz = Path(settings.ENVIOS['PASTA'])
+    if raiz.is_dir():
+        ativos = {
+            str(pk) for pk in EnvioParcial.objects.values_list('pk', flat=True)
+        }
+        for pasta in raiz.iterdir():
+            if pasta.is_dir() and pasta.name not in ativos:
+                shutil.rmtree(pasta, ignore_errors=True)
+                orfas += 1
+    return {'envios': removidos, 'pastas_orfas': orfas}
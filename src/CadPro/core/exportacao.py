@@ -0,0 +1,150 @@
+"""Exportação em massa (CSV / NDJSON) com memória constante.
+
+Cada recurso vira um ``values()`` com os campos relacionados resolvidos
+por JOIN na mesma query e é percorrido com ``.iterator(chunk_size=...)``;
+as linhas saem uma a uma para ``StreamingHttpResponse`` ou para um
+arquivo, sem montar a lista inteira em memória.
+"""
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
+from django.utils import timezone
+
+from .models import Atividade, Projeto, Proposta, Relatorio
+
+TAMANHO_LOTE = 2000
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def nome_completo(prefixo):
+    return Trim(Concat(
+        f'{prefixo}__first_name', Value(' '), f'{prefixo}__last_name'
+    ))
+
+
+class Exportacao:
+    def __init__(self, modelo, campos, campo_data, campo_status=None,
+                 relacionados=None):
+        self.modelo = modelo
+        self.campos = campos
+        self.relacionados = relacionados or {}
+        self.campo_data = campo_data
+        self.campo_status = campo_status
+
+    @property
+    def colunas(self):
+        return [*self.campos, *self.relacionados]
+
+    def queryset(self, status=None, desde=None, ate=None):
+        queryset = self.modelo.objects.all()
+        if status:
+            if self.campo_status is None:
+                raise ValueError('Este recurso não tem status.')
+            validos = {codigo for codigo, _ in self.modelo.STATUS_CHOICES}
+            invalidos = set(status) - validos
+            if invalidos:
+                raise ValueError(
+                    f'Status inválido: {", ".join(sorted(invalidos))}.'
+                )
+            queryset = queryset.filter(**{f'{self.campo_status}__in': status})
+        queryset = queryset.filter(**self.filtro_de_datas(desde, ate))
+        return queryset.order_by('pk').values(
+            *self.campos, **self.relacionados
+        )
+
+    def filtro_de_datas(self, desde, ate):
+        # Em DateTimeField compara com os limites do dia no fuso local, para
+        # o banco usar o índice em vez de aplicar uma função por linha
+        campo = self.modelo._meta.get_field(self.campo_data)
+        eh_datetime = campo.get_internal_type() == 'DateTimeField'
+        filtro = {}
+        if desde:
+            filtro[f'{self.campo_data}__gte'] = (
+                inicio_do_dia(desde) if eh_datetime else desde
+            )
+        if ate:
+            if eh_datetime:
+                filtro[f'{self.campo_data}__lt'] = inicio_do_dia(
+                    ate + timedelta(days=1)
+                )
+            else:
+                filtro[f'{self.campo_data}__lte'] = ate
+        return filtro
+
+
+def inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+EXPORTACOES = {
+    'propostas': Exportacao(
+        Proposta,
+        ['id', 'titulo', 'descricao', 'problema_resolver', 'publico_alvo',
+         'relevancia_social', 'status', 'data_submissao', 'documentos',
+         'usuario'],
+        'data_submissao', 'status',
+        {
+            'usuario_nome': nome_completo('usuario'),
+            'usuario_email': F('usuario__email'),
+            'usuario_organizacao': F('usuario__organizacao'),
+        },
+    ),
+    'projetos': Exportacao(
+        Projeto,
+        ['id', 'titulo', 'descricao', 'objetivos', 'impacto_esperado',
+         'status', 'data_inicio', 'data_termino_prevista', 'data_conclusao',
+         'proposta_origem', 'professor_responsavel'],
+        'data_inicio', 'status',
+        {'professor_nome': nome_completo('professor_responsavel')},
+    ),
+    'relatorios': Exportacao(
+        Relatorio,
+        ['id', 'projeto', 'titulo', 'conteudo', 'data_relatorio',
+         'data_criacao', 'arquivo', 'publico'],
+        'data_relatorio',
+        relacionados={'projeto_titulo': F('projeto__titulo')},
+    ),
+    'atividades': Exportacao(
+        Atividade,
+        ['id', 'projeto', 'descricao', 'status', 'dataRegistro'],
+        'dataRegistro', 'status',
+        {'projeto_titulo': F('projeto__titulo')},
+    ),
+}
+
+
+class Eco:
+    """Pseudo-arquivo: ``csv.writer`` devolve a linha em vez de guardar."""
+
+    def write(self, valor):
+        return valor
+
+
+def formatar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def linhas(exportacao, queryset, formato, tamanho_lote=TAMANHO_LOTE):
+    colunas = exportacao.colunas
+    registros = queryset.iterator(chunk_size=tamanho_lote)
+    if formato == 'csv':
+        escritor = csv.writer(Eco())
+        yield escritor.writerow(colunas)
+        for registro in registros:
+            yield escritor.writerow(
+                [formatar(registro[coluna]) for coluna in colunas]
+            )
+    else:
+        for registro in registros:
+            yield json.dumps(
+                registro, cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
@@ -0,0 +1,136 @@
+"""``?include=`` no detalhe do projeto: filhos junto com o projeto.
+
+``GET /api/projetos/{id}/?include=relatorios,atividades,entregas`` traz a
+primeira página de cada coleção pedida, na mesma ordem e tamanho das
+ações aninhadas (``/api/projetos/{id}/relatorios/`` etc., paginadas e
+filtráveis), mais o total e o link da página seguinte. O total vem de
+subqueries na própria query do projeto e cada coleção é um ``Prefetch``
+fatiado, então o custo é uma query mais uma por coleção, qualquer que
+seja o tamanho do projeto.
+"""
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .models import Atividade, Entrega, Relatorio
+from .serializers import (AtividadeSerializer, EntregaSerializer,
+                          RelatorioSerializer)
+
+PARAMETRO = 'include'
+
+
+class Inclusao:
+    """Uma coleção filha do projeto, como incluída e como ação aninhada.
+
+    ``ordenacao`` segue os índices ``<modelo>_projeto_data_idx``;
+    ``filtros`` diz quais de ``status`` / ``publico`` a coleção aceita.
+    """
+
+    def __init__(self, modelo, serializer, ordenacao, filtros=()):
+        self.modelo = modelo
+        self.serializer = serializer
+        self.ordenacao = ordenacao
+        self.filtros = filtros
+
+    @property
+    def campo_data(self):
+        return self.ordenacao[0].lstrip('-')
+
+    def filtrar(self, queryset, status=None, publico=None, desde=None,
+                ate=None):
+        filtro = {}
+        if status and 'status' in self.filtros:
+            filtro['status__in'] = status
+        if publico is not None and 'publico' in self.filtros:
+            filtro['publico'] = publico
+        if desde:
+            filtro[f'{self.campo_data}__gte'] = desde
+        if ate:
+            filtro[f'{self.campo_data}__lte'] = ate
+        return queryset.filter(**filtro).order_by(*self.ordenacao)
+
+
+INCLUSOES = {
+    'relatorios': Inclusao(
+        Relatorio, RelatorioSerializer, ('-data_relatorio', '-id'),
+        filtros=('publico',)
+    ),
+    'atividades': Inclusao(
+        Atividade, AtividadeSerializer, ('-dataRegistro', '-id'),
+        filtros=('status',)
+    ),
+    'entregas': Inclusao(Entrega, EntregaSerializer, ('-dataEnvio', '-id')),
+}
+
+
+def inclusoes_pedidas(request):
+    valor = request.query_params.get(PARAMETRO, '')
+    nomes = list(dict.fromkeys(
+        nome.strip() for nome in valor.split(',') if nome.strip()
+    ))
+    invalidos = set(nomes) - set(INCLUSOES)
+    if invalidos:
+        raise ValidationError({
+            PARAMETRO: (
+                f'Inclusões inválidas: {", ".join(sorted(invalidos))}. '
+                f'Disponíveis: {", ".join(INCLUSOES)}.'
+            )
+        })
+    return nomes
+
+
+def total(modelo):
+    return Coalesce(Subquery(
+        modelo.objects.filter(projeto=OuterRef('pk')).order_by().values(
+            'projeto'
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def incluir(queryset, nomes, limite=None):
+    """Anota ``total_<nome>`` e pré-carrega ``<nome>_incluidos``."""
+    limite = limite or api_settings.PAGE_SIZE
+    for nome in nomes:
+        inclusao = INCLUSOES[nome]
+        queryset = queryset.annotate(
+            **{f'total_{nome}': total(inclusao.modelo)}
+        ).prefetch_related(Prefetch(
+            nome,
+            queryset=inclusao.modelo.objects.order_by(
+                *inclusao.ordenacao
+            )[:limite],
+            to_attr=f'{nome}_incluidos',
+        ))
+    return queryset
+
+
+def filhos(projeto, nomes):
+    """Linhas pré-carregadas, para os validadores do GET condicional."""
+    return [
+        filho for nome in nomes
+        for filho in getattr(projeto, f'{nome}_incluidos')
+    ]
+
+
+def serializar(projeto, nomes, request, limite=None):
+    limite = limite or api_settings.PAGE_SIZE
+    dados = {}
+    for nome in nomes:
+        inclusao = INCLUSOES[nome]
+        quantidade = getattr(projeto, f'total_{nome}')
+        proxima = None
+        if quantidade > limite:
+            proxima = request.build_absolute_uri(
+                reverse(f'projeto-{nome}', args=[projeto.pk])
+            ) + '?page=2'
+        dados[nome] = {
+            'count': quantidade,
+            'next': proxima,
+            'results': inclusao.serializer(
+                getattr(projeto, f'{nome}_incluidos'), many=True,
+                context={'request': request}
+            ).data,
+        }
+    return dados
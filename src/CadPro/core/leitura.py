@@ -0,0 +1,128 @@
+"""Caminho rápido de leitura para as listagens.
+
+Um ``ModelSerializer`` instancia um campo por atributo e chama
+``to_representation`` campo a campo em cada linha; em páginas grandes isso
+domina o tempo de CPU. As classes ``LeituraRapida`` fazem o mesmo papel só
+para leitura: a view troca o queryset por ``values()`` com as colunas
+exatas e cada linha vira o dicionário de saída direto, com o mesmo formato
+JSON do serializer equivalente (conferido em ``core.tests``).
+"""
+from abc import ABC, abstractmethod
+
+from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from .campos import campos_pedidos, selecionar
+
+# Os mesmos campos que o DRF usaria, para datas saírem idênticas
+# (fuso corrente, sufixo 'Z' em UTC etc.)
+data_hora = serializers.DateTimeField().to_representation
+
+
+def data(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+def opcional(conversor, valor):
+    return conversor(valor) if valor is not None else None
+
+
+def nome_completo(primeiro, ultimo):
+    # Mesma regra de AbstractUser.get_full_name
+    return f'{primeiro} {ultimo}'.strip()
+
+
+class LeituraRapida(ABC):
+    """Serializer de listagem, somente leitura, sobre dicionários.
+
+    Subclasses declaram ``colunas`` (os lookups de ``values()``; inclua as
+    colunas de ordenação do cursor e ``data_atualizacao`` quando a view usa
+    validadores), ``linha``, que monta a saída de um registro, e
+    ``espelho``, o serializer do DRF com o mesmo formato de saída.
+    ``origens`` diz quais colunas cada campo de saída lê, quando não é a
+    coluna de mesmo nome; com ``?fields=`` só essas entram no SELECT.
+    Uma subclasse sem ``linha`` falha já na definição da classe.
+    """
+
+    colunas = ()
+    origens = {}
+    espelho = None
+    many = True
+    aceita_campos = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.linha, '__isabstractmethod__', False):
+            raise TypeError(f'{cls.__name__} precisa implementar linha().')
+
+    def __init__(self, instance=None, many=True, campos=None, omitir=(),
+                 **kwargs):
+        self.instance = instance
+        self.context = kwargs.get('context', {})
+        self.selecionados = None
+        if campos is not None or omitir:
+            self.selecionados = selecionar(
+                list(self.espelho().fields), campos, omitir
+            )
+
+    @classmethod
+    def consultar(cls, queryset, campos=None, omitir=(), obrigatorias=()):
+        return queryset.values(
+            *cls.colunas_lidas(campos, omitir, obrigatorias)
+        )
+
+    @classmethod
+    def colunas_lidas(cls, campos=None, omitir=(), obrigatorias=()):
+        """``colunas`` que os campos selecionados (e a view) usam."""
+        if campos is None and not omitir:
+            return cls.colunas
+        lidas = set(obrigatorias)
+        for nome in selecionar(list(cls.espelho().fields), campos, omitir):
+            lidas.update(cls.origens.get(nome, (nome,)))
+        return tuple(coluna for coluna in cls.colunas if coluna in lidas)
+
+    @abstractmethod
+    def linha(self, registro):
+        """Dicionário de saída de um registro de ``values()``."""
+
+    @property
+    def data(self):
+        if self.selecionados is None:
+            linhas = map(self.linha, self.instance)
+        else:
+            # Colunas que não foram lidas chegam como None; os campos que
+            # dependem delas saem da linha logo em seguida
+            vazio = dict.fromkeys(self.colunas)
+            linhas = (
+                self.linha({**vazio, **registro})
+                for registro in self.instance
+            )
+            linhas = (
+                {nome: linha[nome] for nome in self.selecionados}
+                for linha in linhas
+            )
+        return ReturnList(linhas, serializer=self)
+
+
+class LeituraRapidaMixin:
+    """Usa ``values()`` na listagem quando a classe escolhida por
+    ``get_serializer_class`` é uma ``LeituraRapida``.
+
+    Com ``?fields=`` / ``?omit=`` o SELECT traz só as colunas dos campos
+    pedidos, mais ``colunas_obrigatorias`` e as da ordenação do cursor.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        classe = self.get_serializer_class()
+        if self.action == 'list' and issubclass(classe, LeituraRapida):
+            campos, omitir = campos_pedidos(self.request)
+            queryset = classe.consultar(
+                queryset, campos, omitir, obrigatorias={
+                    'id',
+                    *getattr(self, 'colunas_obrigatorias', ()),
+                    *(campo.lstrip('-') for campo in
+                      getattr(self, 'ordenacao_cursor', None) or ()),
+                }
+            )
+        return queryset
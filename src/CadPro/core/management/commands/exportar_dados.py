@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacao import EXPORTACOES, FORMATOS, TAMANHO_LOTE, linhas
+
+
+class Command(BaseCommand):
+    help = 'Exporta um recurso em CSV ou NDJSON, em streaming.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recurso', choices=sorted(EXPORTACOES))
+        parser.add_argument(
+            '--formato', choices=sorted(FORMATOS), default='csv'
+        )
+        parser.add_argument(
+            '--status', action='append',
+            help='Filtra por status. Pode repetir.'
+        )
+        parser.add_argument('--desde', type=date.fromisoformat)
+        parser.add_argument('--ate', type=date.fromisoformat)
+        parser.add_argument(
+            '--saida', help='Arquivo de destino (padrão: saída padrão).'
+        )
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+
+    def handle(self, *args, **options):
+        exportacao = EXPORTACOES[options['recurso']]
+        try:
+            queryset = exportacao.queryset(
+                status=options['status'],
+                desde=options['desde'],
+                ate=options['ate'],
+            )
+        except ValueError as erro:
+            raise CommandError(erro)
+
+        geradas = linhas(
+            exportacao, queryset, options['formato'], options['lote']
+        )
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8',
+                      newline='') as arquivo:
+                arquivo.writelines(geradas)
+        else:
+            for linha in geradas:
+                self.stdout.write(linha, ending='')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import envios
+
+
+class Command(BaseCommand):
+    help = 'Remove envios em pedaços parados e pastas de pedaços órfãs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=int, default=None,
+            help='Idade mínima do envio parado (padrão: '
+                 'ENVIOS["EXPIRACAO_HORAS"]).'
+        )
+
+    def handle(self, *args, **options):
+        removidos = envios.limpar(options['horas'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{removidos["envios"]} envios e '
+            f'{removidos["pastas_orfas"]} pastas órfãs removidos.'
+        ))
@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core import tarefas
+
+
+class Command(BaseCommand):
+    help = ('Executa as tarefas em segundo plano (core.tarefas). Rode um '
+            'ou mais processos ao lado do servidor web.')
+
+    def add_arguments(self, parser):
+        config = tarefas.configuracao()
+        parser.add_argument(
+            '--concorrencia', type=int, default=config['CONCORRENCIA'],
+            help='Tarefas executadas ao mesmo tempo por este processo '
+                 '(padrão: TAREFAS["CONCORRENCIA"]).'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=config['INTERVALO_SEGUNDOS'],
+            help='Segundos entre consultas quando a fila está vazia.'
+        )
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help='Esvazia as tarefas prontas e termina (cron, testes).'
+        )
+
+    def handle(self, *args, **options):
+        self.parar = threading.Event()
+        nome = f'{socket.gethostname()}:{os.getpid()}'
+        executadas = [0] * options['concorrencia']
+        if not options['uma_vez']:
+            for sinal in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sinal, self.encerrar)
+        tarefas.recuperar_travadas()
+
+        if options['concorrencia'] == 1:
+            self.trabalhar(f'{nome}:0', 0, executadas, options)
+        else:
+            threads = [
+                threading.Thread(
+                    target=self.trabalhar,
+                    args=(f'{nome}:{indice}', indice, executadas, options),
+                )
+                for indice in range(options['concorrencia'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(executadas)} tarefas executadas.'
+        ))
+
+    def encerrar(self, *args):
+        # Termina as tarefas em andamento antes de sair
+        self.stdout.write('Encerrando depois das tarefas em andamento...')
+        self.parar.set()
+
+    def trabalhar(self, trabalhador, indice, executadas, options):
+        while not self.parar.is_set():
+            if not options['uma_vez']:
+                # Processo longo: renova conexões como o ciclo de requisição
+                close_old_connections()
+            tarefa = tarefas.reservar(trabalhador)
+            if tarefa is not None:
+                tarefas.executar(tarefa)
+                executadas[indice] += 1
+                continue
+            if options['uma_vez']:
+                break
+            if indice == 0:
+                tarefas.recuperar_travadas()
+            self.parar.wait(options['intervalo'])
+        if threading.current_thread() is not threading.main_thread():
+            # Conexões são por thread; sem isto ficariam abertas até o GC
+            connections.close_all()
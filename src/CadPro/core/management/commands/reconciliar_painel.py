@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import painel
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero os contadores do painel dos coordenadores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Só compara com as tabelas de origem, sem gravar; falha '
+                 'se houver divergência.'
+        )
+
+    def handle(self, *args, **options):
+        divergentes = painel.divergencias()
+        for chave, armazenado, calculado in divergentes:
+            self.stdout.write(
+                f'{chave}: armazenado {armazenado}, calculado {calculado}'
+            )
+        if options['verificar']:
+            if divergentes:
+                raise CommandError(
+                    f'{len(divergentes)} contadores divergentes.'
+                )
+            self.stdout.write(self.style.SUCCESS('Contadores conferem.'))
+            return
+        total = painel.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total["contadores"]} contadores e {total["resumos"]} resumos '
+            f'recalculados ({len(divergentes)} divergências corrigidas).'
+        ))
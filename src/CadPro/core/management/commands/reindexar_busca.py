@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core import busca
+from core.models import Proposta, Relatorio
+
+MODELOS = {
+    'proposta': Proposta,
+    'relatorio': Relatorio,
+}
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os índices de busca textual em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indice', choices=sorted(MODELOS), action='append',
+            help='Índice a reconstruir (padrão: todos). Pode repetir.'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Quantidade de linhas indexadas por lote.'
+        )
+
+    def handle(self, *args, **options):
+        for nome in options['indice'] or sorted(MODELOS):
+            total = 0
+            for total in busca.reconstruir(
+                nome, MODELOS[nome], lote=options['lote']
+            ):
+                self.stdout.write(f'{nome}: {total} linhas indexadas')
+            self.stdout.write(self.style.SUCCESS(
+                f'Índice {nome} reconstruído ({total} linhas).'
+            ))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import semeadura
+from core.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Semeia usuários de todos os tipos, propostas, projetos, '
+        'relatórios, atividades e entregas sintéticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escala', type=float, default=1,
+            help=(
+                f'Multiplicador das quantidades (escala 1 = '
+                f'{semeadura.PROPOSTAS} propostas).'
+            )
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Linhas por bulk_create.'
+        )
+        parser.add_argument(
+            '--semente', type=int, default=42,
+            help='Semente do gerador aleatório (dados reproduzíveis).'
+        )
+        parser.add_argument(
+            '--senha', default=semeadura.SENHA_PADRAO,
+            help='Senha de todos os usuários semeados.'
+        )
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Remove antes os dados semeados por uma execução anterior.'
+        )
+
+    def handle(self, *args, **options):
+        if options['escala'] <= 0:
+            raise CommandError('--escala deve ser positiva.')
+        if options['limpar']:
+            removidos = semeadura.limpar()
+            self.stdout.write(f'{removidos} linhas semeadas removidas.')
+        elif Usuario.objects.filter(
+            username__startswith=f'{semeadura.PREFIXO}-'
+        ).exists():
+            raise CommandError(
+                'Já existem dados semeados; use --limpar para recriá-los.'
+            )
+
+        criados = semeadura.semear(
+            escala=options['escala'], lote=options['lote'],
+            semente=options['semente'], senha=options['senha'],
+        )
+        for modelo, total in criados.items():
+            self.stdout.write(f'{modelo}: {total}')
+        self.stdout.write(self.style.SUCCESS('Dados semeados.'))
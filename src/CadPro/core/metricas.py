@@ -0,0 +1,234 @@
+"""Métricas por rota em memória, expostas no formato texto do Prometheus.
+
+``core.middleware.MetricasMiddleware`` alimenta o registro a cada
+requisição. Os contadores são por processo: com vários workers, cada um
+expõe os seus e o Prometheus soma pelas séries (use um label de instância
+no scrape).
+"""
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from .senhas import BUCKETS_FILA
+
+BUCKETS_LATENCIA = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Acumulador da requisição corrente (ver MetricasMiddleware)
+requisicao_atual = ContextVar('metricas_requisicao', default=None)
+
+
+class MedidasDaRequisicao:
+    def __init__(self, max_sql=100):
+        self.queries = 0
+        self.tempo_db = 0.0
+        self.tempo_serializacao = 0.0
+        self.max_sql = max_sql
+        self.sql = []
+
+    def registrar_query(self, sql, duracao):
+        self.queries += 1
+        self.tempo_db += duracao
+        if len(self.sql) < self.max_sql:
+            self.sql.append((duracao, sql))
+
+
+def contar_query(execute, sql, params, many, context):
+    """``execute_wrapper`` de toda conexão (ligado em ``CoreConfig.ready``).
+
+    Soma na requisição corrente, se houver. Fica na conexão, e não no
+    middleware, porque sob ASGI o SQL roda nas threads do
+    ``sync_to_async``, cada uma com a sua conexão; a ContextVar acompanha a
+    requisição até lá.
+    """
+    medidas = requisicao_atual.get()
+    if medidas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medidas.registrar_query(sql, time.perf_counter() - inicio)
+
+
+def instrumentar_conexao(sender, connection, **kwargs):
+    # connection_created dispara a cada reconexão do mesmo wrapper
+    if contar_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_query)
+
+
+class SerieDaRota:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_LATENCIA)
+        self.contagem = 0
+        self.soma_latencia = 0.0
+        self.queries = 0
+        self.tempo_db = 0.0
+        self.tempo_serializacao = 0.0
+        self.bytes_resposta = 0
+        self.status = {}
+
+
+class Registro:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observar(self, rota, metodo, status, latencia, medidas, tamanho):
+        with self.lock:
+            serie = self.series.get((rota, metodo))
+            if serie is None:
+                serie = self.series[(rota, metodo)] = SerieDaRota()
+            for indice, limite in enumerate(BUCKETS_LATENCIA):
+                if latencia <= limite:
+                    serie.buckets[indice] += 1
+            serie.contagem += 1
+            serie.soma_latencia += latencia
+            serie.queries += medidas.queries
+            serie.tempo_db += medidas.tempo_db
+            serie.tempo_serializacao += medidas.tempo_serializacao
+            serie.bytes_resposta += tamanho
+            serie.status[status] = serie.status.get(status, 0) + 1
+
+    def limpar(self):
+        with self.lock:
+            self.series.clear()
+
+    def copia(self):
+        with self.lock:
+            return {
+                chave: (list(serie.buckets), vars(serie).copy())
+                for chave, serie in self.series.items()
+            }
+
+
+registro = Registro()
+
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def rotulos(**valores):
+    return '{' + ','.join(
+        f'{nome}="{escapar(valor)}"' for nome, valor in valores.items()
+    ) + '}'
+
+
+def metrica(linhas, nome, tipo, ajuda):
+    linhas.append(f'# HELP {nome} {ajuda}')
+    linhas.append(f'# TYPE {nome} {tipo}')
+
+
+def exportar_prometheus(estatisticas_cache=None, estatisticas_senhas=None):
+    series = sorted(registro.copia().items())
+    linhas = []
+
+    metrica(linhas, 'cadpro_http_requests_total', 'counter',
+            'Requisições por rota, método e status.')
+    for (rota, metodo), (_, serie) in series:
+        for status, total in sorted(serie['status'].items()):
+            linhas.append(
+                'cadpro_http_requests_total'
+                f'{rotulos(rota=rota, metodo=metodo, status=status)} {total}'
+            )
+
+    metrica(linhas, 'cadpro_http_request_duration_seconds', 'histogram',
+            'Latência das requisições por rota e método.')
+    for (rota, metodo), (buckets, serie) in series:
+        for limite, total in zip(BUCKETS_LATENCIA, buckets):
+            linhas.append(
+                'cadpro_http_request_duration_seconds_bucket'
+                f'{rotulos(rota=rota, metodo=metodo, le=limite)} {total}'
+            )
+        linhas.append(
+            'cadpro_http_request_duration_seconds_bucket'
+            f'{rotulos(rota=rota, metodo=metodo, le="+Inf")} '
+            f'{serie["contagem"]}'
+        )
+        base = rotulos(rota=rota, metodo=metodo)
+        linhas.append(
+            f'cadpro_http_request_duration_seconds_sum{base} '
+            f'{serie["soma_latencia"]:.6f}'
+        )
+        linhas.append(
+            f'cadpro_http_request_duration_seconds_count{base} '
+            f'{serie["contagem"]}'
+        )
+
+    contadores = (
+        ('cadpro_db_queries_total', 'queries',
+         'Queries executadas por rota e método.', '{}'),
+        ('cadpro_db_duration_seconds_total', 'tempo_db',
+         'Tempo gasto no banco por rota e método.', '{:.6f}'),
+        ('cadpro_serializer_duration_seconds_total', 'tempo_serializacao',
+         'Tempo gasto renderizando o corpo das respostas por rota e '
+         'método.', '{:.6f}'),
+        ('cadpro_response_bytes_total', 'bytes_resposta',
+         'Bytes de corpo de resposta (exceto streaming).', '{}'),
+    )
+    for nome, campo, ajuda, formato in contadores:
+        metrica(linhas, nome, 'counter', ajuda)
+        for (rota, metodo), (_, serie) in series:
+            linhas.append(
+                f'{nome}{rotulos(rota=rota, metodo=metodo)} '
+                f'{formato.format(serie[campo])}'
+            )
+
+    if estatisticas_cache is not None:
+        for evento in ('hits', 'misses'):
+            nome = f'cadpro_cache_publico_{evento}_total'
+            metrica(linhas, nome, 'counter',
+                    f'{evento} do cache das views públicas.')
+            for namespace, valores in sorted(estatisticas_cache.items()):
+                linhas.append(
+                    f'{nome}{rotulos(namespace=namespace)} {valores[evento]}'
+                )
+
+    if estatisticas_senhas is not None:
+        exportar_senhas(linhas, estatisticas_senhas)
+
+    return '\n'.join(linhas) + '\n'
+
+
+def exportar_senhas(linhas, senhas):
+    """Fila e tempo do hash de senhas (``core.senhas``)."""
+    nome = 'cadpro_senha_fila_seconds'
+    metrica(linhas, nome, 'histogram',
+            'Espera por uma vaga no pool de hash de senhas.')
+    for limite, total in zip(BUCKETS_FILA, senhas['buckets']):
+        linhas.append(f'{nome}_bucket{rotulos(le=limite)} {total}')
+    linhas.append(f'{nome}_bucket{rotulos(le="+Inf")} {senhas["hashes"]}')
+    linhas.append(f'{nome}_sum {senhas["soma_fila"]:.6f}')
+    linhas.append(f'{nome}_count {senhas["hashes"]}')
+
+    for nome, tipo, campo, ajuda, formato in (
+        ('cadpro_senha_hash_seconds_total', 'counter', 'soma_hash',
+         'Tempo gasto calculando hashes de senha.', '{:.6f}'),
+        ('cadpro_senha_recusadas_total', 'counter', 'recusados',
+         'Hashes recusados (503) por fila cheia.', '{}'),
+        ('cadpro_senha_em_andamento', 'gauge', 'em_andamento',
+         'Hashes de senha em andamento.', '{}'),
+    ):
+        metrica(linhas, nome, tipo, ajuda)
+        linhas.append(f'{nome} {formato.format(senhas[campo])}')
+
+
+def medir_serializacao(render):
+    """Envolve o ``render`` de um renderer somando o tempo na requisição
+    corrente (``core.renderers``)."""
+    @functools.wraps(render)
+    def medido(self, *args, **kwargs):
+        medidas = requisicao_atual.get()
+        if medidas is None:
+            return render(self, *args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            medidas.tempo_serializacao += time.perf_counter() - inicio
+    return medido
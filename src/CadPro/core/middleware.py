@@ -0,0 +1,254 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import roteamento
+from .metricas import MedidasDaRequisicao, registro, requisicao_atual
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+logger = logging.getLogger('core.lento')
+
+
+class NoEventLoopMixin:
+    """Sob ASGI, roda os hooks de um ``MiddlewareMixin`` no event loop.
+
+    O ``MiddlewareMixin.__acall__`` do Django manda ``process_request`` e
+    ``process_response`` para uma thread. Só para os middlewares deste
+    projeto cujos hooks são apenas CPU (sem banco nem sessão); os do
+    Django ficam com o comportamento original. Sob WSGI nada muda.
+    """
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = self.process_response(request, response)
+        return response
+
+
+class MetricasMiddleware:
+    """Mede latência, queries, tempo de banco, de serializer e bytes.
+
+    As queries são contadas por ``metricas.contar_query``, instalado em
+    toda conexão. Requisições acima de ``METRICAS['LIMITE_LENTO_MS']`` vão
+    para o logger ``core.lento`` com o SQL executado.
+
+    Este e o ``ReplicaMiddleware`` funcionam nos dois modos: um middleware
+    só síncrono obrigaria o Django, sob ASGI, a trocar de thread no meio da
+    cadeia em toda requisição.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medidas = MedidasDaRequisicao()
+        marcador = requisicao_atual.set(medidas)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            requisicao_atual.reset(marcador)
+        self.observar(request, response, medidas, inicio)
+        return response
+
+    async def __acall__(self, request):
+        medidas = MedidasDaRequisicao()
+        marcador = requisicao_atual.set(medidas)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            requisicao_atual.reset(marcador)
+        self.observar(request, response, medidas, inicio)
+        return response
+
+    def observar(self, request, response, medidas, inicio):
+        latencia = time.perf_counter() - inicio
+        rota = self.nome_da_rota(request)
+        tamanho = 0 if response.streaming else len(response.content)
+        registro.observar(
+            rota, request.method, response.status_code, latencia, medidas,
+            tamanho
+        )
+        limite = settings.METRICAS['LIMITE_LENTO_MS'] / 1000
+        if latencia > limite:
+            self.registrar_lenta(request, rota, latencia, medidas)
+
+    @staticmethod
+    def nome_da_rota(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'nao_resolvida'
+        return match.view_name or match.route
+
+    @staticmethod
+    def registrar_lenta(request, rota, latencia, medidas):
+        consultas = '\n'.join(
+            f'  [{duracao * 1000:.1f}ms] {sql}'
+            for duracao, sql in medidas.sql
+        )
+        logger.warning(
+            'Requisição lenta: %s %s (%s) %.1fms, %d queries em %.1fms, '
+            'serializer %.1fms\n%s',
+            request.method, request.get_full_path(), rota, latencia * 1000,
+            medidas.queries, medidas.tempo_db * 1000,
+            medidas.tempo_serializacao * 1000, consultas
+        )
+
+
+def codificacoes_aceitas(request):
+    """Codificações do ``Accept-Encoding`` com q > 0."""
+    aceitas = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nome, _, parametros = item.partition(';')
+        qualidade = parametros.strip().removeprefix('q=') or '1'
+        try:
+            if float(qualidade) > 0:
+                aceitas.add(nome.strip().lower())
+        except ValueError:
+            continue
+    return aceitas
+
+
+class CompressaoMiddleware(NoEventLoopMixin, GZipMiddleware):
+    """Comprime respostas com Brotli quando o cliente aceita, senão gzip.
+
+    Respostas menores que ``COMPRESSAO['MINIMO_BYTES']`` não compensam e
+    saem como estão. O gzip é o do Django (com os bytes aleatórios contra
+    BREACH); o Brotli só é oferecido se a biblioteca ``brotli`` existir.
+    Comprimir é só CPU, então sob ASGI roda no event loop.
+    """
+
+    def process_response(self, request, response):
+        config = settings.COMPRESSAO
+        if not response.streaming and \
+                len(response.content) < config['MINIMO_BYTES']:
+            return response
+        # Downloads com Range (core.downloads) precisam dos bytes originais
+        if response.has_header('Content-Encoding') or \
+                response.has_header('Accept-Ranges'):
+            return response
+
+        algoritmos = config['ALGORITMOS']
+        if brotli is not None and 'br' in algoritmos and \
+                'br' in codificacoes_aceitas(request):
+            return self.comprimir_brotli(response, config['NIVEL_BROTLI'])
+        if 'gzip' in algoritmos:
+            return super().process_response(request, response)
+        return response
+
+    def comprimir_brotli(self, response, nivel):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            response.streaming_content = self.sequencia_brotli(
+                response, nivel
+            )
+            del response.headers['Content-Length']
+        else:
+            comprimido = brotli.compress(response.content, quality=nivel)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        # O corpo mudou: como no GZipMiddleware, o ETag forte vira fraco
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def sequencia_brotli(response, nivel):
+        original = response.streaming_content
+        compressor = brotli.Compressor(quality=nivel)
+        if response.is_async:
+            async def comprimir():
+                async for parte in original:
+                    yield compressor.process(parte)
+                yield compressor.finish()
+            return comprimir()
+
+        def comprimir():
+            for parte in original:
+                yield compressor.process(parte)
+            yield compressor.finish()
+        return comprimir()
+
+
+class ReplicaMiddleware:
+    """Liga ``core.roteamento`` à requisição.
+
+    Escolhe a réplica em ``process_view``, quando a view já é conhecida, e
+    responde a quem escreveu com o cookie que o prende ao primário.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Um process_view síncrono seria chamado numa thread
+            self.process_view = self.process_view_async
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado = roteamento.EstadoDaRequisicao()
+        marcador = roteamento.requisicao_atual.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            roteamento.requisicao_atual.reset(marcador)
+        return self.fixar_no_primario(estado, response)
+
+    async def __acall__(self, request):
+        estado = roteamento.EstadoDaRequisicao()
+        marcador = roteamento.requisicao_atual.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            roteamento.requisicao_atual.reset(marcador)
+        return self.fixar_no_primario(estado, response)
+
+    @staticmethod
+    def fixar_no_primario(estado, response):
+        if estado.escreveu and settings.REPLICAS['ALIASES']:
+            response.set_cookie(
+                roteamento.COOKIE, '1',
+                max_age=settings.REPLICAS['JANELA_SEGUNDOS'],
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        estado = roteamento.requisicao_atual.get()
+        if estado is not None:
+            estado.replica = roteamento.escolher_replica(request, view_func)
+
+    async def process_view_async(self, request, view_func, view_args,
+                                 view_kwargs):
+        ReplicaMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
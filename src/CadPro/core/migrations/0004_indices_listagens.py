@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projeto',
+            index=models.Index(fields=['-data_inicio'], name='projeto_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projeto',
+            index=models.Index(condition=models.Q(('status', 'em_execucao')), fields=['-data_inicio'], name='projeto_execucao_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposta',
+            index=models.Index(fields=['usuario', '-data_submissao'], name='proposta_usuario_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposta',
+            index=models.Index(fields=['-data_submissao'], name='proposta_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposta',
+            index=models.Index(fields=['status', '-data_submissao'], name='proposta_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='relatorio',
+            index=models.Index(condition=models.Q(('publico', True)), fields=['-data_relatorio'], name='relatorio_publico_data_idx'),
+        ),
+    ]
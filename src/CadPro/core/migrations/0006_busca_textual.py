@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Mantido em sincronia com core/busca.py (INDICES)
+INDICES = {
+    'core_busca_proposta': (
+        'core_proposta',
+        {'titulo': 'A', 'descricao': 'B', 'problema_resolver': 'B',
+         'publico_alvo': 'C', 'relevancia_social': 'C'},
+    ),
+    'core_busca_relatorio': (
+        'core_relatorio',
+        {'titulo': 'A', 'conteudo': 'B'},
+    ),
+}
+
+
+def criar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for tabela_busca, (tabela, colunas) in INDICES.items():
+        nomes = ', '.join(colunas)
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {tabela_busca} USING fts5('
+                f"{nomes}, tokenize='unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(
+                f'INSERT INTO {tabela_busca} (rowid, {nomes}) '
+                f'SELECT id, {nomes} FROM {tabela}'
+            )
+        elif vendor == 'postgresql':
+            documento = ' || '.join(
+                f"setweight(to_tsvector('portuguese', coalesce({coluna}, '')),"
+                f" '{peso}')"
+                for coluna, peso in colunas.items()
+            )
+            schema_editor.execute(
+                f'CREATE TABLE {tabela_busca} ('
+                f'id bigint PRIMARY KEY, documento tsvector NOT NULL)'
+            )
+            schema_editor.execute(
+                f'CREATE INDEX {tabela_busca}_gin '
+                f'ON {tabela_busca} USING GIN (documento)'
+            )
+            schema_editor.execute(
+                f'INSERT INTO {tabela_busca} (id, documento) '
+                f'SELECT id, {documento} FROM {tabela}'
+            )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for tabela_busca in INDICES:
+            schema_editor.execute(f'DROP TABLE IF EXISTS {tabela_busca}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_data_atualizacao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
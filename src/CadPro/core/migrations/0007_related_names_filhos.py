@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='atividade',
+            name='projeto',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='atividades', to='core.projeto'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='entrega',
+            name='projeto',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='entregas', to='core.projeto'
+            ),
+        ),
+    ]
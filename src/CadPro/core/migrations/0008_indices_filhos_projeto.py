@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_related_names_filhos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['projeto', '-dataRegistro', '-id'], name='atividade_projeto_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['projeto', '-dataEnvio', '-id'], name='entrega_projeto_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='relatorio',
+            index=models.Index(fields=['projeto', '-data_relatorio', '-id'], name='relatorio_projeto_data_idx'),
+        ),
+    ]
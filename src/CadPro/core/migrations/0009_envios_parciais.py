@@ -0,0 +1,33 @@
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indices_filhos_projeto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioParcial',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('alvo', models.CharField(choices=[('proposta.documentos', 'Documentos da proposta'), ('entrega.arquivo', 'Arquivo da entrega'), ('relatorio.arquivo', 'Arquivo do relatório')], max_length=30)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('nome_arquivo', models.CharField(max_length=200)),
+                ('tamanho', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('recebido', models.PositiveBigIntegerField(default=0)),
+                ('concluido', models.BooleanField(default=False)),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['data_atualizacao'], name='envio_atualizacao_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+# Mantido em sincronia com core/painel.py (contagens)
+STATUS = {
+    'propostas': ('Proposta', ['enviada', 'em_analise', 'aprovada', 'rejeitada']),
+    'projetos': ('Projeto', ['em_execucao', 'concluido', 'suspenso']),
+    'atividades': ('Atividade', ['pendente', 'concluida']),
+}
+CAMPOS_ATIVIDADE = {'pendente': 'pendentes', 'concluida': 'concluidas'}
+
+
+def preencher(apps, schema_editor):
+    Contador = apps.get_model('core', 'Contador')
+    ResumoAtividades = apps.get_model('core', 'ResumoAtividades')
+    Atividade = apps.get_model('core', 'Atividade')
+    Proposta = apps.get_model('core', 'Proposta')
+    banco = schema_editor.connection.alias
+
+    contadores = {}
+    for grupo, (nome, todos) in STATUS.items():
+        contadores.update({(grupo, status): 0 for status in todos})
+        por_status = apps.get_model('core', nome).objects.using(banco).values(
+            'status'
+        ).annotate(total=Count('pk')).order_by()
+        for linha in por_status:
+            contadores[(grupo, linha['status'])] = linha['total']
+    por_mes = Proposta.objects.using(banco).annotate(
+        mes=TruncMonth('data_submissao')
+    ).values('mes').annotate(total=Count('pk')).order_by()
+    for linha in por_mes:
+        chave = timezone.localtime(linha['mes']).strftime('%Y-%m')
+        contadores[('submissoes', chave)] = linha['total']
+    Contador.objects.using(banco).bulk_create([
+        Contador(grupo=grupo, chave=chave, valor=valor)
+        for (grupo, chave), valor in contadores.items()
+    ])
+
+    resumos = {}
+    por_projeto = Atividade.objects.using(banco).values('projeto_id', 'status').annotate(
+        total=Count('pk')
+    ).order_by()
+    for linha in por_projeto:
+        resumo = resumos.setdefault(
+            linha['projeto_id'], ResumoAtividades(projeto_id=linha['projeto_id'])
+        )
+        setattr(resumo, CAMPOS_ATIVIDADE[linha['status']], linha['total'])
+    ResumoAtividades.objects.using(banco).bulk_create(resumos.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_envios_parciais'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupo', models.CharField(max_length=30)),
+                ('chave', models.CharField(max_length=30)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('grupo', 'chave'), name='contador_grupo_chave_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoAtividades',
+            fields=[
+                ('projeto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_atividades', serialize=False, to='core.projeto')),
+                ('pendentes', models.IntegerField(default=0)),
+                ('concluidas', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-pendentes', 'projeto'], name='resumo_pendentes_idx')],
+            },
+        ),
+        migrations.RunPython(preencher, migrations.RunPython.noop),
+    ]
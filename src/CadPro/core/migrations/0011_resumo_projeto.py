@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Q
+
+
+def preencher(apps, schema_editor):
+    # Todo projeto passa a ter resumo; as datas saem de um único GROUP BY
+    Projeto = apps.get_model('core', 'Projeto')
+    Relatorio = apps.get_model('core', 'Relatorio')
+    ResumoProjeto = apps.get_model('core', 'ResumoProjeto')
+    banco = schema_editor.connection.alias
+
+    existentes = set(
+        ResumoProjeto.objects.using(banco).values_list('pk', flat=True)
+    )
+    ResumoProjeto.objects.using(banco).bulk_create([
+        ResumoProjeto(projeto_id=pk)
+        for pk in Projeto.objects.using(banco).values_list('pk', flat=True)
+        if pk not in existentes
+    ])
+    datas = Relatorio.objects.using(banco).values('projeto_id').annotate(
+        ultimo=Max('data_relatorio'),
+        ultimo_publico=Max('data_relatorio', filter=Q(publico=True)),
+    ).order_by()
+    for linha in datas:
+        ResumoProjeto.objects.using(banco).filter(
+            projeto_id=linha['projeto_id']
+        ).update(
+            ultimo_relatorio=linha['ultimo'],
+            ultimo_relatorio_publico=linha['ultimo_publico'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_painel_contadores'),
+    ]
+
+    operations = [
+        migrations.RenameModel('ResumoAtividades', 'ResumoProjeto'),
+        migrations.AlterField(
+            model_name='resumoprojeto',
+            name='projeto',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='core.projeto'),
+        ),
+        migrations.AddField(
+            model_name='resumoprojeto',
+            name='ultimo_relatorio',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resumoprojeto',
+            name='ultimo_relatorio_publico',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(preencher, migrations.RunPython.noop),
+    ]
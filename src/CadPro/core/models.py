@@ -1,5 +1,8 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 
 
 class Usuario(AbstractUser):
@@ -28,7 +31,23 @@ class Usuario(AbstractUser):
         return f"{self.username} - {self.get_tipo_usuario_display()}"
 
 
-class Proposta(models.Model):
+class GravacaoAtomica:
+    """``save()`` numa transação que inclui os signals de post_save.
+
+    Os contadores de ``core.painel`` são gravados pelos signals e precisam
+    entrar ou sair junto com a linha. O ``delete()`` do Django já roda numa
+    transação com os signals de post_delete.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Proposta(GravacaoAtomica, models.Model):
     STATUS_CHOICES = [
         ('enviada', 'Enviada'),
         ('em_analise', 'Em Análise'),
@@ -51,19 +70,38 @@ class Proposta(models.Model):
     data_submissao: models.DateTimeField = models.DateTimeField(
         auto_now_add=True
     )
+    data_atualizacao: models.DateTimeField = models.DateTimeField(
+        auto_now=True
+    )
     documentos: models.FileField = models.FileField(
         upload_to='documentos_propostas/',
         blank=True,
         null=True
     )
 
+    class Meta:
+        # Índices alinhados às ordenações de PropostaViewSet
+        indexes = [
+            models.Index(
+                fields=['usuario', '-data_submissao'],
+                name='proposta_usuario_data_idx'
+            ),
+            models.Index(
+                fields=['-data_submissao'], name='proposta_data_idx'
+            ),
+            models.Index(
+                fields=['status', '-data_submissao'],
+                name='proposta_status_data_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.titulo
 
 
 # Os outros modelos (Projeto, Relatorio, Atividade, Entrega) permanecem os mesmos
 # mas atualizamos o campo professor_responsavel para ForeignKey
-class Projeto(models.Model):
+class Projeto(GravacaoAtomica, models.Model):
     STATUS_CHOICES = [
         ('em_execucao', 'Em Execução'),
         ('concluido', 'Concluído'),
@@ -93,7 +131,19 @@ class Projeto(models.Model):
         limit_choices_to={'tipo_usuario': 'professor'},
         related_name='projetos_como_professor'
     )
-    
+    data_atualizacao: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-data_inicio'], name='projeto_inicio_idx'),
+            # Índice parcial: a vitrine pública só lista projetos em execução
+            models.Index(
+                fields=['-data_inicio'],
+                name='projeto_execucao_inicio_idx',
+                condition=models.Q(status='em_execucao')
+            ),
+        ]
+
     def __str__(self):
         return self.titulo
 
@@ -106,33 +156,251 @@ class Relatorio(models.Model):
     conteudo: models.TextField = models.TextField()
     data_relatorio: models.DateField = models.DateField()
     data_criacao: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    data_atualizacao: models.DateTimeField = models.DateTimeField(auto_now=True)
     arquivo: models.FileField = models.FileField(upload_to='relatorios/', blank=True, null=True)
     publico: models.BooleanField = models.BooleanField(default=False)  # Adicionar este campo
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-data_relatorio'],
+                name='relatorio_publico_data_idx',
+                condition=models.Q(publico=True)
+            ),
+            # Ação aninhada /api/projetos/{id}/relatorios/
+            models.Index(
+                fields=['projeto', '-data_relatorio', '-id'],
+                name='relatorio_projeto_data_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"Relatório {self.id} - {self.projeto.titulo}"
 
 
 class Entrega(models.Model):
-    projeto: models.ForeignKey = models.ForeignKey(Projeto, on_delete=models.CASCADE)
+    projeto: models.ForeignKey = models.ForeignKey(
+        Projeto, on_delete=models.CASCADE, related_name='entregas'
+    )
     descricao: models.TextField = models.TextField()
     arquivo: models.FileField = models.FileField(upload_to='entregas/')
     dataEnvio: models.DateField = models.DateField(auto_now_add=True)
+    data_atualizacao: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['projeto', '-dataEnvio', '-id'],
+                name='entrega_projeto_data_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Entrega {self.id} - {self.projeto.titulo}"
 
 
-class Atividade(models.Model):
+class Atividade(GravacaoAtomica, models.Model):
     STATUS_CHOICES = [
         ('pendente', 'Pendente'),
         ('concluida', 'Concluída'),
     ]
 
-    projeto: models.ForeignKey = models.ForeignKey(Projeto, on_delete=models.CASCADE)
+    projeto: models.ForeignKey = models.ForeignKey(
+        Projeto, on_delete=models.CASCADE, related_name='atividades'
+    )
     descricao: models.TextField = models.TextField()
     status: models.CharField = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
     dataRegistro: models.DateField = models.DateField(auto_now_add=True)
+    data_atualizacao: models.DateTimeField = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['projeto', '-dataRegistro', '-id'],
+                name='atividade_projeto_data_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Atividade {self.id} - {self.projeto.titulo}"
+
+
+class EnvioParcial(models.Model):
+    """Envio retomável em andamento (ver core.envios)."""
+
+    ALVO_CHOICES = [
+        ('proposta.documentos', 'Documentos da proposta'),
+        ('entrega.arquivo', 'Arquivo da entrega'),
+        ('relatorio.arquivo', 'Arquivo do relatório'),
+    ]
+
+    id: models.UUIDField = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    usuario: models.ForeignKey = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name='envios'
+    )
+    alvo: models.CharField = models.CharField(
+        max_length=30, choices=ALVO_CHOICES
+    )
+    objeto_id: models.PositiveBigIntegerField = (
+        models.PositiveBigIntegerField()
+    )
+    nome_arquivo: models.CharField = models.CharField(max_length=200)
+    tamanho: models.PositiveBigIntegerField = (
+        models.PositiveBigIntegerField()
+    )
+    # SHA-256 (hex) do arquivo inteiro, conferido na montagem
+    sha256: models.CharField = models.CharField(max_length=64, blank=True)
+    recebido: models.PositiveBigIntegerField = (
+        models.PositiveBigIntegerField(default=0)
+    )
+    concluido: models.BooleanField = models.BooleanField(default=False)
+    data_criacao: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True
+    )
+    data_atualizacao: models.DateTimeField = models.DateTimeField(
+        auto_now=True
+    )
+
+    class Meta:
+        indexes = [
+            # Coleta de envios parados (manage.py limpar_envios)
+            models.Index(
+                fields=['data_atualizacao'], name='envio_atualizacao_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Envio {self.id} - {self.nome_arquivo}"
+
+
+class Contador(models.Model):
+    """Contagem mantida a cada escrita para o painel (ver core.painel)."""
+
+    grupo: models.CharField = models.CharField(max_length=30)
+    chave: models.CharField = models.CharField(max_length=30)
+    valor: models.BigIntegerField = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['grupo', 'chave'], name='contador_grupo_chave_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.grupo}/{self.chave}: {self.valor}"
+
+
+def percentual_concluido(pendentes, concluidas):
+    """Atividades concluídas em % do total; ``None`` sem atividades."""
+    total = pendentes + concluidas
+    return round(100 * concluidas / total) if total else None
+
+
+class ResumoProjeto(models.Model):
+    """Contagens do projeto mantidas a cada escrita (ver core.painel).
+
+    Atividades pendentes e concluídas e a data do último relatório (de
+    todos e só dos públicos), lidas num JOIN pelas listagens de projetos.
+    """
+
+    projeto: models.OneToOneField = models.OneToOneField(
+        Projeto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumo'
+    )
+    pendentes: models.IntegerField = models.IntegerField(default=0)
+    concluidas: models.IntegerField = models.IntegerField(default=0)
+    ultimo_relatorio: models.DateField = models.DateField(
+        null=True, blank=True
+    )
+    ultimo_relatorio_publico: models.DateField = models.DateField(
+        null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # /api/painel/atividades/ lista primeiro quem tem mais pendências
+            models.Index(
+                fields=['-pendentes', 'projeto'], name='resumo_pendentes_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Resumo do projeto {self.projeto_id}"
+
+    @property
+    def total(self):
+        return self.pendentes + self.concluidas
+
+    @property
+    def progresso(self):
+        return percentual_concluido(self.pendentes, self.concluidas)
+
+
+class Tarefa(models.Model):
+    """Trabalho em segundo plano na fila do banco (ver core.tarefas)."""
+
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+
+    tipo: models.CharField = models.CharField(max_length=50)
+    argumentos: models.JSONField = models.JSONField(default=dict)
+    status: models.CharField = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default='pendente'
+    )
+    # Maior primeiro
+    prioridade: models.SmallIntegerField = models.SmallIntegerField(
+        default=0
+    )
+    tentativas: models.PositiveSmallIntegerField = (
+        models.PositiveSmallIntegerField(default=0)
+    )
+    max_tentativas: models.PositiveSmallIntegerField = (
+        models.PositiveSmallIntegerField(default=5)
+    )
+    # Início da próxima tentativa; avança a cada falha (backoff)
+    executar_apos: models.DateTimeField = models.DateTimeField(
+        default=timezone.now
+    )
+    # Quem reservou a tentativa atual; só ele grava o desfecho
+    reserva: models.CharField = models.CharField(max_length=100, blank=True)
+    reservada_em: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True
+    )
+    resultado: models.JSONField = models.JSONField(null=True, blank=True)
+    erro: models.TextField = models.TextField(blank=True)
+    usuario: models.ForeignKey = models.ForeignKey(
+        Usuario, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='tarefas'
+    )
+    data_criacao: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True
+    )
+    data_conclusao: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # Reserva: pendentes por prioridade e horário
+            models.Index(
+                fields=['status', '-prioridade', 'executar_apos'],
+                name='tarefa_fila_idx'
+            ),
+            # /api/tarefas/ de cada usuário
+            models.Index(
+                fields=['usuario', '-data_criacao'],
+                name='tarefa_usuario_data_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.status})"
@@ -0,0 +1,47 @@
+"""E-mails ao autor da proposta, enviados pela fila de ``core.tarefas``.
+
+``decisao()`` roda na transação que aprova ou rejeita e só enfileira;
+o envio acontece no worker, com novas tentativas se o SMTP falhar.
+"""
+from django.core.mail import send_mail
+
+from .models import Proposta
+from .tarefas import enfileirar_varias, tarefa
+
+ASSUNTOS = {
+    'aprovada': 'Sua proposta foi aprovada',
+    'rejeitada': 'Sua proposta não foi aprovada',
+}
+MENSAGENS = {
+    'aprovada': (
+        'A proposta "{titulo}" foi aprovada e virou um projeto de '
+        'extensão. Acompanhe o andamento no sistema.'
+    ),
+    'rejeitada': (
+        'A proposta "{titulo}" foi analisada e não foi aprovada desta vez.'
+    ),
+}
+
+
+def decisao(ids, resultado):
+    """Enfileira um e-mail por proposta decidida."""
+    enfileirar_varias('notificar_decisao', [
+        {'proposta_id': pk, 'decisao': resultado} for pk in ids
+    ])
+
+
+# Limite baixo para não abrir conexões demais com o servidor de e-mail
+@tarefa('notificar_decisao', limite=4)
+def enviar_decisao(proposta_id, decisao):
+    proposta = Proposta.objects.select_related('usuario').filter(
+        pk=proposta_id
+    ).first()
+    if proposta is None or not proposta.usuario.email:
+        return {'enviado': False}
+    send_mail(
+        ASSUNTOS[decisao],
+        f'Olá, {proposta.usuario.get_full_name() or proposta.usuario}.\n\n'
+        + MENSAGENS[decisao].format(titulo=proposta.titulo),
+        None, [proposta.usuario.email]
+    )
+    return {'enviado': True}
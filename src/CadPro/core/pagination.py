@@ -0,0 +1,205 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaginacaoKeyset(BasePagination):
+    """Paginação por cursor (keyset) para rolagem infinita.
+
+    Usa a ordenação declarada em ``view.ordenacao_cursor`` (a última
+    coluna precisa ser única, normalmente ``-id``) e filtra a próxima
+    página com ``WHERE (data, id) < (ultima_data, ultimo_id)``. Não roda
+    ``COUNT(*)`` nem ``OFFSET``, então toda página custa o mesmo.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.concluir(list(self.preparar(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        fatia = self.preparar(queryset, request, view)
+        return self.concluir([linha async for linha in fatia.aiterator()])
+
+    def preparar(self, queryset, request, view):
+        self.request = request
+        self.ordenacao = view.ordenacao_cursor
+        posicao = self.decodificar_cursor(
+            request.query_params.get(self.cursor_query_param), queryset.model
+        )
+        queryset = queryset.order_by(*self.ordenacao)
+        if posicao is not None:
+            queryset = queryset.filter(self.filtro_apos(posicao))
+        # Uma linha a mais só para saber se existe próxima página
+        return queryset[:self.page_size + 1]
+
+    def concluir(self, resultados):
+        self.tem_proxima = len(resultados) > self.page_size
+        self.pagina = resultados[:self.page_size]
+        return self.pagina
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        ultimo = self.pagina[-1]
+        posicao = [
+            self.valor_do_campo(ultimo, campo.lstrip('-'))
+            for campo in self.ordenacao
+        ]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.codificar_cursor(posicao)
+        )
+
+    def filtro_apos(self, posicao):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y)
+        filtro = Q()
+        iguais = {}
+        for campo, valor in zip(self.ordenacao, posicao):
+            nome = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            filtro |= Q(**iguais, **{f'{nome}__{operador}': valor})
+            iguais[nome] = valor
+        return filtro
+
+    @staticmethod
+    def valor_do_campo(objeto, nome):
+        # Linhas de values() (core.leitura) chegam como dicionários
+        if isinstance(objeto, dict):
+            valor = objeto[nome]
+        else:
+            valor = getattr(objeto, nome)
+        return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+    @staticmethod
+    def codificar_cursor(posicao):
+        texto = json.dumps(posicao, separators=(',', ':'))
+        return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+    def decodificar_cursor(self, cursor, modelo):
+        if not cursor:
+            return None
+        try:
+            preenchido = cursor + '=' * (-len(cursor) % 4)
+            posicao = json.loads(base64.urlsafe_b64decode(preenchido))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(posicao, list) or len(posicao) != len(self.ordenacao):
+            raise NotFound(self.invalid_cursor_message)
+        # O cursor vem do cliente: cada valor passa pelo campo da ordenação
+        # antes de chegar ao WHERE
+        try:
+            return [
+                self.converter(
+                    modelo._meta.get_field(campo.lstrip('-')), valor
+                )
+                for campo, valor in zip(self.ordenacao, posicao)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def converter(campo, valor):
+        if valor is None:
+            # Comparar com NULL não ordena; as colunas do cursor são NOT NULL
+            raise ValueError('Valor nulo no cursor.')
+        if isinstance(valor, (dict, list)):
+            raise TypeError('Valor composto no cursor.')
+        return campo.to_python(valor)
+
+
+class PaginacaoPadrao(PageNumberPagination):
+    """Paginação por número de página, com modo cursor opcional.
+
+    Views que declaram ``ordenacao_cursor`` aceitam ``?cursor=`` (vazio
+    para a primeira página) e passam a usar ``PaginacaoKeyset``; sem o
+    parâmetro, a resposta continua com ``count``/``next``/``previous``.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.usa_cursor(request, view):
+            self.keyset = PaginacaoKeyset()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` com o ORM assíncrono (core.assincrono)."""
+        if self.usa_cursor(request, view):
+            self.keyset = PaginacaoKeyset()
+            return await self.keyset.apaginate_queryset(
+                queryset, request, view
+            )
+        self.keyset = None
+        self.request = request
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request)
+        )
+        # count é cached_property: já preenchido, o Paginator não consulta
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.page.object_list = [
+            linha async for linha in self.page.object_list.aiterator()
+        ]
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def assinatura(self):
+        """Metadados da página atual que entram no ETag da listagem."""
+        if self.keyset is not None:
+            return ('cursor', self.keyset.tem_proxima)
+        return ('pagina', self.page.number, self.page.paginator.count)
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return {}
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.keyset is not None:
+            return ''
+        return super().to_html()
+
+    @staticmethod
+    def usa_cursor(request, view):
+        return (
+            getattr(view, 'ordenacao_cursor', None) is not None and
+            PaginacaoKeyset.cursor_query_param in request.query_params
+        )
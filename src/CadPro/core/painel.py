@@ -0,0 +1,268 @@
+"""Painel dos coordenadores: contagens mantidas a cada escrita.
+
+Em vez de agregar as tabelas inteiras a cada carga do painel, guardamos:
+
+* ``Contador`` por ``(grupo, chave)``: propostas e projetos por status,
+  atividades por status e propostas submetidas por mês (``AAAA-MM``);
+* ``ResumoProjeto``: atividades pendentes e concluídas de cada projeto e
+  a data do último relatório, exibidas nas listagens de projetos.
+
+Os signals de ``core.signals`` somam e subtraem na mesma transação do
+``save()``/``delete()`` (ver ``models.GravacaoAtomica``); quem escreve em
+lote (``core.aprovacao``, ``core.semeadura``) ajusta os contadores por
+conta própria. A migração 0010 preenche as tabelas com os dados
+existentes, e ``manage.py reconciliar_painel`` recalcula tudo das tabelas
+de origem.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (Atividade, Contador, Projeto, Proposta, Relatorio,
+                     ResumoProjeto)
+
+MESES_NO_PAINEL = 12
+CAMPOS_ATIVIDADE = {'pendente': 'pendentes', 'concluida': 'concluidas'}
+CAMPOS_RELATORIO = ('ultimo_relatorio', 'ultimo_relatorio_publico')
+CAMPOS_RESUMO = (*CAMPOS_ATIVIDADE.values(), *CAMPOS_RELATORIO)
+STATUS = {
+    'propostas': [status for status, _ in Proposta.STATUS_CHOICES],
+    'projetos': [status for status, _ in Projeto.STATUS_CHOICES],
+    'atividades': list(CAMPOS_ATIVIDADE),
+}
+
+
+def mes(data):
+    if timezone.is_aware(data):
+        data = timezone.localtime(data)
+    return data.strftime('%Y-%m')
+
+
+def incrementar(manager, chave, campo, delta):
+    """``campo += delta`` na linha de ``chave``, criando-a se preciso.
+
+    Uma subtração numa linha que não existe é ignorada: a contagem já
+    estava errada e só a reconciliação a conserta.
+    """
+    if not delta:
+        return
+    linhas = manager.filter(**chave)
+    if linhas.update(**{campo: F(campo) + delta}) or delta < 0:
+        return
+    _, criada = manager.get_or_create(**chave, defaults={campo: delta})
+    if not criada:
+        linhas.update(**{campo: F(campo) + delta})
+
+
+def somar(grupo, chave, delta, using=None):
+    incrementar(
+        Contador.objects.db_manager(using),
+        {'grupo': grupo, 'chave': chave}, 'valor', delta
+    )
+
+
+def somar_varios(grupo, deltas, using=None):
+    """Aplica ``{chave: delta}`` numa única query; cria as linhas que faltam."""
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    linhas = Contador.objects.db_manager(using).filter(
+        grupo=grupo, chave__in=deltas
+    )
+    atualizadas = linhas.update(valor=F('valor') + Case(
+        *[When(chave=chave, then=Value(delta))
+          for chave, delta in deltas.items()],
+        default=Value(0)
+    ))
+    if atualizadas < len(deltas):
+        presentes = set(linhas.values_list('chave', flat=True))
+        for chave in deltas.keys() - presentes:
+            somar(grupo, chave, deltas[chave], using)
+
+
+def mover(grupo, antiga, nova, using=None):
+    # antiga é None quando o campo estava adiado (.only()) no carregamento
+    if antiga is None or antiga == nova:
+        return
+    somar_varios(grupo, {antiga: -1, nova: 1}, using)
+
+
+def somar_atividade(projeto_id, status, delta, using=None):
+    somar('atividades', status, delta, using)
+    incrementar(
+        ResumoProjeto.objects.db_manager(using),
+        {'projeto_id': projeto_id}, CAMPOS_ATIVIDADE[status], delta
+    )
+
+
+def criar_resumos(projeto_ids, using=None):
+    ResumoProjeto.objects.db_manager(using).bulk_create([
+        ResumoProjeto(projeto_id=projeto_id) for projeto_id in projeto_ids
+    ])
+
+
+def datas_de_relatorio():
+    """Agregados do último relatório: de todos e só dos públicos."""
+    return {
+        'ultimo_relatorio': Max('data_relatorio'),
+        'ultimo_relatorio_publico': Max(
+            'data_relatorio', filter=Q(publico=True)
+        ),
+    }
+
+
+def atualizar_relatorios(projeto_id, using=None):
+    """Recalcula as datas do último relatório; usa o índice por projeto."""
+    datas = Relatorio.objects.db_manager(using).filter(
+        projeto_id=projeto_id
+    ).aggregate(**datas_de_relatorio())
+    # Só UPDATE: no CASCADE do projeto o resumo pode já ter sido apagado
+    ResumoProjeto.objects.db_manager(using).filter(
+        projeto_id=projeto_id
+    ).update(**datas)
+
+
+def vazio():
+    return {
+        **dict.fromkeys(CAMPOS_ATIVIDADE.values(), 0),
+        **dict.fromkeys(CAMPOS_RELATORIO),
+    }
+
+
+def contagens():
+    """Contadores e resumos recalculados das tabelas de origem.
+
+    Todo status tem sua linha, mesmo zerada, para que as escritas só
+    precisem de ``UPDATE``.
+    """
+    contadores = {
+        (grupo, status): 0 for grupo, todos in STATUS.items()
+        for status in todos
+    }
+    for grupo, modelo in (
+        ('propostas', Proposta), ('projetos', Projeto),
+        ('atividades', Atividade),
+    ):
+        por_status = modelo.objects.values('status').annotate(
+            total=Count('pk')
+        ).order_by()
+        for linha in por_status:
+            contadores[(grupo, linha['status'])] = linha['total']
+    por_mes = Proposta.objects.annotate(
+        mes=TruncMonth('data_submissao')
+    ).values('mes').annotate(total=Count('pk')).order_by()
+    for linha in por_mes:
+        contadores[('submissoes', mes(linha['mes']))] = linha['total']
+
+    # Todo projeto tem resumo, mesmo sem atividades nem relatórios
+    resumos = {
+        projeto_id: vazio()
+        for projeto_id in Projeto.objects.values_list('pk', flat=True)
+    }
+    por_projeto = Atividade.objects.values('projeto_id', 'status').annotate(
+        total=Count('pk')
+    ).order_by()
+    for linha in por_projeto:
+        campo = CAMPOS_ATIVIDADE[linha['status']]
+        resumos[linha['projeto_id']][campo] = linha['total']
+    por_projeto = Relatorio.objects.values('projeto_id').annotate(
+        **datas_de_relatorio()
+    ).order_by()
+    for linha in por_projeto:
+        resumos[linha.pop('projeto_id')].update(linha)
+    return contadores, resumos
+
+
+def armazenados():
+    contadores = {
+        (grupo, chave): valor
+        for grupo, chave, valor in Contador.objects.values_list(
+            'grupo', 'chave', 'valor'
+        )
+    }
+    resumos = {
+        linha.pop('projeto_id'): linha
+        for linha in ResumoProjeto.objects.values(
+            'projeto_id', *CAMPOS_RESUMO
+        )
+    }
+    return contadores, resumos
+
+
+def divergencias():
+    """Lista de ``(chave, armazenado, calculado)`` que não conferem."""
+    contadores, resumos = contagens()
+    guardados, resumos_guardados = armazenados()
+    diferentes = [
+        (chave, guardados.get(chave, 0), contadores.get(chave, 0))
+        for chave in sorted(contadores.keys() | guardados.keys())
+        if guardados.get(chave, 0) != contadores.get(chave, 0)
+    ]
+    for projeto_id in sorted(resumos.keys() | resumos_guardados.keys()):
+        guardado = resumos_guardados.get(projeto_id)
+        calculado = resumos.get(projeto_id)
+        if guardado != calculado:
+            diferentes.append((('projeto', projeto_id), guardado, calculado))
+    return diferentes
+
+
+def reconstruir():
+    """Apaga e recria contadores e resumos; devolve as quantidades."""
+    with transaction.atomic():
+        contadores, resumos = contagens()
+        Contador.objects.all().delete()
+        Contador.objects.bulk_create([
+            Contador(grupo=grupo, chave=chave, valor=valor)
+            for (grupo, chave), valor in contadores.items()
+        ])
+        ResumoProjeto.objects.all().delete()
+        ResumoProjeto.objects.bulk_create([
+            ResumoProjeto(projeto_id=projeto_id, **campos)
+            for projeto_id, campos in resumos.items()
+        ])
+    return {'contadores': len(contadores), 'resumos': len(resumos)}
+
+
+def ultimos_meses(quantidade, hoje=None):
+    """``AAAA-MM`` dos últimos ``quantidade`` meses, do mais antigo."""
+    hoje = hoje or timezone.localdate()
+    ano, numero = hoje.year, hoje.month
+    meses = []
+    for _ in range(quantidade):
+        meses.append(f'{ano:04d}-{numero:02d}')
+        ano, numero = (ano, numero - 1) if numero > 1 else (ano - 1, 12)
+    return meses[::-1]
+
+
+def resumo(meses=MESES_NO_PAINEL):
+    """Dados do painel, lidos numa única query à tabela de contadores."""
+    periodo = ultimos_meses(meses)
+    linhas = Contador.objects.filter(
+        ~Q(grupo='submissoes') | Q(chave__gte=periodo[0])
+    ).values_list('grupo', 'chave', 'valor')
+    valores = defaultdict(dict)
+    for grupo, chave, valor in linhas:
+        valores[grupo][chave] = valor
+
+    dados = {}
+    for grupo, todos in STATUS.items():
+        por_status = {status: valores[grupo].get(status, 0) for status in todos}
+        dados[grupo] = {
+            'total': sum(por_status.values()), 'por_status': por_status,
+        }
+    dados['submissoes_por_mes'] = [
+        {'mes': chave, 'total': valores['submissoes'].get(chave, 0)}
+        for chave in periodo
+    ]
+    return dados
+
+
+def atividades_por_projeto():
+    """Resumo por projeto, com mais pendências primeiro."""
+    return ResumoProjeto.objects.values(
+        'projeto_id', 'pendentes', 'concluidas',
+        titulo=F('projeto__titulo')
+    ).order_by('-pendentes', 'projeto')
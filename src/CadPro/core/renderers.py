@@ -0,0 +1,89 @@
+"""Renderers e parsers rápidos: JSON com orjson e MessagePack.
+
+``OrjsonRenderer`` gera os mesmos tipos que o ``JSONRenderer`` do DRF
+(datas, Decimal, UUID, strings preguiçosas passam pelo encoder do DRF),
+só que serializando em C. Sem orjson instalado ele volta ao renderer do
+DRF. O MessagePack é escolhido pelo cliente com ``Accept`` /
+``Content-Type: application/msgpack``; ``extensao/settings.py`` só o
+registra quando a biblioteca ``msgpack`` está disponível. O tempo de
+``render`` entra na métrica de serialização de ``/api/metrics/``.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metricas import medir_serializacao
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+# Converte o que não é tipo nativo exatamente como o JSONRenderer do DRF
+converter = JSONEncoder().default
+
+
+class OrjsonRenderer(JSONRenderer):
+    """``JSONRenderer`` do DRF com a serialização feita pelo orjson."""
+
+    @medir_serializacao
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        # A API navegável e "Accept: application/json; indent=4" pedem
+        # indentação; o orjson só sabe indentar com 2 espaços
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opcoes |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=converter, option=opcoes)
+
+
+class OrjsonParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as erro:
+            raise ParseError(f'JSON parse error - {erro}')
+
+
+def exigir_msgpack():
+    if msgpack is None:
+        raise ImproperlyConfigured(
+            'Instale "msgpack" para usar os renderers MessagePack.'
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @medir_serializacao
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        exigir_msgpack()
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=converter, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        exigir_msgpack()
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as erro:
+            raise ParseError(f'MessagePack parse error - {erro}')
@@ -0,0 +1,63 @@
+"""Leituras públicas nas réplicas, com read-your-writes.
+
+Só as views com ``usar_replica = True`` (os viewsets públicos, somente
+leitura) leem das réplicas de ``REPLICAS['ALIASES']``, e só em métodos
+seguros; todo o resto, e toda escrita, vai para o primário. Uma escrita
+fixa as leituras seguintes da mesma requisição no primário, e
+``core.middleware.ReplicaMiddleware`` devolve um cookie que mantém o
+cliente no primário por ``REPLICAS['JANELA_SEGUNDOS']``.
+
+O cache público (``core.cache``) é invalidado na escrita; uma leitura
+numa réplica atrasada pode repovoá-lo com a versão anterior, então a
+janela deve cobrir o atraso de replicação esperado.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARIO = 'default'
+COOKIE = 'cadpro_primario'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+# Estado da requisição corrente (ver ReplicaMiddleware)
+requisicao_atual = ContextVar('roteamento_requisicao', default=None)
+
+
+class EstadoDaRequisicao:
+    def __init__(self):
+        self.replica = None
+        self.escreveu = False
+
+
+def escolher_replica(request, view_func):
+    """Alias de réplica para a requisição, ou ``None`` para o primário."""
+    classe = getattr(view_func, 'cls', None)
+    replicas = settings.REPLICAS['ALIASES']
+    if not replicas or not getattr(classe, 'usar_replica', False):
+        return None
+    if request.method not in METODOS_SEGUROS or COOKIE in request.COOKIES:
+        return None
+    return random.choice(replicas)
+
+
+class RoteadorReplicas:
+    def db_for_read(self, model, **hints):
+        estado = requisicao_atual.get()
+        if estado is None:
+            # Fora de uma requisição (comandos, shell): comportamento padrão
+            return None
+        if estado.escreveu:
+            return PRIMARIO
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        # Nunca na réplica, mesmo para instâncias lidas dela
+        estado = requisicao_atual.get()
+        if estado is not None:
+            estado.escreveu = True
+        return PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas guardam os mesmos dados do primário
+        return True
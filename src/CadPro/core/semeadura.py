@@ -0,0 +1,236 @@
+"""Massa de dados sintética para desenvolvimento, testes de carga e
+benchmarks.
+
+Tudo é gravado com ``bulk_create`` em lotes, então os signals não rodam:
+o índice de busca é alimentado lote a lote, os contadores do painel são
+recalculados e o cache público é invalidado no fim. Com a mesma ``semente`` e ``escala`` o resultado é o mesmo.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import busca, painel
+from . import cache as cache_publico
+from .models import Atividade, Entrega, Projeto, Proposta, Relatorio, Usuario
+
+PREFIXO = 'semente'
+SENHA_PADRAO = 'cadpro-semente'
+
+# Quantidades para escala 1; os filhos são por projeto
+USUARIOS_POR_TIPO = {
+    'comunidade': 200,
+    'aluno': 100,
+    'professor': 20,
+    'coordenador': 5,
+    'admin': 2,
+}
+PROPOSTAS = 1000
+STATUS_PROPOSTA = {
+    'enviada': 20,
+    'em_analise': 30,
+    'aprovada': 35,
+    'rejeitada': 15,
+}
+STATUS_PROJETO = {'em_execucao': 60, 'concluido': 30, 'suspenso': 10}
+RELATORIOS_POR_PROJETO = 4
+ATIVIDADES_POR_PROJETO = 8
+ENTREGAS_POR_PROJETO = 2
+FRACAO_RELATORIOS_PUBLICOS = 0.6
+DIAS_DE_HISTORICO = 730
+
+PALAVRAS = (
+    'comunidade horta escola saúde água saneamento leitura bairro idosos '
+    'jovens reciclagem energia solar alimentação cultura esporte música '
+    'inclusão digital capacitação renda cooperativa mapeamento praça '
+    'biblioteca oficina prevenção vacinação nascentes resíduos transporte'
+).split()
+
+
+def quantidade(base, escala):
+    return max(1, round(base * escala))
+
+
+def sortear(aleatorio, pesos):
+    return aleatorio.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def texto(aleatorio, palavras):
+    return ' '.join(aleatorio.choices(PALAVRAS, k=palavras)).capitalize()
+
+
+def em_lotes(total, lote):
+    for inicio in range(0, total, lote):
+        yield range(inicio, min(inicio + lote, total))
+
+
+def dia_aleatorio(aleatorio, inicio, dias):
+    return inicio + timedelta(days=aleatorio.randrange(max(1, dias)))
+
+
+def instante(dia, aleatorio):
+    segundos = aleatorio.randrange(24 * 60 * 60)
+    return timezone.make_aware(
+        datetime.combine(dia, time.min) + timedelta(seconds=segundos)
+    )
+
+
+def semear(escala=1, lote=1000, semente=42, senha=SENHA_PADRAO):
+    """Cria usuários de todos os tipos, propostas e a árvore de projetos.
+
+    Devolve a quantidade criada por modelo. Os usernames seguem
+    ``semente-<tipo>-<n>`` e todos usam ``senha`` (hash calculado uma vez).
+    """
+    aleatorio = random.Random(semente)
+    hoje = timezone.now().date()
+    origem = hoje - timedelta(days=DIAS_DE_HISTORICO)
+    criados = dict.fromkeys(
+        ('usuarios', 'propostas', 'projetos', 'relatorios', 'atividades',
+         'entregas'), 0
+    )
+
+    with transaction.atomic():
+        hash_senha = make_password(senha)
+        usuarios = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    username=f'{PREFIXO}-{tipo}-{n}', password=hash_senha,
+                    first_name=tipo.capitalize(), last_name=str(n),
+                    email=f'{PREFIXO}-{tipo}-{n}@exemplo.org',
+                    tipo_usuario=tipo,
+                    organizacao=(
+                        f'Organização {n % 30}' if tipo == 'comunidade'
+                        else 'Universidade'
+                    ),
+                    is_staff=tipo == 'admin', is_superuser=tipo == 'admin',
+                )
+                for tipo, base in USUARIOS_POR_TIPO.items()
+                for n in range(quantidade(base, escala))
+            ],
+            batch_size=lote
+        )
+        criados['usuarios'] = len(usuarios)
+        autores = [u.pk for u in usuarios if u.tipo_usuario == 'comunidade']
+        professores = [
+            u.pk for u in usuarios if u.tipo_usuario == 'professor'
+        ]
+
+        for faixa in em_lotes(quantidade(PROPOSTAS, escala), lote):
+            propostas = Proposta.objects.bulk_create([
+                Proposta(
+                    titulo=texto(aleatorio, 5),
+                    descricao=texto(aleatorio, 60),
+                    problema_resolver=texto(aleatorio, 30),
+                    publico_alvo=texto(aleatorio, 8),
+                    relevancia_social=texto(aleatorio, 30),
+                    usuario_id=aleatorio.choice(autores),
+                    status=sortear(aleatorio, STATUS_PROPOSTA),
+                )
+                for _ in faixa
+            ])
+            # auto_now_add grava o mesmo instante no lote inteiro
+            for proposta in propostas:
+                proposta.data_submissao = instante(
+                    dia_aleatorio(aleatorio, origem, DIAS_DE_HISTORICO),
+                    aleatorio
+                )
+            Proposta.objects.bulk_update(propostas, ['data_submissao'])
+            busca.indexar('proposta', [p.pk for p in propostas])
+            criados['propostas'] += len(propostas)
+
+            aprovadas = [p for p in propostas if p.status == 'aprovada']
+            for chave, quantidade_criada in semear_projetos(
+                aleatorio, aprovadas, professores, hoje
+            ).items():
+                criados[chave] += quantidade_criada
+        painel.reconstruir()
+
+    cache_publico.invalidar(*cache_publico.NAMESPACES)
+    return criados
+
+
+def semear_projetos(aleatorio, propostas, professores, hoje):
+    projetos = Projeto.objects.bulk_create([
+        Projeto(
+            titulo=proposta.titulo,
+            descricao=proposta.descricao,
+            objetivos=proposta.problema_resolver,
+            impacto_esperado=proposta.relevancia_social,
+            status=sortear(aleatorio, STATUS_PROJETO),
+            data_inicio=dia_aleatorio(
+                aleatorio, proposta.data_submissao.date(),
+                (hoje - proposta.data_submissao.date()).days
+            ),
+            proposta_origem_id=proposta.pk,
+            professor_responsavel_id=aleatorio.choice(professores),
+        )
+        for proposta in propostas
+    ])
+    for projeto in projetos:
+        if projeto.status == 'concluido':
+            projeto.data_conclusao = dia_aleatorio(
+                aleatorio, projeto.data_inicio,
+                (hoje - projeto.data_inicio).days
+            )
+        else:
+            projeto.data_termino_prevista = projeto.data_inicio + timedelta(
+                days=aleatorio.randrange(90, 720)
+            )
+    Projeto.objects.bulk_update(
+        projetos, ['data_conclusao', 'data_termino_prevista']
+    )
+
+    relatorios = Relatorio.objects.bulk_create([
+        Relatorio(
+            projeto_id=projeto.pk,
+            titulo=f'Relatório {n + 1}: {texto(aleatorio, 3)}',
+            conteudo=texto(aleatorio, 120),
+            data_relatorio=dia_aleatorio(
+                aleatorio, projeto.data_inicio,
+                (hoje - projeto.data_inicio).days
+            ),
+            publico=aleatorio.random() < FRACAO_RELATORIOS_PUBLICOS,
+        )
+        for projeto in projetos
+        for n in range(RELATORIOS_POR_PROJETO)
+    ])
+    busca.indexar('relatorio', [r.pk for r in relatorios])
+
+    atividades = Atividade.objects.bulk_create([
+        Atividade(
+            projeto_id=projeto.pk,
+            descricao=texto(aleatorio, 12),
+            status=aleatorio.choice(('pendente', 'concluida')),
+        )
+        for projeto in projetos
+        for _ in range(ATIVIDADES_POR_PROJETO)
+    ])
+    entregas = Entrega.objects.bulk_create([
+        Entrega(
+            projeto_id=projeto.pk,
+            descricao=texto(aleatorio, 12),
+            arquivo=f'entregas/{PREFIXO}-{projeto.pk}-{n}.pdf',
+        )
+        for projeto in projetos
+        for n in range(ENTREGAS_POR_PROJETO)
+    ])
+    return {
+        'projetos': len(projetos),
+        'relatorios': len(relatorios),
+        'atividades': len(atividades),
+        'entregas': len(entregas),
+    }
+
+
+def limpar():
+    """Remove os usuários semeados; o CASCADE leva propostas e projetos.
+
+    É um ``delete()`` comum, então os signals tiram as linhas do índice de
+    busca e invalidam o cache público.
+    """
+    total, _ = Usuario.objects.filter(
+        username__startswith=f'{PREFIXO}-'
+    ).delete()
+    return total
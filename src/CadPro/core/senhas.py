@@ -0,0 +1,204 @@
+"""Hash de senhas fora das threads que atendem requisições.
+
+O PBKDF2 do Django custa centenas de milissegundos de CPU por senha. O
+login (``core.authentication.SenhaEmProcessoBackend``) e o registro
+(``RegistroComunidadeSerializer``) mandam esse cálculo para um pool de
+``SENHAS['PROCESSOS']`` processos, com no máximo
+``SENHAS['CONCORRENCIA']`` hashes em andamento por worker. Num pico de
+logins os excedentes esperam na fila em vez de disputar a CPU com as
+outras rotas; quem espera mais que ``SENHAS['ESPERA_MAXIMA']`` segundos
+recebe ``SenhasOcupadas``, que as views da API respondem com 503 e o
+backend de autenticação, fora delas, trata como login recusado. Com
+``PROCESSOS = 0`` o hash roda na própria thread, ainda limitado pela
+concorrência.
+
+Só o hasher e a senha vão para o pool, que não carrega o Django. A
+escolha do hasher, o salt e a troca de hashes antigos seguem
+``django.contrib.auth.hashers``. O tempo de fila e de cálculo aparece em
+``/api/metrics/``.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import (UNUSABLE_PASSWORD_SUFFIX_LENGTH,
+                                         get_hasher, identify_hasher,
+                                         is_password_usable, make_password)
+from django.utils.crypto import get_random_string
+
+PADRAO = {
+    'PROCESSOS': 2,
+    'CONCORRENCIA': 2,
+    'ESPERA_MAXIMA': 5,
+}
+BUCKETS_FILA = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def configuracao():
+    return {**PADRAO, **getattr(settings, 'SENHAS', {})}
+
+
+class SenhasOcupadas(Exception):
+    """A fila do pool passou de ``ESPERA_MAXIMA``; nada foi calculado."""
+
+
+class Executor:
+    """Pool e semáforo do processo atual.
+
+    Criados no primeiro uso, depois do fork dos workers, e recriados se
+    ``SENHAS`` mudar. O pool usa ``spawn``: um fork copiaria as threads e
+    as conexões do worker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chave = None
+        self.processos = 0
+        self.pool = None
+        self.limite = None
+
+    def obter(self, config):
+        chave = (os.getpid(), config['PROCESSOS'], config['CONCORRENCIA'])
+        with self.lock:
+            if self.chave != chave:
+                if self.pool is not None and self.chave[0] == chave[0]:
+                    self.pool.shutdown(wait=False)
+                self.chave = chave
+                self.processos = config['PROCESSOS']
+                self.pool = self.criar_pool(self.processos)
+                self.limite = threading.BoundedSemaphore(
+                    max(1, config['CONCORRENCIA'])
+                )
+            return self.pool, self.limite
+
+    def criar_pool(self, processos):
+        if processos <= 0:
+            return None
+        return ProcessPoolExecutor(
+            processos, mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def recriar(self, quebrado):
+        """Troca um pool cujo processo morreu (OOM, kill)."""
+        with self.lock:
+            if self.pool is quebrado:
+                self.pool = self.criar_pool(self.processos)
+            return self.pool
+
+
+class Estatisticas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self.lock:
+            self.buckets = [0] * len(BUCKETS_FILA)
+            self.hashes = 0
+            self.soma_fila = 0.0
+            self.soma_hash = 0.0
+            self.recusados = 0
+            self.em_andamento = 0
+
+    def entrar(self, fila):
+        with self.lock:
+            for indice, limite in enumerate(BUCKETS_FILA):
+                if fila <= limite:
+                    self.buckets[indice] += 1
+            self.hashes += 1
+            self.soma_fila += fila
+            self.em_andamento += 1
+
+    def sair(self, duracao):
+        with self.lock:
+            self.soma_hash += duracao
+            self.em_andamento -= 1
+
+    def recusar(self):
+        with self.lock:
+            self.recusados += 1
+
+    def copia(self):
+        with self.lock:
+            return {
+                'buckets': list(self.buckets),
+                **{
+                    campo: getattr(self, campo) for campo in (
+                        'hashes', 'soma_fila', 'soma_hash', 'recusados',
+                        'em_andamento',
+                    )
+                },
+            }
+
+
+executor = Executor()
+estatisticas = Estatisticas()
+
+
+def calcular(pool, funcao, args):
+    if pool is None:
+        return funcao(*args)
+    try:
+        return pool.submit(funcao, *args).result()
+    except BrokenProcessPool:
+        return executor.recriar(pool).submit(funcao, *args).result()
+
+
+def executar(funcao, *args):
+    """``funcao(*args)`` no pool, respeitando o limite de concorrência."""
+    config = configuracao()
+    pool, limite = executor.obter(config)
+    inicio = time.perf_counter()
+    if not limite.acquire(timeout=config['ESPERA_MAXIMA']):
+        estatisticas.recusar()
+        raise SenhasOcupadas()
+    fila = time.perf_counter() - inicio
+    estatisticas.entrar(fila)
+    try:
+        return calcular(pool, funcao, args)
+    finally:
+        limite.release()
+        estatisticas.sair(time.perf_counter() - inicio - fila)
+
+
+def gerar_hash(senha):
+    """``make_password(senha)`` com o cálculo no pool."""
+    if senha is None:
+        return make_password(None)
+    hasher = get_hasher()
+    return executar(hasher.encode, senha, hasher.salt())
+
+
+def conferir(senha, codificado):
+    """``verify_password`` com o cálculo no pool: ``(correta, atualizar)``."""
+    hasher = None
+    if senha is not None and is_password_usable(codificado):
+        try:
+            hasher = identify_hasher(codificado)
+        except ValueError:
+            pass
+    if hasher is None:
+        # Mesmo custo de uma senha conferida, como no Django (#20760)
+        gerar_hash(get_random_string(UNUSABLE_PASSWORD_SUFFIX_LENGTH))
+        return False, False
+
+    preferido = get_hasher()
+    trocou = hasher.algorithm != preferido.algorithm
+    atualizar = trocou or preferido.must_update(codificado)
+    correta = executar(hasher.verify, senha, codificado)
+    if not correta and not trocou and atualizar:
+        executar(hasher.harden_runtime, senha, codificado)
+    return correta, atualizar
+
+
+def conferir_usuario(usuario, senha):
+    """``usuario.check_password(senha)``, regravando hashes antigos."""
+    correta, atualizar = conferir(senha, usuario.password)
+    if correta and atualizar:
+        usuario.password = gerar_hash(senha)
+        usuario.save(update_fields=['password'])
+    return correta
@@ -1,7 +1,27 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework import serializers  # type: ignore
+from rest_framework.exceptions import APIException
+
+from . import senhas
+from .busca import destacar
+from .campos import CamposDinamicosMixin
+from .exportacao import FORMATOS
+from .leitura import (LeituraRapida, data, data_hora, nome_completo,
+                      opcional)
+from .models import (Atividade, EnvioParcial, Entrega, Projeto, Proposta,
+                     Relatorio, Tarefa, Usuario, percentual_concluido)
+
 
-from .models import Atividade, Entrega, Projeto, Proposta, Relatorio, Usuario
+class SenhasOcupadasAPI(APIException):
+    """``core.senhas.SenhasOcupadas`` nas views da API: 503 com
+    Retry-After."""
+    status_code = 503
+    default_detail = 'Muitos logins simultâneos. Tente novamente.'
+    default_code = 'senhas_ocupadas'
+    wait = 1
 
 
 # Serializer para registro de usuários da comunidade externa
@@ -25,17 +45,22 @@ class RegistroComunidadeSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = Usuario.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
+        # Como Usuario.objects.create_user, mas com o hash calculado em
+        # core.senhas antes do INSERT
+        user = Usuario(
+            username=Usuario.normalize_username(validated_data['username']),
+            email=Usuario.objects.normalize_email(validated_data['email']),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
             telefone=validated_data.get('telefone', ''),
             organizacao=validated_data.get('organizacao', ''),
-            password=validated_data['password'],
             tipo_usuario='comunidade'
-
         )
+        try:
+            user.password = senhas.gerar_hash(validated_data['password'])
+        except senhas.SenhasOcupadas:
+            raise SenhasOcupadasAPI()
+        user.save()
         return user
 
 
@@ -49,7 +74,13 @@ class LoginSerializer(serializers.Serializer):
         password = attrs.get('password')
 
         if username and password:
-            user = authenticate(username=username, password=password)
+            try:
+                user = authenticate(
+                    username=username, password=password,
+                    propagar_ocupadas=True
+                )
+            except senhas.SenhasOcupadas:
+                raise SenhasOcupadasAPI()
             if not user:
                 raise serializers.ValidationError('Credenciais inválidas.')
             attrs['user'] = user
@@ -68,7 +99,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
         ]
 
 
-class PropostaSerializer(serializers.ModelSerializer):
+class PropostaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     usuario_nome = serializers.CharField(
         source='usuario.get_full_name',
         read_only=True
@@ -104,7 +135,7 @@ class PropostaCreateSerializer(serializers.ModelSerializer):
 
 
 # Atualizar outros serializers conforme necessário...
-class ProjetoSerializer(serializers.ModelSerializer):
+class ProjetoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     professor_nome = serializers.CharField(
         source='professor_responsavel.get_full_name',
         read_only=True
@@ -127,34 +158,174 @@ class PropostaListSerializer(serializers.ModelSerializer):
         fields = ['id', 'titulo', 'status', 'data_submissao', 'usuario_nome']
 
 
-class ProjetoListSerializer(serializers.ModelSerializer):
+class TrechoField(serializers.CharField):
+    """Trecho da busca (core.busca) como HTML escapado com ``<mark>``."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return destacar(value)
+
+
+class PropostaBuscaSerializer(PropostaListSerializer):
+    relevancia = serializers.FloatField(read_only=True)
+    trecho = TrechoField()
+
+    class Meta(PropostaListSerializer.Meta):
+        fields = PropostaListSerializer.Meta.fields + ['relevancia', 'trecho']
+
+
+class ProjetoListSerializer(CamposDinamicosMixin,
+                            serializers.ModelSerializer):
+    # Progresso lido do ResumoProjeto (core.painel): as views fazem
+    # select_related('resumo'), um JOIN em vez de agregar por linha
+    atividades_total = serializers.IntegerField(
+        source='resumo.total', read_only=True
+    )
+    atividades_concluidas = serializers.IntegerField(
+        source='resumo.concluidas', read_only=True
+    )
+    progresso = serializers.IntegerField(
+        source='resumo.progresso', read_only=True
+    )
+    ultimo_relatorio = serializers.DateField(
+        source='resumo.ultimo_relatorio', read_only=True
+    )
+
     class Meta:
         model = Projeto
         fields = [
-            'id', 'titulo', 'status', 'data_inicio', 'professor_responsavel'
+            'id', 'titulo', 'status', 'data_inicio', 'professor_responsavel',
+            'atividades_total', 'atividades_concluidas', 'progresso',
+            'ultimo_relatorio'
         ]
 
 
-class RelatorioSerializer(serializers.ModelSerializer):
+class ProjetoPublicoListSerializer(ProjetoListSerializer):
+    # Na vitrine pública só contam os relatórios públicos
+    ultimo_relatorio = serializers.DateField(
+        source='resumo.ultimo_relatorio_publico', read_only=True
+    )
+
+
+# Versões rápidas das listagens acima (ver core.leitura)
+class PropostaListaRapida(LeituraRapida):
+    espelho = PropostaListSerializer
+    colunas = (
+        'id', 'titulo', 'status', 'data_submissao', 'data_atualizacao',
+        'usuario__first_name', 'usuario__last_name'
+    )
+    origens = {
+        'usuario_nome': ('usuario__first_name', 'usuario__last_name'),
+    }
+
+    def linha(self, registro):
+        return {
+            'id': registro['id'],
+            'titulo': registro['titulo'],
+            'status': registro['status'],
+            'data_submissao': data_hora(registro['data_submissao']),
+            'usuario_nome': nome_completo(
+                registro['usuario__first_name'],
+                registro['usuario__last_name']
+            ),
+        }
+
+
+class PropostaBuscaRapida(PropostaListaRapida):
+    espelho = PropostaBuscaSerializer
+    colunas = PropostaListaRapida.colunas + ('relevancia', 'trecho')
+
+    def linha(self, registro):
+        return {
+            **super().linha(registro),
+            'relevancia': opcional(float, registro['relevancia']),
+            'trecho': destacar(registro['trecho']),
+        }
+
+
+class ProjetoListaRapida(LeituraRapida):
+    espelho = ProjetoListSerializer
+    coluna_ultimo_relatorio = 'resumo__ultimo_relatorio'
+    # Também entram no ETag de ProjetoViewSet.list
+    colunas_progresso = (
+        'resumo__pendentes', 'resumo__concluidas', coluna_ultimo_relatorio
+    )
+    colunas = (
+        'id', 'titulo', 'status', 'data_inicio', 'data_atualizacao',
+        'professor_responsavel', *colunas_progresso
+    )
+    origens = {
+        'atividades_total': ('resumo__pendentes', 'resumo__concluidas'),
+        'atividades_concluidas': ('resumo__concluidas',),
+        'progresso': ('resumo__pendentes', 'resumo__concluidas'),
+        'ultimo_relatorio': (coluna_ultimo_relatorio,),
+    }
+
+    def linha(self, registro):
+        pendentes = registro['resumo__pendentes']
+        concluidas = registro['resumo__concluidas']
+        # Sem linha de resumo o LEFT JOIN traz NULL, como o serializer
+        sem_resumo = pendentes is None
+        return {
+            'id': registro['id'],
+            'titulo': registro['titulo'],
+            'status': registro['status'],
+            'data_inicio': data(registro['data_inicio']),
+            'professor_responsavel': registro['professor_responsavel'],
+            'atividades_total': (
+                None if sem_resumo else pendentes + concluidas
+            ),
+            'atividades_concluidas': concluidas,
+            'progresso': (
+                None if sem_resumo
+                else percentual_concluido(pendentes, concluidas)
+            ),
+            'ultimo_relatorio': data(
+                registro[self.coluna_ultimo_relatorio]
+            ),
+        }
+
+
+class ProjetoPublicoListaRapida(ProjetoListaRapida):
+    espelho = ProjetoPublicoListSerializer
+    coluna_ultimo_relatorio = 'resumo__ultimo_relatorio_publico'
+    colunas_progresso = (
+        'resumo__pendentes', 'resumo__concluidas', coluna_ultimo_relatorio
+    )
+    colunas = (
+        *ProjetoListaRapida.colunas[:-len(colunas_progresso)],
+        *colunas_progresso
+    )
+    origens = {
+        **ProjetoListaRapida.origens,
+        'ultimo_relatorio': (coluna_ultimo_relatorio,),
+    }
+
+
+class RelatorioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Relatorio
         fields = '__all__'
 
 
-class EntregaSerializer(serializers.ModelSerializer):
+class EntregaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Entrega
         fields = '__all__'
 
 
-class AtividadeSerializer(serializers.ModelSerializer):
+class AtividadeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Atividade
         fields = '__all__'
 
 
 # Serializer para Relatorio Público
-class RelatorioPublicoSerializer(serializers.ModelSerializer):
+class RelatorioPublicoSerializer(CamposDinamicosMixin,
+                                 serializers.ModelSerializer):
     projeto_titulo = serializers.CharField(
         source='projeto.titulo', read_only=True
     )
@@ -169,3 +340,159 @@ class RelatorioPublicoSerializer(serializers.ModelSerializer):
             'projeto_titulo', 'projeto_id'
         ]
         read_only_fields = fields
+
+
+class RelatorioPublicoBuscaSerializer(RelatorioPublicoSerializer):
+    relevancia = serializers.FloatField(read_only=True)
+    trecho = TrechoField()
+
+    class Meta(RelatorioPublicoSerializer.Meta):
+        fields = RelatorioPublicoSerializer.Meta.fields + [
+            'relevancia', 'trecho'
+        ]
+        read_only_fields = fields
+
+
+class RelatorioPublicoRapido(LeituraRapida):
+    espelho = RelatorioPublicoSerializer
+    colunas = (
+        'id', 'titulo', 'conteudo', 'data_relatorio', 'projeto__titulo',
+        'projeto_id'
+    )
+    origens = {'projeto_titulo': ('projeto__titulo',)}
+
+    def linha(self, registro):
+        return {
+            'id': registro['id'],
+            'titulo': registro['titulo'],
+            'conteudo': registro['conteudo'],
+            'data_relatorio': data(registro['data_relatorio']),
+            'projeto_titulo': registro['projeto__titulo'],
+            'projeto_id': registro['projeto_id'],
+        }
+
+
+class RelatorioPublicoBuscaRapido(RelatorioPublicoRapido):
+    espelho = RelatorioPublicoBuscaSerializer
+    colunas = RelatorioPublicoRapido.colunas + ('relevancia', 'trecho')
+
+    def linha(self, registro):
+        return {
+            **super().linha(registro),
+            'relevancia': opcional(float, registro['relevancia']),
+            'trecho': destacar(registro['trecho']),
+        }
+
+
+# Lista de ids para as ações em lote
+class LoteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+# Estado das tarefas em segundo plano (core.tarefas)
+class TarefaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'tipo', 'status', 'prioridade', 'tentativas',
+            'max_tentativas', 'executar_apos', 'resultado', 'erro',
+            'data_criacao', 'data_conclusao',
+        ]
+        read_only_fields = fields
+
+
+# Filtros das ações aninhadas de ProjetoViewSet (core.inclusoes)
+class FiltroFilhosSerializer(serializers.Serializer):
+    status = serializers.CharField(required=False)
+    # allow_null: sem o parâmetro, a query string não vira publico=False
+    publico = serializers.BooleanField(required=False, allow_null=True)
+    desde = serializers.DateField(required=False)
+    ate = serializers.DateField(required=False)
+
+    def validate_status(self, value):
+        status = [item.strip() for item in value.split(',') if item.strip()]
+        modelo = self.context['inclusao'].modelo
+        validos = {codigo for codigo, _ in getattr(
+            modelo, 'STATUS_CHOICES', ()
+        )}
+        invalidos = set(status) - validos
+        if invalidos:
+            raise serializers.ValidationError(
+                f'Status inválido: {", ".join(sorted(invalidos))}.'
+            )
+        return status
+
+    def validate(self, attrs):
+        inclusao = self.context['inclusao']
+        for nome in ('status', 'publico'):
+            if attrs.get(nome) is not None and nome not in inclusao.filtros:
+                raise serializers.ValidationError(
+                    {nome: 'Filtro não disponível nesta coleção.'}
+                )
+        if attrs.get('desde') and attrs.get('ate') and \
+                attrs['desde'] > attrs['ate']:
+            raise serializers.ValidationError(
+                {'ate': 'A data final deve ser posterior à inicial.'}
+            )
+        return attrs
+
+
+# Envio retomável em pedaços (core.envios)
+class EnvioParcialSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EnvioParcial
+        fields = [
+            'id', 'alvo', 'objeto_id', 'nome_arquivo', 'tamanho', 'sha256',
+            'recebido', 'concluido', 'data_criacao', 'data_atualizacao',
+        ]
+        read_only_fields = [
+            'recebido', 'concluido', 'data_criacao', 'data_atualizacao',
+        ]
+
+    def validate_nome_arquivo(self, value):
+        nome = os.path.basename(value.replace('\\', '/')).strip()
+        if not nome:
+            raise serializers.ValidationError('Nome de arquivo inválido.')
+        return nome
+
+    def validate_tamanho(self, value):
+        maximo = settings.ENVIOS['TAMANHO_MAXIMO']
+        if not 0 < value <= maximo:
+            raise serializers.ValidationError(
+                f'O tamanho deve ser de 1 a {maximo} bytes.'
+            )
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and (
+            len(value) != 64 or
+            any(c not in '0123456789abcdef' for c in value)
+        ):
+            raise serializers.ValidationError(
+                'Informe o SHA-256 em hexadecimal.'
+            )
+        return value
+
+
+# Parâmetros da exportação em massa
+class ExportacaoSerializer(serializers.Serializer):
+    formato = serializers.ChoiceField(choices=sorted(FORMATOS), default='csv')
+    status = serializers.CharField(required=False)
+    desde = serializers.DateField(required=False)
+    ate = serializers.DateField(required=False)
+
+    def validate_status(self, value):
+        return [status for status in value.split(',') if status]
+
+    def validate(self, attrs):
+        if attrs.get('desde') and attrs.get('ate') and \
+                attrs['desde'] > attrs['ate']:
+            raise serializers.ValidationError(
+                {'ate': 'A data final deve ser posterior à inicial.'}
+            )
+        return attrs
@@ -0,0 +1,237 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, busca, painel
+from . import cache as cache_publico
+from .models import Atividade, Projeto, Proposta, Relatorio, Usuario
+
+STATUS_PUBLICO = 'em_execucao'
+
+
+def invalidar_no_commit(*namespaces):
+    # Invalidar antes do commit deixaria uma janela para outra requisição
+    # guardar de novo os dados antigos
+    if namespaces:
+        transaction.on_commit(lambda: cache_publico.invalidar(*namespaces))
+
+
+# Guardamos o estado carregado do banco para invalidar só o que mudou.
+# Lemos do __dict__ para não disparar queries em campos adiados (.only()).
+@receiver(post_init, sender=Projeto)
+def guardar_estado_projeto(sender, instance, **kwargs):
+    instance._estado_cache = (
+        instance.__dict__.get('status'), instance.__dict__.get('titulo')
+    )
+
+
+@receiver(post_save, sender=Projeto)
+def invalidar_projeto_salvo(sender, instance, created, **kwargs):
+    status_antigo, titulo_antigo = instance._estado_cache
+    namespaces = []
+    if STATUS_PUBLICO in (status_antigo, instance.status):
+        namespaces.append('projetos')
+    if not created and titulo_antigo != instance.titulo:
+        # RelatorioPublicoSerializer expõe o título do projeto
+        namespaces.append('relatorios')
+    invalidar_no_commit(*namespaces)
+    guardar_estado_projeto(sender, instance)
+
+
+@receiver(post_delete, sender=Projeto)
+def invalidar_projeto_excluido(sender, instance, **kwargs):
+    if instance.status == STATUS_PUBLICO:
+        invalidar_no_commit('projetos')
+
+
+@receiver(post_init, sender=Relatorio)
+def guardar_estado_relatorio(sender, instance, **kwargs):
+    instance._estado_cache = instance.__dict__.get('publico')
+
+
+@receiver(post_save, sender=Relatorio)
+def invalidar_relatorio_salvo(sender, instance, **kwargs):
+    # Cobre a virada de publico nos dois sentidos
+    if instance._estado_cache or instance.publico:
+        invalidar_no_commit('relatorios')
+    guardar_estado_relatorio(sender, instance)
+
+
+@receiver(post_delete, sender=Relatorio)
+def invalidar_relatorio_excluido(sender, instance, **kwargs):
+    if instance.publico:
+        invalidar_no_commit('relatorios')
+
+
+@receiver(post_init, sender=Usuario)
+def guardar_nome_usuario(sender, instance, **kwargs):
+    instance._nome_cache = (
+        instance.__dict__.get('first_name'), instance.__dict__.get('last_name')
+    )
+
+
+@receiver(post_save, sender=Usuario)
+def invalidar_professor_renomeado(sender, instance, created, **kwargs):
+    # Os detalhes públicos do projeto mostram o nome do professor
+    nome = (instance.first_name, instance.last_name)
+    if (not created and instance.tipo_usuario == 'professor' and
+            instance._nome_cache != nome):
+        invalidar_no_commit('projetos')
+    guardar_nome_usuario(sender, instance)
+
+
+# Índices de busca textual: gravados na mesma transação da linha
+def textos_alterados(nome, update_fields):
+    return update_fields is None or bool(
+        set(update_fields) & set(busca.INDICES[nome].colunas)
+    )
+
+
+@receiver(post_save, sender=Proposta)
+def indexar_proposta(sender, instance, using, update_fields=None,
+                     **kwargs):
+    if textos_alterados('proposta', update_fields):
+        busca.indexar('proposta', [instance.pk], using)
+
+
+@receiver(post_delete, sender=Proposta)
+def desindexar_proposta(sender, instance, using, **kwargs):
+    busca.remover('proposta', [instance.pk], using)
+
+
+@receiver(post_save, sender=Relatorio)
+def indexar_relatorio(sender, instance, using, update_fields=None,
+                      **kwargs):
+    if textos_alterados('relatorio', update_fields):
+        busca.indexar('relatorio', [instance.pk], using)
+
+
+@receiver(post_delete, sender=Relatorio)
+def desindexar_relatorio(sender, instance, using, **kwargs):
+    busca.remover('relatorio', [instance.pk], using)
+
+
+# Contadores do painel: gravados na mesma transação da linha
+def campos_alterados(campos, update_fields):
+    return update_fields is None or bool(set(update_fields) & set(campos))
+
+
+@receiver(post_init, sender=Proposta)
+@receiver(post_init, sender=Projeto)
+def guardar_status(sender, instance, **kwargs):
+    instance._estado_painel = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Proposta)
+def contar_proposta_salva(sender, instance, created, using,
+                          update_fields=None, **kwargs):
+    if created:
+        painel.somar('propostas', instance.status, 1, using)
+        painel.somar(
+            'submissoes', painel.mes(instance.data_submissao), 1, using
+        )
+    elif campos_alterados(['status'], update_fields):
+        painel.mover(
+            'propostas', instance._estado_painel, instance.status, using
+        )
+    guardar_status(sender, instance)
+
+
+@receiver(post_delete, sender=Proposta)
+def descontar_proposta(sender, instance, using, **kwargs):
+    painel.somar('propostas', instance._estado_painel, -1, using)
+    painel.somar(
+        'submissoes', painel.mes(instance.data_submissao), -1, using
+    )
+
+
+@receiver(post_save, sender=Projeto)
+def contar_projeto_salvo(sender, instance, created, using,
+                         update_fields=None, **kwargs):
+    if created:
+        painel.somar('projetos', instance.status, 1, using)
+        painel.criar_resumos([instance.pk], using)
+    elif campos_alterados(['status'], update_fields):
+        painel.mover(
+            'projetos', instance._estado_painel, instance.status, using
+        )
+    guardar_status(sender, instance)
+
+
+@receiver(post_delete, sender=Projeto)
+def descontar_projeto(sender, instance, using, **kwargs):
+    painel.somar('projetos', instance._estado_painel, -1, using)
+
+
+@receiver(post_init, sender=Atividade)
+def guardar_estado_atividade(sender, instance, **kwargs):
+    instance._estado_painel = (
+        instance.__dict__.get('projeto_id'), instance.__dict__.get('status')
+    )
+
+
+@receiver(post_save, sender=Atividade)
+def contar_atividade_salva(sender, instance, created, using,
+                           update_fields=None, **kwargs):
+    atual = (instance.projeto_id, instance.status)
+    if created:
+        painel.somar_atividade(*atual, 1, using)
+        # As listagens públicas de projetos mostram o progresso
+        invalidar_no_commit('projetos')
+    elif campos_alterados(
+        ['status', 'projeto', 'projeto_id'], update_fields
+    ) and None not in instance._estado_painel and \
+            instance._estado_painel != atual:
+        painel.somar_atividade(*instance._estado_painel, -1, using)
+        painel.somar_atividade(*atual, 1, using)
+        invalidar_no_commit('projetos')
+    guardar_estado_atividade(sender, instance)
+
+
+@receiver(post_delete, sender=Atividade)
+def descontar_atividade(sender, instance, using, **kwargs):
+    if None not in instance._estado_painel:
+        painel.somar_atividade(*instance._estado_painel, -1, using)
+        invalidar_no_commit('projetos')
+
+
+@receiver(post_init, sender=Relatorio)
+def guardar_datas_relatorio(sender, instance, **kwargs):
+    instance._estado_painel = tuple(
+        instance.__dict__.get(campo)
+        for campo in ('projeto_id', 'data_relatorio', 'publico')
+    )
+
+
+@receiver(post_save, sender=Relatorio)
+def atualizar_ultimo_relatorio(sender, instance, created, using,
+                               update_fields=None, **kwargs):
+    atual = (instance.projeto_id, instance.data_relatorio, instance.publico)
+    if created or (campos_alterados(
+        ['projeto', 'projeto_id', 'data_relatorio', 'publico'], update_fields
+    ) and instance._estado_painel != atual):
+        projetos = {instance._estado_painel[0], instance.projeto_id} - {None}
+        for projeto_id in projetos:
+            painel.atualizar_relatorios(projeto_id, using)
+        invalidar_no_commit('projetos')
+    guardar_datas_relatorio(sender, instance)
+
+
+@receiver(post_delete, sender=Relatorio)
+def recalcular_ultimo_relatorio(sender, instance, using, **kwargs):
+    painel.atualizar_relatorios(instance.projeto_id, using)
+    invalidar_no_commit('projetos')
+
+
+# Cache de autenticação por token
+@receiver(post_delete, sender=Token)
+def invalidar_token_excluido(sender, instance, **kwargs):
+    authentication.invalidar(instance.key)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_tokens_do_usuario(sender, instance, **kwargs):
+    # Senha, tipo_usuario e is_active mudam o resultado da autenticação
+    authentication.invalidar_usuario(instance.pk)
@@ -0,0 +1,234 @@
+"""Fila de tarefas em segundo plano guardada no próprio banco.
+
+Efeitos colaterais lentos (aprovação de propostas, e-mails, montagem de
+arquivos enviados) saem da requisição: a view grava uma ``Tarefa`` e
+responde, e ``manage.py processar_tarefas`` executa. Como a linha entra
+na transação de quem enfileira, a tarefa só existe se a escrita que a
+originou também existir, e não há broker externo.
+
+Cada tipo é uma função registrada com ``@tarefa(nome)``, que recebe os
+``argumentos`` (JSON) e devolve o ``resultado`` (JSON). O worker reserva
+a próxima pendente (maior ``prioridade`` e ``executar_apos`` mais antigo):
+
+* PostgreSQL: ``select_for_update(skip_locked=True)``, então workers
+  concorrentes pegam linhas diferentes sem esperar uns pelos outros;
+* SQLite: um único ``UPDATE ... WHERE id IN (SELECT ... LIMIT 1)``; o
+  ``BEGIN IMMEDIATE`` de ``extensao.banco`` serializa as reservas.
+
+O ``limite`` de um tipo é o máximo de tarefas dele executando ao mesmo
+tempo entre todos os workers (no PostgreSQL, duas reservas simultâneas
+podem passar dele por uma). Uma falha volta a tarefa para a fila com
+espera exponencial até ``max_tentativas``; ``FalhaDefinitiva`` encerra na
+hora. Tarefas de um worker que morreu voltam à fila depois de
+``TAREFAS['PRAZO_SEGUNDOS']``. A entrega é "ao menos uma vez": um tipo
+deve tolerar rodar de novo.
+"""
+import logging
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+PADRAO = {
+    'CONCORRENCIA': 2,
+    'INTERVALO_SEGUNDOS': 1,
+    'MAX_TENTATIVAS': 5,
+    'ESPERA_BASE_SEGUNDOS': 10,
+    'ESPERA_MAXIMA_SEGUNDOS': 3600,
+    'PRAZO_SEGUNDOS': 600,
+}
+
+Tipo = namedtuple('Tipo', 'funcao limite prioridade max_tentativas')
+TIPOS = {}
+
+
+def configuracao():
+    return {**PADRAO, **getattr(settings, 'TAREFAS', {})}
+
+
+class FalhaDefinitiva(Exception):
+    """Erro que não adianta repetir: a tarefa falha sem nova tentativa."""
+
+
+def tarefa(nome, limite=None, prioridade=0, max_tentativas=None):
+    """Registra a função como o tipo de tarefa ``nome``."""
+    def registrar(funcao):
+        TIPOS[nome] = Tipo(funcao, limite, prioridade, max_tentativas)
+        return funcao
+    return registrar
+
+
+def nova(tipo, argumentos, usuario, prioridade, atraso):
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}.')
+    registrado = TIPOS[tipo]
+    return Tarefa(
+        tipo=tipo,
+        argumentos=argumentos or {},
+        usuario=usuario,
+        prioridade=(
+            registrado.prioridade if prioridade is None else prioridade
+        ),
+        max_tentativas=(
+            registrado.max_tentativas or configuracao()['MAX_TENTATIVAS']
+        ),
+        executar_apos=timezone.now() + timedelta(seconds=atraso),
+    )
+
+
+def enfileirar(tipo, argumentos=None, usuario=None, prioridade=None,
+               atraso=0):
+    """Grava a tarefa na transação corrente e a devolve."""
+    tarefa = nova(tipo, argumentos, usuario, prioridade, atraso)
+    tarefa.save()
+    return tarefa
+
+
+def enfileirar_varias(tipo, lista, usuario=None, prioridade=None):
+    """Uma tarefa por item de ``lista`` (argumentos), num INSERT só."""
+    return Tarefa.objects.bulk_create([
+        nova(tipo, argumentos, usuario, prioridade, 0)
+        for argumentos in lista
+    ])
+
+
+def espera(tentativa):
+    """Segundos até a próxima tentativa: base * 2^(n-1), com teto."""
+    config = configuracao()
+    return min(
+        config['ESPERA_BASE_SEGUNDOS'] * 2 ** (tentativa - 1),
+        config['ESPERA_MAXIMA_SEGUNDOS'],
+    )
+
+
+def tipos_lotados():
+    executando = Tarefa.objects.filter(status='executando').values(
+        'tipo'
+    ).annotate(total=Count('pk')).order_by()
+    return [
+        linha['tipo'] for linha in executando
+        if linha['tipo'] in TIPOS and TIPOS[linha['tipo']].limite and
+        linha['total'] >= TIPOS[linha['tipo']].limite
+    ]
+
+
+def reservar(trabalhador):
+    """Marca a próxima tarefa pronta como ``executando`` e a devolve."""
+    agora = timezone.now()
+    reserva = f'{trabalhador}:{uuid.uuid4().hex}'
+    banco = router.db_for_write(Tarefa)
+    with transaction.atomic(using=banco):
+        prontas = Tarefa.objects.using(banco).filter(
+            status='pendente', executar_apos__lte=agora
+        ).exclude(tipo__in=tipos_lotados()).order_by(
+            '-prioridade', 'executar_apos', 'pk'
+        )
+        if connections[banco].features.has_select_for_update_skip_locked:
+            pk = prontas.select_for_update(skip_locked=True).values_list(
+                'pk', flat=True
+            ).first()
+            escolhidas = Tarefa.objects.using(banco).filter(pk=pk)
+        else:
+            escolhidas = Tarefa.objects.using(banco).filter(
+                pk__in=prontas.values('pk')[:1]
+            )
+        reservadas = escolhidas.update(
+            status='executando', reserva=reserva, reservada_em=agora,
+            tentativas=F('tentativas') + 1,
+        )
+    if not reservadas:
+        return None
+    return Tarefa.objects.using(banco).get(
+        status='executando', reserva=reserva
+    )
+
+
+def encerrar(tarefa, **campos):
+    """Grava o desfecho se a reserva ainda for desta execução."""
+    return Tarefa.objects.filter(
+        pk=tarefa.pk, status='executando', reserva=tarefa.reserva
+    ).update(reserva='', **campos)
+
+
+def executar(tarefa):
+    """Roda uma tarefa reservada; devolve True se ela foi concluída."""
+    try:
+        if tarefa.tipo not in TIPOS:
+            raise FalhaDefinitiva(f'Tipo desconhecido: {tarefa.tipo}.')
+        resultado = TIPOS[tarefa.tipo].funcao(**tarefa.argumentos)
+    except Exception as erro:
+        definitiva = (
+            isinstance(erro, FalhaDefinitiva) or
+            tarefa.tentativas >= tarefa.max_tentativas
+        )
+        logger.warning(
+            'Tarefa %s (%s) falhou na tentativa %s/%s: %s', tarefa.pk,
+            tarefa.tipo, tarefa.tentativas, tarefa.max_tentativas, erro,
+            exc_info=not isinstance(erro, FalhaDefinitiva)
+        )
+        texto = (
+            str(erro) if isinstance(erro, FalhaDefinitiva)
+            else traceback.format_exc()
+        )
+        if definitiva:
+            encerrar(
+                tarefa, status='falhou', erro=texto,
+                data_conclusao=timezone.now()
+            )
+        else:
+            encerrar(
+                tarefa, status='pendente', erro=texto,
+                executar_apos=timezone.now() + timedelta(
+                    seconds=espera(tarefa.tentativas)
+                )
+            )
+        return False
+    encerrar(
+        tarefa, status='concluida', resultado=resultado, erro='',
+        data_conclusao=timezone.now()
+    )
+    return True
+
+
+def recuperar_travadas():
+    """Devolve à fila as tarefas reservadas há mais que o prazo.
+
+    O worker que as reservou morreu ou travou; se ele ainda terminar,
+    ``encerrar`` ignora o desfecho porque a reserva mudou.
+    """
+    agora = timezone.now()
+    travadas = Tarefa.objects.filter(
+        status='executando',
+        reservada_em__lt=agora - timedelta(
+            seconds=configuracao()['PRAZO_SEGUNDOS']
+        ),
+    )
+    erro = 'Prazo de execução esgotado.'
+    esgotadas = travadas.filter(tentativas__gte=F('max_tentativas')).update(
+        status='falhou', reserva='', erro=erro, data_conclusao=agora
+    )
+    devolvidas = travadas.update(
+        status='pendente', reserva='', erro=erro, executar_apos=agora
+    )
+    return esgotadas + devolvidas
+
+
+def processar(trabalhador='local', maximo=None):
+    """Executa tarefas prontas até a fila esvaziar (ou ``maximo``)."""
+    executadas = 0
+    while maximo is None or executadas < maximo:
+        tarefa = reservar(trabalhador)
+        if tarefa is None:
+            break
+        executar(tarefa)
+        executadas += 1
+    return executadas
@@ -1,3 +1,2441 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate as django_authenticate
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from extensao import banco
+
+from . import authentication, busca
+from . import cache as cache_publico
+from . import (leitura, metricas, middleware, painel, renderers,
+               roteamento, semeadura, senhas, tarefas)
+from .busca import buscar
+from .models import (Atividade, Contador, EnvioParcial, Entrega, Projeto,
+                     Proposta, Relatorio, ResumoProjeto, Tarefa, Usuario)
+from .pagination import PaginacaoKeyset
+from .throttling import AutenticacaoPorIPThrottle, LoginPorUsuarioThrottle
+from .serializers import (ProjetoListaRapida, ProjetoListSerializer,
+                          ProjetoPublicoListaRapida,
+                          ProjetoPublicoListSerializer, ProjetoSerializer, PropostaBuscaRapida,
+                          PropostaBuscaSerializer, PropostaListaRapida,
+                          PropostaListSerializer, RelatorioPublicoBuscaRapido,
+                          RelatorioPublicoBuscaSerializer,
+                          RelatorioPublicoRapido, RelatorioPublicoSerializer)
+
+
+# /api/metrics/ só responde sem token com DEBUG ligado
+METRICAS_COM_TOKEN = {'LIMITE_LENTO_MS': 500, 'TOKEN': 'segredo'}
+
+
+def setUpModule():
+    # A suíte passa do limite de requisição lenta; o log só polui a saída
+    # (os testes do log usam assertLogs, que baixa o nível de novo)
+    logger = logging.getLogger('core.lento')
+    nivel = logger.level
+    logger.setLevel(logging.ERROR)
+    addModuleCleanup(logger.setLevel, nivel)
+
+
+def criar_usuario(username, tipo_usuario='comunidade', password=None,
+                  **extra):
+    # Sem senha o create_user não roda o PBKDF2, o que acelera a semeadura
+    return Usuario.objects.create_user(
+        username=username,
+        password=password,
+        tipo_usuario=tipo_usuario,
+        first_name=extra.pop('first_name', username.title()),
+        email=extra.pop('email', f'{username}@exemplo.com'),
+        **extra
+    )
+
+
+def criar_proposta(usuario, titulo='Proposta', **extra):
+    dados = {
+        'titulo': titulo,
+        'descricao': 'Descrição',
+        'problema_resolver': 'Problema',
+        'publico_alvo': 'Público',
+        'relevancia_social': 'Relevância',
+    }
+    dados.update(extra)
+    return Proposta.objects.create(usuario=usuario, **dados)
+
+
+def criar_projeto(proposta, professor=None, **extra):
+    dados = {
+        'titulo': proposta.titulo,
+        'descricao': proposta.descricao,
+        'objetivos': proposta.problema_resolver,
+        'impacto_esperado': proposta.relevancia_social,
+        'data_inicio': date(2025, 3, 1),
+        'professor_responsavel': professor,
+    }
+    dados.update(extra)
+    return Projeto.objects.create(proposta_origem=proposta, **dados)
+
+
+class DadosSemeadosMixin:
+    """Semeia mais linhas que o PAGE_SIZE em todas as listagens."""
+
+    quantidade = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = criar_usuario('coord', 'coordenador')
+        cls.comunidade = criar_usuario('comunidade')
+        cls.professor = criar_usuario('prof', 'professor')
+        cls.propostas = []
+        cls.projetos = []
+        for i in range(cls.quantidade):
+            # Um autor diferente por proposta para expor N+1 em usuario
+            autor = criar_usuario(f'autor{i}', organizacao=f'Org {i}')
+            proposta = criar_proposta(autor, f'Proposta {i}')
+            criar_proposta(cls.comunidade, f'Minha proposta {i}')
+            projeto = criar_projeto(
+                proposta, cls.professor, data_inicio=date(2025, 1, 1 + i)
+            )
+            Relatorio.objects.create(
+                projeto=projeto, titulo=f'Relatório {i}',
+                conteudo='Conteúdo', data_relatorio=date(2025, 2, 1 + i),
+                publico=True
+            )
+            Atividade.objects.create(projeto=projeto, descricao='Atividade')
+            Entrega.objects.create(
+                projeto=projeto, descricao='Entrega',
+                arquivo='entregas/arquivo.pdf'
+            )
+            cls.propostas.append(proposta)
+            cls.projetos.append(projeto)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache_publico.obter_cache().clear()
+
+
+class OrcamentoDeQueriesTests(DadosSemeadosMixin, TestCase):
+    """Cada endpoint roda um número fixo de queries, qualquer que seja
+    o tamanho da página."""
+
+    def assertQueries(self, numero, url, usuario=None):
+        if usuario is not None:
+            self.client.force_authenticate(usuario)
+        with self.assertNumQueries(numero):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_propostas_lista_coordenador(self):
+        response = self.assertQueries(2, '/api/propostas/', self.coordenador)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_propostas_lista_comunidade(self):
+        response = self.assertQueries(2, '/api/propostas/', self.comunidade)
+        self.assertEqual(response.data['count'], self.quantidade)
+
+    def test_propostas_detalhe(self):
+        proposta = self.propostas[0]
+        response = self.assertQueries(
+            1, f'/api/propostas/{proposta.id}/', self.coordenador
+        )
+        self.assertEqual(
+            response.data['usuario_organizacao'], 'Org 0'
+        )
+
+    def test_projetos_lista(self):
+        self.assertQueries(2, '/api/projetos/', self.coordenador)
+
+    def test_projetos_detalhe(self):
+        projeto = self.projetos[0]
+        response = self.assertQueries(
+            1, f'/api/projetos/{projeto.id}/', self.coordenador
+        )
+        self.assertEqual(response.data['professor_nome'], 'Prof')
+
+    def test_projetos_relatorios(self):
+        projeto = self.projetos[0]
+        # Projeto + COUNT + página; no modo cursor não há COUNT
+        self.assertQueries(
+            3, f'/api/projetos/{projeto.id}/relatorios/', self.coordenador
+        )
+        self.assertQueries(
+            2, f'/api/projetos/{projeto.id}/relatorios/?cursor=',
+            self.coordenador
+        )
+
+    def test_publico_projetos_lista(self):
+        self.assertQueries(2, '/api/publico/projetos/')
+
+    def test_publico_projetos_detalhes(self):
+        projeto = self.projetos[0]
+        self.assertQueries(1, f'/api/publico/projetos/{projeto.id}/detalhes/')
+
+    def test_publico_relatorios_lista(self):
+        response = self.assertQueries(2, '/api/publico/relatorios/')
+        self.assertEqual(
+            response.data['results'][0]['projeto_titulo'],
+            self.projetos[-1].titulo
+        )
+
+    def test_publico_relatorios_detalhe(self):
+        relatorio = self.projetos[0].relatorios.get()
+        self.assertQueries(1, f'/api/publico/relatorios/{relatorio.id}/')
+
+    def test_relatorios_atividades_entregas_lista(self):
+        for url in ['/api/relatorios/', '/api/atividades/', '/api/entregas/']:
+            with self.subTest(url=url):
+                self.assertQueries(2, url)
+
+    def test_str_dos_filhos_nao_consulta_projeto(self):
+        for queryset in [
+            Relatorio.objects.select_related('projeto'),
+            Entrega.objects.select_related('projeto'),
+            Atividade.objects.select_related('projeto'),
+        ]:
+            objetos = list(queryset)
+            with self.assertNumQueries(0):
+                [str(objeto) for objeto in objetos]
+
+
+class PaginacaoCursorTests(DadosSemeadosMixin, TestCase):
+
+    def percorrer(self, url):
+        ids = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_percorre_feed_publico_sem_count(self):
+        ids = self.percorrer('/api/publico/relatorios/?cursor=')
+        esperados = list(
+            Relatorio.objects.filter(publico=True)
+            .order_by('-data_relatorio', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+
+    def test_cursor_desempata_datas_iguais_pelo_id(self):
+        # Todas as propostas da comunidade têm a mesma data de submissão
+        Proposta.objects.filter(usuario=self.comunidade).update(
+            data_submissao='2025-01-01T00:00:00Z'
+        )
+        self.client.force_authenticate(self.comunidade)
+        ids = self.percorrer('/api/propostas/?cursor=')
+        self.assertEqual(len(ids), self.quantidade)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_cursor_estavel_com_insercoes_no_topo(self):
+        primeira = self.client.get('/api/publico/projetos/?cursor=').data
+        proposta = criar_proposta(self.comunidade, 'Nova')
+        criar_projeto(proposta, data_inicio=date(2030, 1, 1))
+        segunda = self.client.get(primeira['next']).data
+        vistos = {item['id'] for item in primeira['results']}
+        self.assertFalse(vistos & {item['id'] for item in segunda['results']})
+
+    def test_sem_cursor_continua_por_numero_de_pagina(self):
+        response = self.client.get('/api/publico/projetos/?page=2')
+        self.assertEqual(response.data['count'], self.quantidade)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/publico/relatorios/?cursor=xyz')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_adulterado_ou_com_tipos_errados(self):
+        self.client.force_authenticate(self.comunidade)
+        posicoes = (
+            ['abc', 1], [{'a': 1}, 1], [None, None], ['2025-01-05', 'x'],
+            ['2025-01-05', [1]], ['2025-01-05'], {'id': 1}, 'texto',
+        )
+        for url in ('/api/publico/relatorios/', '/api/propostas/'):
+            for posicao in posicoes:
+                cursor = PaginacaoKeyset.codificar_cursor(posicao)
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404, (url, posicao))
+                self.assertEqual(response.data['detail'], 'Cursor inválido.')
+
+    def test_cursor_montado_a_mao_com_tipos_certos(self):
+        cursor = PaginacaoKeyset.codificar_cursor(['2999-01-01', '999999'])
+        response = self.client.get(
+            '/api/publico/relatorios/', {'cursor': cursor}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'])
+
+
+class CachePublicoTests(DadosSemeadosMixin, TestCase):
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_segunda_leitura_nao_consulta_o_banco(self):
+        primeira = self.get('/api/publico/relatorios/?page=2', 2)
+        segunda = self.get('/api/publico/relatorios/?page=2', 0)
+        self.assertEqual(primeira.data, segunda.data)
+        # Outra query string é outra entrada
+        self.get('/api/publico/relatorios/', 2)
+
+    def test_virada_de_publico_invalida_relatorios(self):
+        self.get('/api/publico/relatorios/', 2)
+        relatorio = Relatorio.objects.get(titulo='Relatório 0')
+        relatorio.publico = False
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio.save()
+        response = self.get('/api/publico/relatorios/', 2)
+        self.assertEqual(response.data['count'], self.quantidade - 1)
+
+    def test_relatorio_privado_nao_invalida(self):
+        relatorio = Relatorio.objects.get(titulo='Relatório 0')
+        relatorio.publico = False
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio.save()
+        self.get('/api/publico/relatorios/', 2)
+        relatorio.conteudo = 'Rascunho'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            relatorio.save()
+        self.assertEqual(callbacks, [])
+        self.get('/api/publico/relatorios/', 0)
+
+    def test_mudanca_de_status_invalida_projetos(self):
+        projeto = self.projetos[0]
+        url = f'/api/publico/projetos/{projeto.id}/detalhes/'
+        self.get(url, 1)
+        self.get(url, 0)
+        projeto.status = 'suspenso'
+        with self.captureOnCommitCallbacks(execute=True):
+            projeto.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_titulo_do_projeto_invalida_relatorios(self):
+        self.get('/api/publico/relatorios/', 2)
+        projeto = Projeto.objects.get(pk=self.projetos[-1].pk)
+        projeto.titulo = 'Novo título'
+        with self.captureOnCommitCallbacks(execute=True):
+            projeto.save()
+        response = self.get('/api/publico/relatorios/', 2)
+        self.assertEqual(
+            response.data['results'][0]['projeto_titulo'], 'Novo título'
+        )
+
+    def test_estatisticas(self):
+        self.get('/api/publico/projetos/', 2)
+        self.get('/api/publico/projetos/', 0)
+        self.get('/api/publico/projetos/', 0)
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/cache/estatisticas/')
+        self.assertEqual(response.data['projetos'], {
+            'hits': 2, 'misses': 1, 'hit_ratio': 0.6667
+        })
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.get('/api/cache/estatisticas/')
+        self.assertEqual(response.status_code, 403)
+
+
+class RequisicaoCondicionalTests(DadosSemeadosMixin, TestCase):
+
+    def revalidar(self, url, etag, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_detalhe_304_sem_serializar(self):
+        self.client.force_authenticate(self.coordenador)
+        url = f'/api/projetos/{self.projetos[0].id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with mock.patch.object(
+            ProjetoSerializer, 'to_representation'
+        ) as to_representation:
+            revalidada = self.revalidar(url, response['ETag'], 1)
+        self.assertEqual(revalidada.status_code, 304)
+        self.assertEqual(revalidada.content, b'')
+        self.assertEqual(revalidada['ETag'], response['ETag'])
+        to_representation.assert_not_called()
+
+    def test_detalhe_muda_etag_ao_salvar(self):
+        self.client.force_authenticate(self.coordenador)
+        proposta = self.propostas[0]
+        url = f'/api/propostas/{proposta.id}/'
+        etag = self.client.get(url)['ETag']
+        proposta.titulo = 'Outro título'
+        proposta.save()
+        response = self.revalidar(url, etag, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_no_detalhe(self):
+        self.client.force_authenticate(self.coordenador)
+        url = f'/api/propostas/{self.propostas[0].id}/'
+        ultima = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(response.status_code, 304)
+
+    def test_lista_304_e_exclusao_invalida(self):
+        self.client.force_authenticate(self.comunidade)
+        url = '/api/propostas/?page=2'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidar(url, etag, 2).status_code, 304)
+        Proposta.objects.filter(usuario=self.comunidade).first().delete()
+        self.assertEqual(self.revalidar(url, etag, 2).status_code, 200)
+
+    def test_lista_em_modo_cursor(self):
+        self.client.force_authenticate(self.comunidade)
+        url = '/api/propostas/?cursor='
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidar(url, etag, 1).status_code, 304)
+        Proposta.objects.filter(usuario=self.comunidade).update(
+            status='aprovada', data_atualizacao=timezone.now()
+        )
+        self.assertEqual(self.revalidar(url, etag, 1).status_code, 200)
+
+    def test_etag_varia_com_a_representacao(self):
+        url = '/api/atividades/'
+        json = self.client.get(url, HTTP_ACCEPT='application/json')
+        html = self.client.get(url, HTTP_ACCEPT='text/html')
+        self.assertNotEqual(json['ETag'], html['ETag'])
+
+    def test_feed_publico_304_sem_queries(self):
+        url = '/api/publico/relatorios/'
+        response = self.client.get(url)
+        self.assertEqual(self.revalidar(url, response['ETag'], 0).status_code,
+                         304)
+        relatorio = Relatorio.objects.get(titulo='Relatório 3')
+        relatorio.conteudo = 'Revisado'
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio.save()
+        self.assertEqual(self.revalidar(url, response['ETag'], 2).status_code,
+                         200)
+
+
+class BuscaTextualTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = criar_usuario('coord', 'coordenador')
+        cls.comunidade = criar_usuario('comunidade')
+        cls.horta = criar_proposta(
+            cls.comunidade, 'Horta comunitária',
+            descricao='Cultivo de alimentos orgânicos na escola'
+        )
+        cls.educacao = criar_proposta(
+            cls.comunidade, 'Reforço escolar',
+            publico_alvo='Crianças do bairro', relevancia_social='Horta'
+        )
+        criar_proposta(criar_usuario('outro'), 'Oficina de robótica')
+        projeto = criar_projeto(cls.horta)
+        cls.publico = Relatorio.objects.create(
+            projeto=projeto, titulo='Colheita', publico=True,
+            conteudo='Primeira colheita de alface e educação ambiental',
+            data_relatorio=date(2025, 5, 1)
+        )
+        Relatorio.objects.create(
+            projeto=projeto, titulo='Interno', publico=False,
+            conteudo='Educação ambiental (rascunho)',
+            data_relatorio=date(2025, 5, 2)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache_publico.obter_cache().clear()
+
+    def test_busca_ranqueia_titulo_acima_do_corpo(self):
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/propostas/', {'q': 'horta'})
+        resultados = response.data['results']
+        self.assertEqual(
+            [item['id'] for item in resultados],
+            [self.horta.id, self.educacao.id]
+        )
+        self.assertIn('<mark>Horta</mark>', resultados[0]['trecho'])
+        self.assertGreater(
+            resultados[0]['relevancia'], resultados[1]['relevancia']
+        )
+
+    def test_busca_por_prefixo_e_sem_acentos(self):
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/propostas/', {'q': 'organico'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_busca_respeita_escopo_do_usuario(self):
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.get('/api/propostas/', {'q': 'robótica'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_sintaxe_do_fts_nao_quebra(self):
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/propostas/', {'q': '"horta* OR ('})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/propostas/', {'q': '***'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_relatorios_publicos(self):
+        response = self.client.get(
+            '/api/publico/relatorios/', {'q': 'educação'}
+        )
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.publico.id]
+        )
+        self.assertIn('<mark>educação</mark>',
+                      response.data['results'][0]['trecho'])
+
+    def test_indice_acompanha_alteracoes(self):
+        self.client.force_authenticate(self.coordenador)
+        self.educacao.titulo = 'Aulas de xadrez'
+        self.educacao.save()
+        response = self.client.get('/api/propostas/', {'q': 'xadrez'})
+        self.assertEqual(response.data['count'], 1)
+        self.educacao.delete()
+        response = self.client.get('/api/propostas/', {'q': 'xadrez'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_comando_reindexa_em_lotes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_busca_proposta')
+        saida = StringIO()
+        call_command('reindexar_busca', '--indice', 'proposta',
+                     '--lote', '2', stdout=saida)
+        self.assertIn('proposta: 2 linhas indexadas', saida.getvalue())
+        self.assertIn('(3 linhas)', saida.getvalue())
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/propostas/', {'q': 'robotica'})
+        self.assertEqual(response.data['count'], 1)
+
+
+    def test_trecho_escapa_html_guardado(self):
+        payload = criar_proposta(
+            self.comunidade, 'Mutirão <img src=x onerror=alert(1)>',
+            descricao='Pomar <script>alert(1)</script> comunitário'
+        )
+        self.client.force_authenticate(self.coordenador)
+        for q in ('mutirão', 'pomar'):
+            response = self.client.get('/api/propostas/', {'q': q})
+            [item] = response.data['results']
+            self.assertEqual(item['id'], payload.id)
+            self.assertNotIn('<img', item['trecho'])
+            self.assertNotIn('<script', item['trecho'])
+            self.assertIn('<mark>', item['trecho'])
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt;', self.client.get(
+            '/api/propostas/', {'q': 'mutirão'}
+        ).data['results'][0]['trecho'])
+
+        Relatorio.objects.create(
+            projeto=self.publico.projeto, publico=True,
+            titulo='Feira <b onmouseover=alert(1)>livre</b>', conteudo='',
+            data_relatorio=date(2025, 6, 1)
+        )
+        response = self.client.get('/api/publico/relatorios/', {'q': 'feira'})
+        trecho = response.data['results'][0]['trecho']
+        self.assertIn('<mark>Feira</mark>', trecho)
+        self.assertIn('&lt;b onmouseover=alert(1)&gt;', trecho)
+
+    def test_reconstrucao_interrompida_mantem_o_indice(self):
+        geracao = busca.reconstruir('proposta', Proposta, lote=1)
+        self.assertEqual(next(geracao), 1)
+        # Outra conexão veria o índice antigo; aqui, o rollback o devolve
+        geracao.close()
+        self.client.force_authenticate(self.coordenador)
+        response = self.client.get('/api/propostas/', {'q': 'robotica'})
+        self.assertEqual(response.data['count'], 1)
+
+class ExportacaoTests(DadosSemeadosMixin, TestCase):
+
+    def exportar(self, url, **parametros):
+        self.client.force_authenticate(self.coordenador)
+        return self.client.get(url, parametros)
+
+    def conteudo(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_de_propostas_com_campos_do_usuario(self):
+        with self.assertNumQueries(1):
+            response = self.exportar('/api/exportar/propostas/')
+            linhas = list(csv.DictReader(
+                StringIO(self.conteudo(response))
+            ))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(linhas), 2 * self.quantidade)
+        primeira = linhas[0]
+        self.assertEqual(primeira['usuario_organizacao'], 'Org 0')
+        self.assertEqual(primeira['usuario_email'], 'autor0@exemplo.com')
+        self.assertEqual(primeira['usuario_nome'], 'Autor0')
+
+    def test_ndjson_filtrado_por_status_e_datas(self):
+        Atividade.objects.filter(projeto=self.projetos[0]).update(
+            status='concluida'
+        )
+        response = self.exportar(
+            '/api/exportar/atividades/', formato='ndjson',
+            status='concluida'
+        )
+        registros = [
+            json.loads(linha) for linha in self.conteudo(response).splitlines()
+        ]
+        self.assertEqual(len(registros), 1)
+        self.assertEqual(registros[0]['projeto_titulo'], 'Proposta 0')
+
+        response = self.exportar(
+            '/api/exportar/relatorios/', formato='ndjson',
+            desde='2025-02-03', ate='2025-02-04'
+        )
+        datas = [
+            json.loads(linha)['data_relatorio']
+            for linha in self.conteudo(response).splitlines()
+        ]
+        self.assertEqual(datas, ['2025-02-03', '2025-02-04'])
+
+    def test_parametros_invalidos(self):
+        casos = [
+            ('/api/exportar/propostas/', {'formato': 'xml'}),
+            ('/api/exportar/propostas/', {'status': 'inexistente'}),
+            ('/api/exportar/relatorios/', {'status': 'enviada'}),
+            ('/api/exportar/propostas/', {'desde': '2025-02-10',
+                                          'ate': '2025-02-01'}),
+        ]
+        for url, parametros in casos:
+            with self.subTest(parametros=parametros):
+                response = self.exportar(url, **parametros)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.exportar('/api/exportar/usuarios/').status_code, 404
+        )
+
+    def test_somente_coordenador(self):
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.get('/api/exportar/propostas/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command('exportar_dados', 'projetos', '--formato', 'ndjson',
+                     '--status', 'em_execucao', stdout=saida)
+        registros = saida.getvalue().splitlines()
+        self.assertEqual(len(registros), self.quantidade)
+        self.assertEqual(json.loads(registros[0])['professor_nome'], 'Prof')
+
+
+class DecisaoEmLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = criar_usuario('coord', 'coordenador')
+        cls.comunidade = criar_usuario('comunidade')
+        cls.pendentes = [
+            criar_proposta(cls.comunidade, f'Pendente {i}') for i in range(3)
+        ]
+        cls.rejeitada = criar_proposta(
+            cls.comunidade, 'Rejeitada', status='rejeitada'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.coordenador)
+
+    def aprovar_lote(self, ids):
+        """Enfileira a aprovação, roda o worker e devolve os resultados."""
+        response = self.client.post(
+            '/api/propostas/aprovar-lote/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        tarefas.processar()
+        tarefa = self.client.get(response['Location']).data
+        self.assertEqual(tarefa['status'], 'concluida')
+        return tarefa['resultado']['resultados']
+
+    def test_aprovar_lote_reporta_cada_id(self):
+        ids = [p.id for p in self.pendentes] + [self.rejeitada.id, 9999]
+        # Na requisição, só o INSERT da tarefa
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/api/propostas/aprovar-lote/', {'ids': ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['tarefa']['status'], 'pendente')
+        tarefa = tarefas.reservar('teste')
+        # Inclui um UPDATE por grupo de contadores do painel, o INSERT
+        # dos resumos dos projetos criados, o dos e-mails e o desfecho
+        with self.assertNumQueries(11):
+            tarefas.executar(tarefa)
+        tarefa.refresh_from_db()
+        resultados = {
+            item['id']: item for item in tarefa.resultado['resultados']
+        }
+        for proposta in self.pendentes:
+            proposta.refresh_from_db()
+            self.assertEqual(proposta.status, 'aprovada')
+            self.assertEqual(
+                resultados[proposta.id]['projeto_id'],
+                proposta.projeto_gerado.id
+            )
+        self.assertEqual(resultados[self.rejeitada.id]['resultado'],
+                         'ignorada')
+        self.assertEqual(resultados[9999]['motivo'],
+                         'Proposta não encontrada.')
+
+    def test_aprovar_duas_vezes_nao_duplica_projeto(self):
+        ids = [self.pendentes[0].id]
+        self.aprovar_lote(ids)
+        resultados = self.aprovar_lote(ids)
+        self.assertEqual(resultados[0]['resultado'], 'ignorada')
+        self.assertEqual(Projeto.objects.count(), 1)
+
+        response = self.client.post(
+            f'/api/propostas/{self.pendentes[0].id}/aprovar/'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Tarefa.objects.filter(status='pendente').count(), 0)
+
+    def test_aprovar_individual(self):
+        response = self.client.post(
+            f'/api/propostas/{self.pendentes[1].id}/aprovar/'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Projeto.objects.exists())
+        tarefas.processar()
+        [resultado] = self.client.get(
+            response['Location']
+        ).data['resultado']['resultados']
+        projeto = Projeto.objects.get(pk=resultado['projeto_id'])
+        self.assertEqual(projeto.proposta_origem_id, self.pendentes[1].id)
+
+    def test_aprovacao_invalida_cache_publico(self):
+        cache_publico.obter_cache().clear()
+        self.client.get('/api/publico/projetos/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.aprovar_lote([self.pendentes[2].id])
+        response = self.client.get('/api/publico/projetos/')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_rejeitar_lote(self):
+        ids = [self.pendentes[0].id, self.rejeitada.id]
+        response = self.client.post('/api/propostas/rejeitar-lote/',
+                                    {'ids': ids}, format='json')
+        self.assertEqual(
+            [item['resultado'] for item in response.data['resultados']],
+            ['rejeitada', 'ignorada']
+        )
+
+    def test_validacao_e_permissao(self):
+        response = self.client.post('/api/propostas/aprovar-lote/',
+                                    {'ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.post('/api/propostas/aprovar-lote/',
+                                    {'ids': [self.pendentes[0].id]},
+                                    format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class CacheTokenAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_usuario('comunidade', password='senha-segura')
+        cls.token = Token.objects.create(user=cls.usuario)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        authentication.cache_local.clear()
+
+    def perfil(self, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get('/api/auth/perfil/')
+
+    def test_basic_auth_nao_e_aceito(self):
+        credenciais = base64.b64encode(b'comunidade:senha-segura').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credenciais}')
+        # Recusado sem calcular o hash da senha
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/perfil/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_segunda_requisicao_nao_consulta_token(self):
+        self.assertEqual(self.perfil(1).status_code, 200)
+        response = self.perfil(0)
+        self.assertEqual(response.data['username'], 'comunidade')
+
+    def test_mudanca_de_tipo_usuario_invalida(self):
+        self.perfil(1)
+        self.usuario.tipo_usuario = 'coordenador'
+        self.usuario.save()
+        self.assertEqual(self.perfil(1).data['tipo_usuario'], 'coordenador')
+
+    def test_troca_de_senha_invalida(self):
+        self.perfil(1)
+        self.usuario.set_password('outra-senha')
+        self.usuario.save()
+        self.perfil(1)
+
+    def test_logout_invalida(self):
+        self.perfil(1)
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code,
+                         200)
+        self.assertEqual(self.perfil(1).status_code, 401)
+
+    def test_usuario_em_cache_e_uma_copia(self):
+        primeiro = self.perfil(1).wsgi_request.user
+        primeiro.tipo_usuario = 'admin'
+        segundo = self.perfil(0).wsgi_request.user
+        self.assertEqual(segundo.tipo_usuario, 'comunidade')
+
+    def test_lru_e_ttl(self):
+        cache = authentication.CacheLRU()
+        cache.set('a', 1, ttl=60, max_entradas=2)
+        cache.set('b', 2, ttl=60, max_entradas=2)
+        cache.get('a')
+        cache.set('c', 3, ttl=60, max_entradas=2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('d', 4, ttl=-1, max_entradas=2)
+        self.assertIsNone(cache.get('d'))
+
+    @override_settings(AUTH_TOKEN_CACHE={'ALIAS': 'default'})
+    def test_cache_compartilhado(self):
+        caches['default'].clear()
+        self.perfil(1)
+        self.perfil(0)
+        self.token.delete()
+        self.assertEqual(self.perfil(1).status_code, 401)
+
+
+class SenhasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = criar_usuario('comunidade', password='senha-segura')
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['default'].clear()
+        senhas.estatisticas.limpar()
+
+    def login(self, username='comunidade', password='senha-segura', **extra):
+        return self.client.post('/api/auth/login/', {
+            'username': username, 'password': password,
+        }, format='json', **extra)
+
+    def test_login_e_registro_calculam_no_pool(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login(password='errada').status_code, 400)
+        # Usuário inexistente custa um hash, como um existente
+        self.assertEqual(self.login(username='ninguem').status_code, 400)
+        response = self.client.post('/api/auth/registro/', {
+            'username': 'novo', 'email': 'Novo@EXEMPLO.com',
+            'password': 'senha-forte-1', 'password_confirm': 'senha-forte-1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        novo = Usuario.objects.get(username='novo')
+        self.assertEqual(novo.email, 'Novo@exemplo.com')
+        self.assertEqual(novo.tipo_usuario, 'comunidade')
+        self.assertTrue(novo.check_password('senha-forte-1'))
+        self.assertEqual(senhas.estatisticas.copia()['hashes'], 4)
+
+        with override_settings(METRICAS=METRICAS_COM_TOKEN):
+            texto = self.client.get(
+                '/api/metrics/', HTTP_AUTHORIZATION='Bearer segredo'
+            ).content.decode()
+        self.assertIn('cadpro_senha_fila_seconds_count 4', texto)
+        self.assertIn('cadpro_senha_em_andamento 0', texto)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_hash_antigo_e_regravado_no_login(self):
+        with self.settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.MD5PasswordHasher'
+        ]):
+            self.usuario.set_password('senha-segura')
+            self.usuario.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('pbkdf2_sha256$'))
+
+    @override_settings(SENHAS={
+        'PROCESSOS': 0, 'CONCORRENCIA': 1, 'ESPERA_MAXIMA': 0.05
+    })
+    def test_fila_cheia_responde_503(self):
+        _, limite = senhas.executor.obter(senhas.configuracao())
+        limite.acquire()
+        try:
+            response = self.login()
+        finally:
+            limite.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(senhas.estatisticas.copia()['recusados'], 1)
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(SENHAS={
+        'PROCESSOS': 0, 'CONCORRENCIA': 1, 'ESPERA_MAXIMA': 0.05
+    })
+    def test_fila_cheia_fora_da_api_recusa_o_login(self):
+        criar_usuario(
+            'admin', is_staff=True, is_superuser=True, password='senha-admin'
+        )
+        _, limite = senhas.executor.obter(senhas.configuracao())
+        limite.acquire()
+        try:
+            self.assertIsNone(django_authenticate(
+                username='comunidade', password='senha-segura'
+            ))
+            response = self.client.post('/admin/login/', {
+                'username': 'admin', 'password': 'senha-admin',
+            })
+        finally:
+            limite.release()
+        # O formulário do admin recusa o login em vez de responder 500
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_limites_por_usuario_e_por_ip(self):
+        with mock.patch.object(
+            LoginPorUsuarioThrottle, 'THROTTLE_RATES',
+            {'autenticacao': '100/min', 'login_usuario': '2/min'}
+        ):
+            for ip in ('10.0.0.1', '10.0.0.2'):
+                self.login(password='errada', REMOTE_ADDR=ip)
+            response = self.login(REMOTE_ADDR='10.0.0.3')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            # Outro usuário, mesmo IP
+            self.assertEqual(
+                self.login(username='outro', REMOTE_ADDR='10.0.0.3')
+                .status_code, 400
+            )
+        with mock.patch.object(
+            AutenticacaoPorIPThrottle, 'THROTTLE_RATES',
+            {'autenticacao': '1/min'}
+        ):
+            caches['default'].clear()
+            self.login(REMOTE_ADDR='10.0.0.4')
+            response = self.client.post(
+                '/api/auth/registro/', {}, format='json',
+                REMOTE_ADDR='10.0.0.4'
+            )
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(senhas.estatisticas.copia()['hashes'], 4)
+
+
+@override_settings(METRICAS=METRICAS_COM_TOKEN)
+class MetricasTests(DadosSemeadosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        metricas.registro.limpar()
+
+    def test_exporta_contagem_latencia_e_queries(self):
+        self.client.get('/api/publico/projetos/')
+        self.client.get('/api/publico/projetos/')
+        self.client.get('/api/nao-existe/')
+        texto = self.client.get(
+            '/api/metrics/', HTTP_AUTHORIZATION='Bearer segredo'
+        ).content.decode()
+
+        rotulos = 'rota="publico-projetos-list",metodo="GET"'
+        self.assertIn(
+            f'cadpro_http_requests_total{{{rotulos},status="200"}} 2', texto
+        )
+        self.assertIn(
+            f'cadpro_http_request_duration_seconds_count{{{rotulos}}} 2',
+            texto
+        )
+        # Só o primeiro GET foi ao banco (o segundo veio do cache)
+        self.assertIn(f'cadpro_db_queries_total{{{rotulos}}} 2', texto)
+        self.assertIn('rota="nao_resolvida"', texto)
+        self.assertIn(
+            'cadpro_cache_publico_hits_total{namespace="projetos"} 1', texto
+        )
+        self.assertRegex(
+            texto,
+            r'cadpro_serializer_duration_seconds_total\{'
+            + rotulos + r'\} 0\.0*[1-9]'
+        )
+
+    def test_exige_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.client.get(
+            '/api/metrics/', HTTP_AUTHORIZATION='Bearer errado'
+        ).status_code, 403)
+        response = self.client.get(
+            '/api/metrics/', HTTP_AUTHORIZATION='Bearer segredo'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICAS={'LIMITE_LENTO_MS': 500, 'TOKEN': None})
+    def test_sem_token_so_com_debug(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with override_settings(DEBUG=True):
+            response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICAS={'LIMITE_LENTO_MS': 0, 'TOKEN': None})
+    def test_log_de_requisicao_lenta_com_sql(self):
+        with self.assertLogs('core.lento', 'WARNING') as logs:
+            self.client.get('/api/publico/relatorios/')
+        self.assertIn('/api/publico/relatorios/', logs.output[0])
+        self.assertIn('FROM "core_relatorio"', logs.output[0])
+
+
+class SemearDadosTests(TestCase):
+
+    def semear(self, *argumentos):
+        saida = StringIO()
+        call_command(
+            'semear_dados', '--escala', '0.02', '--lote', '7', *argumentos,
+            stdout=saida
+        )
+        return saida.getvalue()
+
+    def test_semeia_todos_os_modelos_e_tipos_de_usuario(self):
+        self.semear()
+
+        tipos = set(Usuario.objects.values_list('tipo_usuario', flat=True))
+        self.assertEqual(
+            tipos, {codigo for codigo, _ in Usuario.TIPO_USUARIO_CHOICES}
+        )
+        self.assertEqual(Proposta.objects.count(), 20)
+        aprovadas = Proposta.objects.filter(status='aprovada').count()
+        self.assertEqual(Projeto.objects.count(), aprovadas)
+        self.assertEqual(Relatorio.objects.count(), 4 * aprovadas)
+        self.assertEqual(Atividade.objects.count(), 8 * aprovadas)
+        self.assertEqual(Entrega.objects.count(), 2 * aprovadas)
+        # As datas de submissão são espalhadas, não o instante do lote
+        self.assertGreater(
+            Proposta.objects.values('data_submissao').distinct().count(), 1
+        )
+        # bulk_create não dispara signals: o índice é alimentado à parte
+        response = APIClient().get(
+            '/api/publico/relatorios/', {'q': 'comunidade'}
+        )
+        self.assertTrue(response.json()['results'])
+
+    def test_reproduzivel_e_recriavel_com_limpar(self):
+        self.semear()
+        titulos = list(
+            Proposta.objects.order_by('pk').values_list('titulo', flat=True)
+        )
+        with self.assertRaisesMessage(CommandError, '--limpar'):
+            self.semear()
+
+        self.semear('--limpar')
+        self.assertEqual(
+            list(Proposta.objects.order_by('pk').values_list(
+                'titulo', flat=True
+            )),
+            titulos
+        )
+
+
+class LeituraRapidaTests(DadosSemeadosMixin, TestCase):
+    """As listagens rápidas geram os mesmos bytes que os serializers."""
+
+    def assertParidade(self, rapida, serializer, queryset):
+        esperado = JSONRenderer().render(
+            serializer(queryset, many=True).data
+        )
+        obtido = JSONRenderer().render(
+            rapida(rapida.consultar(queryset), many=True).data
+        )
+        self.assertEqual(obtido, esperado)
+
+    def test_subclasse_sem_linha_falha_na_definicao(self):
+        with self.assertRaises(TypeError):
+            class SemLinha(leitura.LeituraRapida):
+                colunas = ('id',)
+
+    def test_propostas(self):
+        Usuario.objects.filter(pk=self.comunidade.pk).update(last_name='')
+        Usuario.objects.filter(pk=self.propostas[0].usuario_id).update(
+            first_name='Ana', last_name='Souza'
+        )
+        queryset = Proposta.objects.select_related('usuario').order_by('-pk')
+        self.assertParidade(
+            PropostaListaRapida, PropostaListSerializer, queryset
+        )
+        self.assertParidade(
+            PropostaBuscaRapida, PropostaBuscaSerializer,
+            buscar(queryset, 'proposta', 'Proposta')
+        )
+
+    def test_projetos_com_e_sem_professor(self):
+        Projeto.objects.filter(pk=self.projetos[0].pk).update(
+            professor_responsavel=None
+        )
+        Atividade.objects.create(
+            projeto=self.projetos[1], descricao='Feita', status='concluida'
+        )
+        Relatorio.objects.create(
+            projeto=self.projetos[1], titulo='Interno', conteudo='C',
+            data_relatorio=date(2025, 6, 1)
+        )
+        # Projeto sem linha de resumo: os dois caminhos devolvem null
+        ResumoProjeto.objects.filter(projeto=self.projetos[2]).delete()
+        queryset = Projeto.objects.select_related('resumo').order_by(
+            '-data_inicio'
+        )
+        self.assertParidade(
+            ProjetoListaRapida, ProjetoListSerializer, queryset
+        )
+        self.assertParidade(
+            ProjetoPublicoListaRapida, ProjetoPublicoListSerializer, queryset
+        )
+
+    def test_relatorios_publicos(self):
+        queryset = Relatorio.objects.select_related('projeto').filter(
+            publico=True
+        ).order_by('-data_relatorio')
+        self.assertParidade(
+            RelatorioPublicoRapido, RelatorioPublicoSerializer, queryset
+        )
+        self.assertParidade(
+            RelatorioPublicoBuscaRapido, RelatorioPublicoBuscaSerializer,
+            buscar(queryset, 'relatorio', 'Conteúdo')
+        )
+
+    def test_listagem_le_so_as_colunas_necessarias(self):
+        self.client.force_authenticate(self.coordenador)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/propostas/', {'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('"descricao"', queries[-1]['sql'])
+        self.assertNotIn('"password"', queries[-1]['sql'])
+        # O cursor é montado a partir dos dicionários de values()
+        proxima = self.client.get(response.json()['next'])
+        self.assertEqual(len(proxima.json()['results']), 20)
+
+
+class RenderizacaoTests(DadosSemeadosMixin, TestCase):
+
+    def test_orjson_gera_os_mesmos_bytes_do_drf(self):
+        dados = {
+            'texto': 'Ação — “aspas”', 'numero': 1.5, 'nulo': None,
+            'quando': timezone.now(), 'dia': date(2025, 1, 2),
+            'valor': Decimal('10.50'), 'lista': [1, 2, (3, 4)],
+        }
+        self.assertEqual(
+            renderers.OrjsonRenderer().render(dados),
+            JSONRenderer().render(dados)
+        )
+
+    def test_json_invalido_vira_400(self):
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.post(
+            '/api/propostas/', '{"titulo": ', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+    @skipUnless(renderers.msgpack, 'msgpack não instalado')
+    def test_msgpack_negociado_por_accept_e_content_type(self):
+        esperado = self.client.get('/api/publico/relatorios/').json()
+        response = self.client.get(
+            '/api/publico/relatorios/', HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content), esperado
+        )
+
+        self.client.force_authenticate(self.comunidade)
+        corpo = renderers.msgpack.packb({
+            'titulo': 'Via msgpack', 'descricao': 'D',
+            'problema_resolver': 'P', 'publico_alvo': 'A',
+            'relevancia_social': 'R',
+        })
+        response = self.client.post(
+            '/api/propostas/', corpo, content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content)['titulo'],
+            'Via msgpack'
+        )
+
+    def test_gzip_e_etag_fraco(self):
+        original = self.client.get('/api/publico/relatorios/')
+        response = self.client.get(
+            '/api/publico/relatorios/', HTTP_ACCEPT_ENCODING='br;q=0, gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), original.content)
+        self.assertEqual(response['ETag'], 'W/' + original['ETag'])
+
+        # O ETag fraco continua valendo para o GET condicional
+        response = self.client.get(
+            '/api/publico/relatorios/', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @skipUnless(middleware.brotli, 'brotli não instalado')
+    def test_brotli_preferido_quando_aceito(self):
+        original = self.client.get('/api/publico/relatorios/')
+        response = self.client.get(
+            '/api/publico/relatorios/', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            middleware.brotli.decompress(response.content), original.content
+        )
+
+    def test_respostas_pequenas_nao_sao_comprimidas(self):
+        response = self.client.get(
+            '/api/publico/projetos/999/', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SelecaoDeCamposTests(DadosSemeadosMixin, TestCase):
+
+    def get(self, url, usuario=None, **params):
+        if usuario is not None:
+            self.client.force_authenticate(usuario)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, ' '.join(query['sql'] for query in queries)
+
+    def test_fields_no_detalhe_reduz_o_sql(self):
+        proposta = self.propostas[0]
+        response, sql = self.get(
+            f'/api/propostas/{proposta.pk}/', self.coordenador,
+            fields='id,titulo,status'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()), ['id', 'titulo', 'status'])
+        self.assertNotIn('"descricao"', sql)
+        self.assertNotIn('core_usuario', sql)
+        # data_atualizacao continua disponível para o ETag
+        self.assertIn('ETag', response)
+
+    def test_fields_com_campo_relacionado_mantem_o_join(self):
+        proposta = self.propostas[0]
+        response, sql = self.get(
+            f'/api/propostas/{proposta.pk}/', self.coordenador,
+            fields='titulo,usuario_nome'
+        )
+        self.assertEqual(response.json(), {
+            'titulo': proposta.titulo,
+            'usuario_nome': proposta.usuario.get_full_name(),
+        })
+        self.assertEqual(sql.count('SELECT'), 1)
+
+    def test_omit_no_detalhe_e_na_listagem(self):
+        projeto = self.projetos[0]
+        response, sql = self.get(
+            f'/api/projetos/{projeto.pk}/', self.coordenador,
+            omit='descricao,objetivos,impacto_esperado'
+        )
+        self.assertNotIn('descricao', response.json())
+        self.assertIn('professor_nome', response.json())
+        self.assertNotIn('"impacto_esperado"', sql)
+
+        with self.assertNumQueries(2):
+            response, sql = self.get(
+                '/api/relatorios/', fields='id,titulo'
+            )
+        self.assertEqual(
+            list(response.json()['results'][0]), ['id', 'titulo']
+        )
+        self.assertNotIn('"conteudo"', sql)
+
+    def test_listagem_rapida_respeita_fields(self):
+        response, sql = self.get(
+            '/api/publico/relatorios/', fields='id,projeto_titulo'
+        )
+        self.assertEqual(
+            list(response.json()['results'][0]), ['id', 'projeto_titulo']
+        )
+        self.assertNotIn('"conteudo"', sql)
+        self.assertNotIn('"core_relatorio"."titulo"', sql)
+        self.assertIn('"core_projeto"."titulo"', sql)
+        completo, sql = self.get('/api/publico/relatorios/')
+        self.assertIn('conteudo', completo.json()['results'][0])
+        self.assertIn('"conteudo"', sql)
+
+    def test_listagem_rapida_le_so_as_colunas_pedidas(self):
+        response, sql = self.get(
+            '/api/publico/relatorios/', fields='id,titulo', q='Conteúdo',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('"conteudo"', sql)
+
+        response, sql = self.get(
+            '/api/propostas/', self.coordenador, fields='id,titulo',
+            cursor=''
+        )
+        self.assertEqual(
+            list(response.json()['results'][0]), ['id', 'titulo']
+        )
+        self.assertNotIn('core_usuario', sql)
+        # Ordenação do cursor e data_atualizacao do ETag continuam no SELECT
+        self.assertIn('"data_submissao"', sql)
+        self.assertIn('"data_atualizacao"', sql)
+        self.assertIn('ETag', response)
+        self.assertEqual(self.get(
+            response.json()['next'], self.coordenador
+        )[0].status_code, 200)
+
+        response, sql = self.get(
+            '/api/projetos/', self.coordenador, fields='id,progresso'
+        )
+        self.assertEqual(
+            list(response.json()['results'][0]), ['id', 'progresso']
+        )
+        self.assertNotIn('"core_projeto"."titulo"', sql)
+        self.assertNotIn('"professor_responsavel_id"', sql)
+        self.assertIn('"pendentes"', sql)
+
+    def test_campo_inexistente_responde_400(self):
+        response, _ = self.get(
+            '/api/projetos/', self.coordenador, fields='titulo,senha'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('senha', response.json()['fields'])
+
+
+class InclusaoDeFilhosTests(DadosSemeadosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.coordenador)
+        self.projeto = self.projetos[0]
+        self.url = f'/api/projetos/{self.projeto.pk}/'
+
+    def test_projeto_com_filhos_em_queries_fixas(self):
+        Relatorio.objects.bulk_create([
+            Relatorio(
+                projeto=self.projeto, titulo=f'Extra {i}', conteudo='C',
+                data_relatorio=date(2024, 1, 1 + i)
+            )
+            for i in range(25)
+        ])
+        # Projeto (com os totais) + uma query por coleção
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                self.url, {'include': 'relatorios,atividades,entregas'}
+            )
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(dados['titulo'], self.projeto.titulo)
+
+        relatorios = dados['relatorios']
+        self.assertEqual(relatorios['count'], 26)
+        self.assertEqual(len(relatorios['results']), 20)
+        self.assertEqual(relatorios['results'][0]['titulo'], 'Relatório 0')
+        self.assertTrue(relatorios['next'].endswith(
+            f'/api/projetos/{self.projeto.pk}/relatorios/?page=2'
+        ))
+        self.assertEqual(dados['atividades']['count'], 1)
+        self.assertIsNone(dados['entregas']['next'])
+
+    def test_acoes_aninhadas_usam_os_related_names(self):
+        for acao in ('relatorios', 'atividades', 'entregas'):
+            with self.subTest(acao=acao):
+                response = self.client.get(f'{self.url}{acao}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), 1)
+
+    def test_etag_muda_com_os_filhos(self):
+        params = {'include': 'atividades'}
+        primeira = self.client.get(self.url, params)
+        Atividade.objects.filter(projeto=self.projeto).update(
+            status='concluida', data_atualizacao=timezone.now()
+        )
+        response = self.client.get(
+            self.url, params, HTTP_IF_NONE_MATCH=primeira['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['atividades']['results'][0]['status'],
+            'concluida'
+        )
+
+    def test_inclusao_invalida_responde_400(self):
+        response = self.client.get(self.url, {'include': 'propostas'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('propostas', response.json()['include'])
+
+
+class FilhosDoProjetoTests(DadosSemeadosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.coordenador)
+        self.projeto = self.projetos[0]
+        self.url = f'/api/projetos/{self.projeto.pk}/'
+        Relatorio.objects.bulk_create([
+            Relatorio(
+                projeto=self.projeto, titulo=f'Extra {i}', conteudo='C',
+                data_relatorio=date(2024, 1, 1 + i), publico=i % 2 == 0
+            )
+            for i in range(25)
+        ])
+
+    def test_paginacao_segue_o_link_do_include(self):
+        incluido = self.client.get(self.url, {'include': 'relatorios'})
+        proxima = incluido.json()['relatorios']['next']
+        response = self.client.get(proxima)
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(dados['count'], 26)
+        self.assertEqual(len(dados['results']), 6)
+        self.assertIsNone(dados['next'])
+
+    def test_modo_cursor_percorre_sem_repetir(self):
+        response = self.client.get(f'{self.url}relatorios/', {'cursor': ''})
+        primeira = response.json()
+        self.assertNotIn('count', primeira)
+        segunda = self.client.get(primeira['next']).json()
+        ids = [r['id'] for r in primeira['results'] + segunda['results']]
+        self.assertEqual(len(ids), 26)
+        self.assertEqual(len(set(ids)), 26)
+        self.assertIsNone(segunda['next'])
+
+    def test_ordenacao_por_data_decrescente(self):
+        dados = self.client.get(f'{self.url}relatorios/').json()
+        datas = [r['data_relatorio'] for r in dados['results']]
+        self.assertEqual(datas, sorted(datas, reverse=True))
+        self.assertEqual(dados['results'][0]['titulo'], 'Relatório 0')
+
+    def test_filtros_de_publico_e_data(self):
+        response = self.client.get(f'{self.url}relatorios/', {
+            'publico': 'true', 'desde': '2024-01-05', 'ate': '2024-01-10'
+        })
+        self.assertEqual(response.status_code, 200)
+        titulos = [r['titulo'] for r in response.json()['results']]
+        self.assertEqual(titulos, ['Extra 8', 'Extra 6', 'Extra 4'])
+
+    def test_filtro_de_status_das_atividades(self):
+        Atividade.objects.create(
+            projeto=self.projeto, descricao='Feita', status='concluida'
+        )
+        response = self.client.get(
+            f'{self.url}atividades/', {'status': 'concluida'}
+        )
+        dados = response.json()
+        self.assertEqual(dados['count'], 1)
+        self.assertEqual(dados['results'][0]['descricao'], 'Feita')
+        response = self.client.get(
+            f'{self.url}atividades/', {'status': 'pendente,concluida'}
+        )
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_filtros_invalidos_respondem_400(self):
+        casos = [
+            ('atividades', {'status': 'arquivada'}, 'status'),
+            ('atividades', {'publico': 'true'}, 'publico'),
+            ('relatorios', {'status': 'pendente'}, 'status'),
+            ('entregas', {'desde': 'ontem'}, 'desde'),
+            ('relatorios', {'desde': '2024-02-01', 'ate': '2024-01-01'},
+             'ate'),
+        ]
+        for acao, params, campo in casos:
+            with self.subTest(acao=acao, params=params):
+                response = self.client.get(f'{self.url}{acao}/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(campo, response.json())
+
+
+class PerfilDoBancoTests(TestCase):
+
+    def test_sqlite_aplica_os_pragmas_na_conexao(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Perfil SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+    def test_sqlite_por_padrao(self):
+        config = banco.configurar({}, Path('/tmp'))
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/tmp/db.sqlite3'))
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn(
+            'PRAGMA journal_mode=WAL', config['OPTIONS']['init_command']
+        )
+
+    def test_postgres(self):
+        config = banco.configurar({
+            'CADPRO_DB': 'postgres', 'CADPRO_DB_HOST': 'db',
+            'CADPRO_DB_CONN_MAX_AGE': '300',
+        }, Path('/tmp'))
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['HOST'], 'db')
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertFalse(config['DISABLE_SERVER_SIDE_CURSORS'])
+        config = banco.configurar(
+            {'CADPRO_DB': 'postgres', 'CADPRO_DB_PGBOUNCER': '1'}, None
+        )
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+
+    def test_replicas(self):
+        databases = banco.bancos({
+            'CADPRO_DB': 'postgres', 'CADPRO_DB_REPLICAS': 'r1, r2:6432',
+        }, None)
+        self.assertEqual(
+            list(databases), ['default', 'replica_1', 'replica_2']
+        )
+        self.assertEqual(databases['replica_2']['HOST'], 'r2')
+        self.assertEqual(databases['replica_2']['PORT'], '6432')
+        self.assertEqual(databases['replica_1']['PORT'], '5432')
+        self.assertEqual(databases['replica_1']['TEST'], {'MIRROR': 'default'})
+
+        databases = banco.bancos({}, Path('/tmp'))
+        substituta = databases['replica']
+        self.assertEqual(substituta['NAME'], 'file:/tmp/db.sqlite3?mode=ro')
+        self.assertNotIn('transaction_mode', substituta['OPTIONS'])
+        self.assertNotIn('journal_mode', substituta['OPTIONS']['init_command'])
+
+    def test_configuracao_invalida(self):
+        with self.assertRaises(ImproperlyConfigured):
+            banco.configurar({'CADPRO_DB': 'mysql'}, None)
+        with self.assertRaises(ImproperlyConfigured):
+            banco.configurar(
+                {'CADPRO_DB_CONN_MAX_AGE': 'sempre'}, Path('/tmp')
+            )
+
+
+@skipUnless(
+    'replica' in settings.DATABASES, 'Réplica substituta só no perfil SQLite'
+)
+@override_settings(REPLICAS={'ALIASES': ['replica'], 'JANELA_SEGUNDOS': 10})
+class RoteamentoDeReplicasTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['publico'].clear()
+        self.client = APIClient()
+        self.coordenador = criar_usuario('coord', 'coordenador')
+        professor = criar_usuario('prof', 'professor')
+        proposta = criar_proposta(professor, 'Projeto')
+        self.projeto = criar_projeto(proposta, professor)
+        # "Replicação": copia as linhas e depois muda só o primário
+        for objeto in (professor, proposta, self.projeto):
+            objeto.save(using='replica', force_insert=True)
+        Projeto.objects.filter(pk=self.projeto.pk).update(
+            titulo='Atualizado no primário'
+        )
+
+    def titulo_publico(self):
+        caches['publico'].clear()
+        response = self.client.get('/api/publico/projetos/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'][0]['titulo']
+
+    def test_leitura_publica_vai_para_a_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.titulo_publico(), 'Projeto')
+        self.assertGreater(len(replica), 0)
+
+    def test_views_autenticadas_leem_do_primario(self):
+        self.client.force_authenticate(self.coordenador)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(f'/api/projetos/{self.projeto.pk}/')
+        self.assertEqual(response.json()['titulo'], 'Atualizado no primário')
+        self.assertEqual(len(replica), 0)
+
+    def test_quem_escreve_fica_no_primario(self):
+        response = self.client.post('/api/auth/registro/', {
+            'username': 'novo', 'email': 'novo@exemplo.com',
+            'password': 'senha-forte-1', 'password_confirm': 'senha-forte-1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies[roteamento.COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(self.titulo_publico(), 'Atualizado no primário')
+
+        # Outro cliente, sem o cookie, continua na réplica
+        self.client = APIClient()
+        self.assertEqual(self.titulo_publico(), 'Projeto')
+
+    def test_leituras_nao_fixam_o_cliente(self):
+        self.titulo_publico()
+        response = self.client.get('/api/publico/projetos/')
+        self.assertNotIn(roteamento.COOKIE, response.cookies)
+
+    def test_sem_replicas_configuradas_tudo_vai_ao_primario(self):
+        with override_settings(
+            REPLICAS={'ALIASES': [], 'JANELA_SEGUNDOS': 10}
+        ):
+            self.assertEqual(self.titulo_publico(), 'Atualizado no primário')
+
+
+def checksum(pedaco):
+    digest = hashlib.sha256(pedaco).digest()
+    return 'sha256 ' + base64.b64encode(digest).decode()
+
+
+class EnvioEmPedacosTests(TestCase):
+
+    def setUp(self):
+        self.pasta = Path(tempfile.mkdtemp(prefix='cadpro-envios-'))
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+        configuracao = override_settings(
+            MEDIA_ROOT=self.pasta / 'media',
+            ENVIOS={**settings.ENVIOS, 'PASTA': self.pasta / 'parciais',
+                    'TAMANHO_MAXIMO_PEDACO': 1024},
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.autor = criar_usuario('autor')
+        self.proposta = criar_proposta(self.autor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.autor)
+        self.conteudo = bytes(range(256)) * 6  # 1536 bytes, dois pedaços
+
+    def iniciar(self, **extra):
+        dados = {
+            'alvo': 'proposta.documentos', 'objeto_id': self.proposta.pk,
+            'nome_arquivo': 'C:\\docs\\plano.pdf',
+            'tamanho': len(self.conteudo),
+            'sha256': hashlib.sha256(self.conteudo).hexdigest(),
+        }
+        dados.update(extra)
+        return self.client.post('/api/envios/', dados, format='json')
+
+    def enviar(self, envio_id, offset, pedaco, soma=None):
+        return self.client.generic(
+            'PATCH', f'/api/envios/{envio_id}/', pedaco,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_UPLOAD_CHECKSUM=soma or checksum(pedaco),
+        )
+
+    def test_envio_completo_em_dois_pedacos(self):
+        response = self.iniciar()
+        self.assertEqual(response.status_code, 201)
+        envio_id = response.json()['id']
+
+        response = self.enviar(envio_id, 0, self.conteudo[:1024])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], '1024')
+        response = self.enviar(envio_id, 1024, self.conteudo[1024:])
+        # A montagem fica para o worker
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(response.json()['concluido'])
+        tarefa = Tarefa.objects.get(pk=response.json()['tarefa_id'])
+        self.assertEqual(tarefa.usuario, self.autor)
+        tarefas.processar()
+        response = self.client.get(f'/api/envios/{envio_id}/')
+        self.assertTrue(response.json()['concluido'])
+
+        self.proposta.refresh_from_db()
+        self.assertTrue(
+            self.proposta.documentos.name.startswith(
+                'documentos_propostas/plano'
+            )
+        )
+        with self.proposta.documentos.open('rb') as arquivo:
+            self.assertEqual(arquivo.read(), self.conteudo)
+        self.assertFalse((self.pasta / 'parciais' / envio_id).exists())
+
+    def test_retomada_pelo_offset(self):
+        envio_id = self.iniciar().json()['id']
+        self.enviar(envio_id, 0, self.conteudo[:1024])
+
+        response = self.client.head(f'/api/envios/{envio_id}/')
+        self.assertEqual(response['Upload-Offset'], '1024')
+        # Pedaço repetido depois de uma queda: conflito com o offset atual
+        response = self.enviar(envio_id, 0, self.conteudo[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1024')
+
+    def test_checksum_errado_descarta_o_pedaco(self):
+        envio_id = self.iniciar().json()['id']
+        response = self.enviar(
+            envio_id, 0, self.conteudo[:1024], checksum(b'outro')
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Upload-Checksum', response.json())
+        self.assertEqual(EnvioParcial.objects.get().recebido, 0)
+        self.assertEqual(
+            list((self.pasta / 'parciais' / envio_id).iterdir()), []
+        )
+
+    def test_pedaco_maior_que_o_limite(self):
+        envio_id = self.iniciar().json()['id']
+        response = self.enviar(envio_id, 0, self.conteudo)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Content-Length', response.json())
+
+    def test_arquivo_montado_diferente_recomeca(self):
+        envio_id = self.iniciar(sha256='0' * 64).json()['id']
+        self.enviar(envio_id, 0, self.conteudo[:1024])
+        response = self.enviar(envio_id, 1024, self.conteudo[1024:])
+        self.assertEqual(response.status_code, 202)
+        with self.assertLogs('core.tarefas', 'WARNING'):
+            tarefas.processar()
+        # Erro definitivo: a tarefa falha sem nova tentativa
+        tarefa = self.client.get(
+            f'/api/tarefas/{response.json()["tarefa_id"]}/'
+        ).json()
+        self.assertEqual(tarefa['status'], 'falhou')
+        self.assertEqual(tarefa['tentativas'], 1)
+        self.assertIn('reenvie do início', tarefa['erro'])
+        self.assertEqual(EnvioParcial.objects.get().recebido, 0)
+        self.proposta.refresh_from_db()
+        self.assertFalse(self.proposta.documentos)
+
+    def test_permissoes(self):
+        outro = APIClient()
+        outro.force_authenticate(criar_usuario('outro'))
+        response = outro.post('/api/envios/', {
+            'alvo': 'proposta.documentos', 'objeto_id': self.proposta.pk,
+            'nome_arquivo': 'x.pdf', 'tamanho': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        envio_id = self.iniciar().json()['id']
+        response = outro.get(f'/api/envios/{envio_id}/')
+        self.assertEqual(response.status_code, 404)
+
+        # O professor responsável envia arquivos das entregas do projeto
+        professor = criar_usuario('prof', 'professor')
+        projeto = criar_projeto(self.proposta, professor)
+        entrega = Entrega.objects.create(
+            projeto=projeto, descricao='Vídeo', arquivo='entregas/a.mp4'
+        )
+        outro.force_authenticate(professor)
+        response = outro.post('/api/envios/', {
+            'alvo': 'entrega.arquivo', 'objeto_id': entrega.pk,
+            'nome_arquivo': 'video.mp4', 'tamanho': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_limpar_envios_parados_e_pastas_orfas(self):
+        envio_id = self.iniciar().json()['id']
+        self.enviar(envio_id, 0, self.conteudo[:1024])
+        ativo_id = self.iniciar().json()['id']
+        EnvioParcial.objects.filter(pk=envio_id).update(
+            data_atualizacao=timezone.now() - timedelta(hours=48)
+        )
+        (self.pasta / 'parciais' / 'orfa').mkdir()
+
+        saida = StringIO()
+        call_command('limpar_envios', stdout=saida)
+        self.assertIn('1 envios e 1 pastas órfãs', saida.getvalue())
+        self.assertEqual(
+            [str(pk) for pk in EnvioParcial.objects.values_list(
+                'pk', flat=True
+            )],
+            [ativo_id]
+        )
+        self.assertFalse((self.pasta / 'parciais' / envio_id).exists())
+        self.assertTrue((self.pasta / 'parciais' / ativo_id).exists())
+
+
+class DownloadDeArquivosTests(TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp(prefix='cadpro-media-')
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.autor = criar_usuario('autor')
+        self.proposta = criar_proposta(self.autor)
+        self.conteudo = bytes(range(256)) * 16  # 4 KiB
+        self.proposta.documentos.save(
+            'plano.pdf', ContentFile(self.conteudo)
+        )
+        projeto = criar_projeto(self.proposta)
+        self.relatorio = Relatorio.objects.create(
+            projeto=projeto, titulo='R', conteudo='C',
+            data_relatorio=date(2025, 1, 1)
+        )
+        self.relatorio.arquivo.save('relatorio.pdf', ContentFile(b'%PDF-1'))
+        self.url = f'/api/arquivos/proposta.documentos/{self.proposta.pk}/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.autor)
+
+    def test_arquivo_inteiro_com_validadores(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.conteudo)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], str(len(self.conteudo)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_intervalos(self):
+        casos = [
+            ('bytes=10-19', 10, 19),
+            ('bytes=4090-', 4090, 4095),
+            ('bytes=-6', 4090, 4095),
+            ('bytes=4000-9999', 4000, 4095),
+        ]
+        for cabecalho, inicio, fim in casos:
+            with self.subTest(cabecalho=cabecalho):
+                response = self.client.get(self.url, HTTP_RANGE=cabecalho)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {inicio}-{fim}/4096'
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    self.conteudo[inicio:fim + 1]
+                )
+
+    def test_intervalo_insatisfazivel_e_ignorado(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */4096')
+        # Vários intervalos: o arquivo inteiro
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag
+        )
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"antigo"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 4096)
+
+    def test_nao_comprime_downloads(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_permissoes(self):
+        anonimo = APIClient()
+        self.assertEqual(anonimo.get(self.url).status_code, 401)
+        outro = APIClient()
+        outro.force_authenticate(criar_usuario('outro'))
+        self.assertEqual(outro.get(self.url).status_code, 403)
+        coordenador = APIClient()
+        coordenador.force_authenticate(criar_usuario('coord', 'coordenador'))
+        self.assertEqual(coordenador.get(self.url).status_code, 200)
+
+        url = f'/api/arquivos/relatorio.arquivo/{self.relatorio.pk}/'
+        self.assertEqual(anonimo.get(url).status_code, 401)
+        Relatorio.objects.filter(pk=self.relatorio.pk).update(publico=True)
+        response = anonimo.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_alvo_ou_arquivo_inexistente(self):
+        self.assertEqual(
+            self.client.get('/api/arquivos/projeto.logo/1/').status_code, 404
+        )
+        Proposta.objects.filter(pk=self.proposta.pk).update(documentos='')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_sendfile_delega_ao_proxy(self):
+        arquivos = {**settings.ARQUIVOS, 'SENDFILE': 'x-accel-redirect'}
+        with override_settings(ARQUIVOS=arquivos):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/arquivos-protegidos/' + self.proposta.documentos.name
+        )
+        arquivos['SENDFILE'] = 'x-sendfile'
+        with override_settings(ARQUIVOS=arquivos):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.proposta.documentos.path)
+
+
+class PainelTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = criar_usuario('coord', 'coordenador')
+        cls.comunidade = criar_usuario('comunidade')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.coordenador)
+
+    def contagem(self, grupo, chave):
+        return Contador.objects.get(grupo=grupo, chave=chave).valor
+
+    def test_signals_mantem_contadores_de_status(self):
+        proposta = criar_proposta(self.comunidade)
+        self.assertEqual(self.contagem('propostas', 'em_analise'), 1)
+        self.assertEqual(
+            self.contagem('submissoes', painel.mes(proposta.data_submissao)),
+            1
+        )
+        proposta.status = 'aprovada'
+        proposta.save()
+        # Salvar de novo sem mudar o status não conta duas vezes
+        proposta.save(update_fields=['titulo'])
+        proposta.save()
+        self.assertEqual(self.contagem('propostas', 'em_analise'), 0)
+        self.assertEqual(self.contagem('propostas', 'aprovada'), 1)
+
+        projeto = criar_projeto(proposta)
+        atividade = Atividade.objects.create(projeto=projeto, descricao='A')
+        Atividade.objects.create(projeto=projeto, descricao='B')
+        atividade.status = 'concluida'
+        atividade.save()
+        resumo = ResumoProjeto.objects.get(projeto=projeto)
+        self.assertEqual((resumo.pendentes, resumo.concluidas), (1, 1))
+
+        # O CASCADE passa pelos signals de cada linha
+        proposta.delete()
+        self.assertEqual(self.contagem('propostas', 'aprovada'), 0)
+        self.assertEqual(self.contagem('projetos', 'em_execucao'), 0)
+        self.assertEqual(self.contagem('atividades', 'pendente'), 0)
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_decisao_em_lote_ajusta_contadores(self):
+        propostas = [criar_proposta(self.comunidade) for _ in range(3)]
+        self.client.post(
+            '/api/propostas/aprovar-lote/',
+            {'ids': [propostas[0].id, propostas[1].id]}, format='json'
+        )
+        tarefas.processar()
+        self.client.post(
+            '/api/propostas/rejeitar-lote/',
+            {'ids': [propostas[1].id, propostas[2].id]}, format='json'
+        )
+        self.assertEqual(self.contagem('propostas', 'aprovada'), 2)
+        self.assertEqual(self.contagem('propostas', 'rejeitada'), 1)
+        self.assertEqual(self.contagem('propostas', 'em_analise'), 0)
+        self.assertEqual(self.contagem('projetos', 'em_execucao'), 2)
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_falha_no_contador_desfaz_o_save(self):
+        with mock.patch.object(painel, 'somar', side_effect=RuntimeError):
+            # Dentro do atomic do TestCase: o savepoint faz o papel do
+            # commit que não aconteceu
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                criar_proposta(self.comunidade)
+        self.assertFalse(Proposta.objects.exists())
+
+    def test_semeadura_e_limpeza_deixam_contadores_certos(self):
+        semeadura.semear(escala=0.02, lote=7)
+        self.assertEqual(painel.divergencias(), [])
+        semeadura.limpar()
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_reconciliar_corrige_divergencias(self):
+        criar_proposta(self.comunidade)
+        Contador.objects.filter(chave='em_analise').update(valor=7)
+
+        with self.assertRaisesMessage(CommandError, '1 contadores'):
+            call_command('reconciliar_painel', '--verificar', stdout=StringIO())
+        saida = StringIO()
+        call_command('reconciliar_painel', stdout=saida)
+        self.assertIn('armazenado 7, calculado 1', saida.getvalue())
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_endpoint_le_so_os_contadores(self):
+        proposta = criar_proposta(self.comunidade)
+        projeto = criar_projeto(proposta)
+        Atividade.objects.create(projeto=projeto, descricao='A')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/painel/')
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(dados['propostas']['total'], 1)
+        self.assertEqual(dados['propostas']['por_status']['enviada'], 0)
+        self.assertEqual(dados['projetos']['por_status']['em_execucao'], 1)
+        self.assertEqual(dados['atividades']['por_status']['pendente'], 1)
+        meses = dados['submissoes_por_mes']
+        self.assertEqual(len(meses), painel.MESES_NO_PAINEL)
+        self.assertEqual(
+            meses[-1], {'mes': timezone.localdate().strftime('%Y-%m'),
+                        'total': 1}
+        )
+
+        response = self.client.get('/api/painel/atividades/')
+        self.assertEqual(response.json()['results'], [{
+            'projeto_id': projeto.id, 'pendentes': 1, 'concluidas': 0,
+            'titulo': projeto.titulo,
+        }])
+
+        self.client.force_authenticate(self.comunidade)
+        self.assertEqual(self.client.get('/api/painel/').status_code, 403)
+
+    def test_ultimos_meses_atravessa_o_ano(self):
+        self.assertEqual(
+            painel.ultimos_meses(3, date(2025, 2, 10)),
+            ['2024-12', '2025-01', '2025-02']
+        )
+
+
+class ProgressoDosProjetosTests(DadosSemeadosMixin, TestCase):
+
+    def primeiro_da_lista(self, url, projeto, usuario=None):
+        # O último projeto semeado é o de data_inicio mais recente
+        if usuario is not None:
+            self.client.force_authenticate(usuario)
+        item = self.client.get(url).json()['results'][0]
+        self.assertEqual(item['id'], projeto.id)
+        return item
+
+    def test_listagens_mostram_progresso_e_ultimo_relatorio(self):
+        projeto = self.projetos[-1]
+        for status_atividade in ('concluida', 'concluida', 'pendente'):
+            Atividade.objects.create(
+                projeto=projeto, descricao='A', status=status_atividade
+            )
+        Relatorio.objects.create(
+            projeto=projeto, titulo='Interno', conteudo='C',
+            data_relatorio=date(2025, 9, 1)
+        )
+
+        item = self.primeiro_da_lista(
+            '/api/projetos/', projeto, self.coordenador
+        )
+        self.assertEqual(item['atividades_total'], 4)
+        self.assertEqual(item['atividades_concluidas'], 2)
+        self.assertEqual(item['progresso'], 50)
+        self.assertEqual(item['ultimo_relatorio'], '2025-09-01')
+        # A vitrine pública ignora o relatório interno
+        item = self.primeiro_da_lista('/api/publico/projetos/', projeto)
+        self.assertEqual(item['ultimo_relatorio'], '2025-02-25')
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_mudancas_nos_filhos_atualizam_resumo_e_etag(self):
+        projeto = self.projetos[-1]
+        self.client.force_authenticate(self.coordenador)
+        etag = self.client.get('/api/projetos/')['ETag']
+
+        atividade = projeto.atividades.get()
+        atividade.status = 'concluida'
+        atividade.save()
+        response = self.client.get('/api/projetos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['progresso'], 100)
+
+        relatorio = projeto.relatorios.get()
+        relatorio.data_relatorio = date(2025, 12, 31)
+        relatorio.save()
+        self.assertEqual(
+            ResumoProjeto.objects.get(projeto=projeto).ultimo_relatorio,
+            date(2025, 12, 31)
+        )
+        relatorio.delete()
+        resumo = ResumoProjeto.objects.get(projeto=projeto)
+        self.assertIsNone(resumo.ultimo_relatorio)
+        self.assertIsNone(resumo.ultimo_relatorio_publico)
+        self.assertEqual(painel.divergencias(), [])
+
+    def test_mudanca_nos_filhos_invalida_cache_publico(self):
+        self.client.get('/api/publico/projetos/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Atividade.objects.create(
+                projeto=self.projetos[-1], descricao='Nova',
+                status='concluida'
+            )
+        item = self.primeiro_da_lista(
+            '/api/publico/projetos/', self.projetos[-1]
+        )
+        self.assertEqual(item['atividades_concluidas'], 1)
+
+
+@override_settings(ROOT_URLCONF='extensao.urls_asgi')
+class LeiturasAssincronasTests(DadosSemeadosMixin, TestCase):
+    """Views nativas de core.assincrono contra as mesmas views do DRF."""
+
+    CABECALHOS = ('Content-Type', 'Allow', 'ETag')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token_coordenador = Token.objects.create(user=cls.coordenador)
+        cls.token_comunidade = Token.objects.create(user=cls.comunidade)
+
+    def setUp(self):
+        super().setUp()
+        authentication.cache_local.clear()
+
+    def sincrona(self, url, token=None, **extra):
+        if token is not None:
+            extra['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        with override_settings(ROOT_URLCONF='extensao.urls'):
+            return self.client.get(url, **extra)
+
+    async def assincrona(self, url, token=None, queries=None, **extra):
+        headers = extra.pop('headers', {})
+        if token is not None:
+            headers['Authorization'] = f'Token {token.key}'
+        # Conta pelas métricas (o CaptureQueriesContext é síncrono), o que
+        # também confere o MetricasMiddleware no modo async
+        metricas.registro.limpar()
+        response = await AsyncClient().get(url, headers=headers, **extra)
+        if queries is not None:
+            [(_, serie)] = metricas.registro.copia().values()
+            self.assertEqual(serie['queries'], queries, url)
+        return response
+
+    async def test_middlewares_do_django_valem_sob_asgi(self):
+        await sync_to_async(criar_usuario)(
+            'admin', is_staff=True, is_superuser=True, password='senha-admin'
+        )
+        cliente = AsyncClient(enforce_csrf_checks=True)
+        response = await cliente.get('/admin/login/')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        token = response.cookies['csrftoken'].value
+
+        credenciais = {'username': 'admin', 'password': 'senha-admin'}
+        response = await cliente.post('/admin/login/', credenciais)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('sessionid', response.cookies)
+
+        response = await cliente.post(
+            '/admin/login/', {**credenciais, 'csrfmiddlewaretoken': token}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('sessionid', response.cookies)
+        response = await cliente.get('/admin/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    @staticmethod
+    def vary(response):
+        # O DRF autentica até nas views públicas e a sessão lida acrescenta
+        # Cookie; as views nativas só leem a sessão quando precisam
+        return {
+            nome.strip() for nome in response.get('Vary', '').split(',')
+        } - {'Cookie'}
+
+    def assertMesmaResposta(self, sincrona, assincrona, etag=True):
+        self.assertEqual(sincrona.status_code, assincrona.status_code)
+        self.assertEqual(sincrona.content, assincrona.content)
+        for nome in self.CABECALHOS[:None if etag else -1]:
+            self.assertEqual(sincrona.get(nome), assincrona.get(nome), nome)
+        self.assertEqual(self.vary(sincrona), self.vary(assincrona))
+
+    def test_rotas_nativas_mantem_nomes_e_replica(self):
+        view = resolve('/api/publico/projetos/').func
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertTrue(view.cls.usar_replica)
+        self.assertEqual(resolve('/api/auth/perfil/').url_name, 'perfil')
+
+    async def test_perfil_com_token_e_sessao(self):
+        response = await self.assincrona(
+            '/api/auth/perfil/', self.token_comunidade, queries=1
+        )
+        self.assertMesmaResposta(
+            await sync_to_async(self.sincrona)(
+                '/api/auth/perfil/', self.token_comunidade
+            ), response
+        )
+        # Segunda vez o token vem do cache de core.authentication
+        await self.assincrona(
+            '/api/auth/perfil/', self.token_comunidade, queries=0
+        )
+
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.coordenador)
+        response = await cliente.get('/api/auth/perfil/')
+        self.assertEqual(response.json()['username'], 'coord')
+
+    async def test_propostas_paginadas_e_condicionais(self):
+        for url, token in (
+            ('/api/propostas/', self.token_coordenador),
+            ('/api/propostas/?page=3', self.token_coordenador),
+            ('/api/propostas/', self.token_comunidade),
+        ):
+            response = await self.assincrona(url, token)
+            self.assertMesmaResposta(
+                await sync_to_async(self.sincrona)(url, token), response
+            )
+
+        primeira = await self.assincrona(
+            '/api/propostas/?cursor=', self.token_comunidade
+        )
+        cursor = primeira.json()['next']
+        self.assertMesmaResposta(
+            await sync_to_async(self.sincrona)(cursor, self.token_comunidade),
+            await self.assincrona(cursor, self.token_comunidade)
+        )
+
+        etag = (await self.assincrona(
+            '/api/propostas/', self.token_coordenador
+        ))['ETag']
+        # Token já em cache: só COUNT e página, sem serializer
+        response = await self.assincrona(
+            '/api/propostas/', self.token_coordenador, queries=2,
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_feeds_publicos_com_cache(self):
+        for url in (
+            '/api/publico/projetos/', '/api/publico/relatorios/?page=2'
+        ):
+            sincrona = await sync_to_async(self.sincrona)(url)
+            await sync_to_async(cache_publico.obter_cache().clear)()
+            # Miss: gerado aqui, com o ORM assíncrono
+            primeira = await self.assincrona(url, queries=2)
+            self.assertMesmaResposta(sincrona, primeira, etag=False)
+            # Hit, nos dois caminhos, da entrada gravada pela view async
+            segunda = await self.assincrona(url, queries=0)
+            self.assertMesmaResposta(primeira, segunda)
+            self.assertMesmaResposta(
+                await sync_to_async(self.sincrona)(url), segunda
+            )
+            response = await self.assincrona(
+                url, queries=0, headers={'If-None-Match': segunda['ETag']}
+            )
+            self.assertEqual(response.status_code, 304)
+
+        # Desde a última limpeza: o miss da view async e os dois hits
+        estatisticas = await sync_to_async(cache_publico.estatisticas)()
+        self.assertEqual(estatisticas['relatorios']['misses'], 1)
+        self.assertEqual(estatisticas['relatorios']['hits'], 2)
+
+    async def test_o_resto_vai_para_o_drf(self):
+        casos = (
+            # (url, token, extra, status)
+            ('/api/auth/perfil/', None, {}, 401),
+            ('/api/auth/perfil/', None,
+             {'headers': {'Authorization': 'Token invalido'}}, 401),
+            ('/api/propostas/', self.token_comunidade,
+             {'headers': {'Accept': 'application/msgpack'}}, 200),
+            ('/api/propostas/?format=json', self.token_comunidade, {}, 200),
+            ('/api/propostas/?page=99', self.token_comunidade, {}, 404),
+            ('/api/publico/relatorios/?q=Conteúdo', None, {}, 200),
+            ('/api/publico/projetos/?fields=id', None, {}, 200),
+        )
+        for url, token, extra, status in casos:
+            headers = dict(extra.get('headers', {}))
+            sincrona = await sync_to_async(self.sincrona)(url, token, **{
+                f'HTTP_{nome.upper()}': valor
+                for nome, valor in headers.items()
+            })
+            assincrona = await self.assincrona(url, token, headers=headers)
+            self.assertEqual(assincrona.status_code, status, url)
+            self.assertMesmaResposta(sincrona, assincrona, etag=False)
+
+        response = await AsyncClient().post(
+            '/api/propostas/', {
+                'titulo': 'Nova', 'descricao': 'D', 'problema_resolver': 'P',
+                'publico_alvo': 'P', 'relevancia_social': 'R',
+            }, content_type='application/json',
+            headers={'Authorization': f'Token {self.token_comunidade.key}'}
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+
+class TarefasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = criar_usuario('coord', 'coordenador')
+        cls.comunidade = criar_usuario('comunidade')
+        cls.outro = criar_usuario('outro')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.chamadas = []
+        tipos = mock.patch.dict(tarefas.TIPOS)
+        tipos.start()
+        self.addCleanup(tipos.stop)
+
+    def registrar(self, nome, funcao=None, **extra):
+        def padrao(**argumentos):
+            self.chamadas.append((nome, argumentos))
+            return argumentos
+        tarefas.tarefa(nome, **extra)(funcao or padrao)
+
+    def test_prioridade_e_depois_ordem_de_chegada(self):
+        self.registrar('comum')
+        self.registrar('urgente', prioridade=10)
+        tarefas.enfileirar('comum', {'n': 1})
+        tarefas.enfileirar('comum', {'n': 2})
+        tarefas.enfileirar('urgente', {'n': 3})
+        tarefas.enfileirar('comum', {'n': 4}, atraso=60)
+
+        self.assertEqual(tarefas.processar(), 3)
+        self.assertEqual(self.chamadas, [
+            ('urgente', {'n': 3}), ('comum', {'n': 1}), ('comum', {'n': 2}),
+        ])
+        self.assertEqual(Tarefa.objects.filter(status='pendente').count(), 1)
+        with self.assertRaises(ValueError):
+            tarefas.enfileirar('inexistente')
+
+    def test_falha_volta_com_espera_exponencial(self):
+        def instavel():
+            raise ConnectionError('SMTP fora do ar')
+        self.registrar('instavel', instavel, max_tentativas=3)
+        tarefa = tarefas.enfileirar('instavel')
+
+        with self.assertLogs('core.tarefas', 'WARNING'):
+            for tentativa, segundos in ((1, 10), (2, 20)):
+                antes = timezone.now()
+                self.assertFalse(tarefas.executar(tarefas.reservar('t')))
+                tarefa.refresh_from_db()
+                self.assertEqual(tarefa.status, 'pendente')
+                self.assertEqual(tarefa.tentativas, tentativa)
+                self.assertIn('ConnectionError', tarefa.erro)
+                self.assertGreaterEqual(
+                    tarefa.executar_apos, antes + timedelta(seconds=segundos)
+                )
+                # Ainda não está pronta: nada a reservar
+                self.assertIsNone(tarefas.reservar('t'))
+                Tarefa.objects.filter(pk=tarefa.pk).update(
+                    executar_apos=timezone.now()
+                )
+            tarefas.executar(tarefas.reservar('t'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'falhou')
+        self.assertEqual(tarefa.tentativas, 3)
+        self.assertIsNotNone(tarefa.data_conclusao)
+        self.assertEqual(tarefas.espera(20), 3600)
+
+    def test_falha_definitiva_nao_repete(self):
+        def invalida():
+            raise tarefas.FalhaDefinitiva('Arquivo corrompido.')
+        self.registrar('invalida', invalida)
+        tarefa = tarefas.enfileirar('invalida')
+
+        with self.assertLogs('core.tarefas', 'WARNING'):
+            tarefas.processar()
+        tarefa.refresh_from_db()
+        self.assertEqual(
+            (tarefa.status, tarefa.tentativas, tarefa.erro),
+            ('falhou', 1, 'Arquivo corrompido.')
+        )
+
+    def test_limite_por_tipo(self):
+        self.registrar('limitado', limite=1)
+        self.registrar('livre')
+        tarefas.enfileirar('limitado', {'n': 1})
+        tarefas.enfileirar('limitado', {'n': 2})
+        tarefas.enfileirar('livre')
+
+        primeira = tarefas.reservar('a')
+        self.assertEqual(primeira.tipo, 'limitado')
+        # O outro 'limitado' espera a primeira terminar
+        self.assertEqual(tarefas.reservar('b').tipo, 'livre')
+        self.assertIsNone(tarefas.reservar('c'))
+        tarefas.executar(primeira)
+        self.assertEqual(tarefas.reservar('c').argumentos, {'n': 2})
+
+    def test_recupera_tarefa_de_worker_morto(self):
+        self.registrar('lenta')
+        tarefa = tarefas.enfileirar('lenta')
+        reservada = tarefas.reservar('morto')
+        self.assertEqual(tarefas.recuperar_travadas(), 0)
+
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            reservada_em=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(tarefas.recuperar_travadas(), 1)
+        nova = tarefas.reservar('vivo')
+        self.assertEqual(nova.pk, tarefa.pk)
+        self.assertEqual(nova.tentativas, 2)
+        # O desfecho do worker antigo é ignorado
+        self.assertEqual(tarefas.encerrar(reservada, status='concluida'), 0)
+        self.assertTrue(tarefas.executar(nova))
+
+    def test_comando_processa_a_fila(self):
+        self.registrar('comum')
+        tarefas.enfileirar_varias('comum', [{'n': n} for n in range(3)])
+        saida = StringIO()
+        call_command(
+            'processar_tarefas', '--uma-vez', '--concorrencia', '1',
+            stdout=saida
+        )
+        self.assertIn('3 tarefas executadas', saida.getvalue())
+        self.assertEqual(
+            Tarefa.objects.filter(status='concluida').count(), 3
+        )
+
+    def test_decisao_envia_email_ao_autor(self):
+        aprovada = criar_proposta(self.comunidade, 'Horta comunitária')
+        rejeitada = criar_proposta(self.outro, 'Oficina')
+        self.client.force_authenticate(self.coordenador)
+        self.client.post(f'/api/propostas/{aprovada.pk}/aprovar/')
+        self.client.post(f'/api/propostas/{rejeitada.pk}/rejeitar/')
+        self.assertEqual(len(mail.outbox), 0)
+
+        tarefas.processar()
+        enviados = {email.to[0]: email for email in mail.outbox}
+        self.assertEqual(set(enviados), {
+            'comunidade@exemplo.com', 'outro@exemplo.com',
+        })
+        self.assertIn('Horta comunitária',
+                      enviados['comunidade@exemplo.com'].body)
+        self.assertEqual(enviados['outro@exemplo.com'].subject,
+                         'Sua proposta não foi aprovada')
+
+    def test_api_mostra_so_as_tarefas_do_usuario(self):
+        self.registrar('comum')
+        minha = tarefas.enfileirar('comum', usuario=self.comunidade)
+        tarefas.enfileirar('comum', usuario=self.outro)
+
+        self.assertEqual(self.client.get('/api/tarefas/').status_code, 401)
+        self.client.force_authenticate(self.comunidade)
+        response = self.client.get('/api/tarefas/')
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [minha.pk]
+        )
+        self.assertEqual(
+            self.client.get(f'/api/tarefas/{minha.pk + 1}/').status_code, 404
+        )
+
+        self.client.force_authenticate(self.coordenador)
+        self.assertEqual(
+            self.client.get('/api/tarefas/?status=pendente').data['count'], 2
+        )
+        self.assertEqual(
+            self.client.get('/api/tarefas/?status=falhou').data['count'], 0
+        )
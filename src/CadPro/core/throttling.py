@@ -0,0 +1,35 @@
+"""Limites de tentativas de login e registro (throttles do DRF).
+
+Cada tentativa custa um hash de senha (``core.senhas``). Sem limite, uma
+rajada de logins enche a fila do pool e atrasa os logins legítimos.
+``AutenticacaoPorIPThrottle`` conta login e registro por IP (taxa
+``autenticacao``). ``LoginPorUsuarioThrottle`` conta por username (taxa
+``login_usuario``), o que também freia quem tenta senhas de uma conta a
+partir de vários IPs. As contagens ficam no cache ``default``; com vários
+processos, aponte-o para um backend compartilhado.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AutenticacaoPorIPThrottle(SimpleRateThrottle):
+    scope = 'autenticacao'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request),
+        }
+
+
+class LoginPorUsuarioThrottle(SimpleRateThrottle):
+    scope = 'login_usuario'
+
+    def get_cache_key(self, request, view):
+        dados = request.data
+        username = dados.get('username') if hasattr(dados, 'get') else None
+        if not isinstance(username, str) or not username:
+            return None
+        # Chave curta e só com caracteres aceitos por qualquer backend
+        ident = hashlib.sha256(username.casefold().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
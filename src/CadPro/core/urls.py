@@ -8,6 +8,8 @@ router.register(r'projetos', views.ProjetoViewSet)
 router.register(r'relatorios', views.RelatorioViewSet)
 router.register(r'atividades', views.AtividadeViewSet)
 router.register(r'entregas', views.EntregaViewSet)
+router.register(r'envios', views.EnvioViewSet, basename='envios')
+router.register(r'tarefas', views.TarefaViewSet, basename='tarefas')
 
 # URLs públicas
 router.register(
@@ -32,4 +34,29 @@ urlpatterns = [
     path('auth/login/', views.login_usuario, name='login'),
     path('auth/logout/', views.logout_usuario, name='logout'),
     path('auth/perfil/', views.perfil_usuario, name='perfil'),
+
+    # Exportação em massa (CSV / NDJSON)
+    path(
+        'exportar/<str:recurso>/', views.exportar, name='exportar'
+    ),
+
+    # Painel dos coordenadores (contadores de core.painel)
+    path('painel/', views.painel_coordenacao, name='painel'),
+    path(
+        'painel/atividades/', views.painel_atividades,
+        name='painel-atividades'
+    ),
+
+    # Download dos arquivos enviados (Range, ETag, sendfile)
+    path(
+        'arquivos/<str:alvo>/<int:pk>/', views.baixar_arquivo,
+        name='baixar-arquivo'
+    ),
+
+    # Observabilidade
+    path('metrics/', views.metricas, name='metricas'),
+    path(
+        'cache/estatisticas/', views.estatisticas_cache,
+        name='estatisticas-cache'
+    ),
 ]
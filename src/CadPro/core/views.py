@@ -1,24 +1,55 @@
+from django.conf import settings
 from django.contrib.auth import login, logout
 from django.db.models import Q
-from django.utils import timezone
-from rest_framework import permissions, status, viewsets
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes, throttle_classes)
+from rest_framework.exceptions import (NotAuthenticated, PermissionDenied,
+                                       ValidationError)
 from rest_framework.response import Response
-
-from .models import Atividade, Entrega, Projeto, Proposta, Relatorio, Usuario
+from rest_framework.reverse import reverse
+
+from . import arquivos, downloads, envios, painel, senhas, tarefas
+from . import cache as cache_publico
+from .aprovacao import motivos_para_ignorar, pendente, rejeitar_propostas
+from .busca import BuscaTextualMixin
+from .cache import CachePublicoMixin
+from .campos import SelecaoDeCamposMixin
+from .condicional import RequisicaoCondicionalMixin
+from .exportacao import EXPORTACOES, FORMATOS, linhas
+from .inclusoes import INCLUSOES
+from .inclusoes import filhos as filhos_incluidos
+from .inclusoes import incluir, inclusoes_pedidas
+from .inclusoes import serializar as serializar_inclusoes
+from .leitura import LeituraRapidaMixin
+from .metricas import exportar_prometheus
+from .models import (Atividade, EnvioParcial, Entrega, Projeto, Proposta,
+                     Relatorio, Tarefa, Usuario)
+from .pagination import PaginacaoPadrao
 from .serializers import (AtividadeSerializer, EntregaSerializer,
-                          LoginSerializer, ProjetoListSerializer,
-                          ProjetoSerializer, PropostaCreateSerializer,
-                          PropostaListSerializer, PropostaSerializer,
+                          EnvioParcialSerializer,
+                          ExportacaoSerializer, FiltroFilhosSerializer,
+                          LoginSerializer,
+                          LoteSerializer, ProjetoListaRapida,
+                          ProjetoPublicoListaRapida,
+                          ProjetoPublicoListSerializer, ProjetoSerializer,
+                          PropostaBuscaRapida, PropostaCreateSerializer,
+                          PropostaListaRapida, PropostaSerializer,
                           RegistroComunidadeSerializer,
+                          RelatorioPublicoBuscaRapido, RelatorioPublicoRapido,
                           RelatorioPublicoSerializer, RelatorioSerializer,
-                          UsuarioSerializer)
+                          TarefaSerializer, UsuarioSerializer)
+from .throttling import AutenticacaoPorIPThrottle, LoginPorUsuarioThrottle
 
 
 # Views de Autenticação
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AutenticacaoPorIPThrottle])
 def registro_comunidade(request):
     serializer = RegistroComunidadeSerializer(data=request.data)
     if serializer.is_valid():
@@ -34,6 +65,7 @@ def registro_comunidade(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AutenticacaoPorIPThrottle, LoginPorUsuarioThrottle])
 def login_usuario(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
@@ -83,22 +115,124 @@ class IsComunidadeOrCoordenador(permissions.BasePermission):
         )
 
 
+class AcessoMetricas(permissions.BasePermission):
+    def has_permission(self, request, view):
+        token = settings.METRICAS['TOKEN']
+        if token is None:
+            # Sem token, só em desenvolvimento
+            return settings.DEBUG
+        return constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsCoordenador])
+def estatisticas_cache(request):
+    return Response(cache_publico.estatisticas())
+
+
+@api_view(['GET'])
+@permission_classes([IsCoordenador])
+def painel_coordenacao(request):
+    """Contagens por status e submissões por mês, sem agregar tabelas."""
+    return Response(painel.resumo())
+
+
+@api_view(['GET'])
+@permission_classes([IsCoordenador])
+def painel_atividades(request):
+    paginador = PaginacaoPadrao()
+    pagina = paginador.paginate_queryset(
+        painel.atividades_por_projeto(), request
+    )
+    return paginador.get_paginated_response(pagina)
+
+
+@api_view(['GET'])
+@permission_classes([IsCoordenador])
+def exportar(request, recurso):
+    exportacao = EXPORTACOES.get(recurso)
+    if exportacao is None:
+        raise Http404
+    parametros = ExportacaoSerializer(data=request.query_params)
+    parametros.is_valid(raise_exception=True)
+    formato = parametros.validated_data['formato']
+    try:
+        queryset = exportacao.queryset(
+            status=parametros.validated_data.get('status'),
+            desde=parametros.validated_data.get('desde'),
+            ate=parametros.validated_data.get('ate'),
+        )
+    except ValueError as erro:
+        return Response(
+            {'status': [str(erro)]}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    response = StreamingHttpResponse(
+        linhas(exportacao, queryset, formato), content_type=FORMATOS[formato]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{recurso}.{formato}"'
+    )
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def baixar_arquivo(request, alvo, pk):
+    """Arquivo de ``alvo`` (ver core.arquivos.ALVOS), com Range e ETag."""
+    if alvo not in arquivos.ALVOS:
+        raise Http404
+    objeto = arquivos.buscar(alvo, pk)
+    if objeto is None:
+        raise Http404
+    if not arquivos.pode_ler(request.user, objeto):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        raise PermissionDenied('Você não pode baixar este arquivo.')
+    _, campo = arquivos.ALVOS[alvo]
+    return downloads.responder(
+        request, getattr(objeto, campo), publico=arquivos.publico(objeto)
+    )
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AcessoMetricas])
+def metricas(request):
+    return HttpResponse(
+        exportar_prometheus(
+            cache_publico.estatisticas(), senhas.estatisticas.copia()
+        ),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
 # Atualizar PropostaViewSet com autenticação
-class PropostaViewSet(viewsets.ModelViewSet):
+class PropostaViewSet(LeituraRapidaMixin, SelecaoDeCamposMixin,
+                      BuscaTextualMixin, RequisicaoCondicionalMixin,
+                      viewsets.ModelViewSet):
     permission_classes = [IsComunidadeOrCoordenador]
+    ordenacao_cursor = ('-data_submissao', '-id')
+    busca_indice = 'proposta'
 
     def get_queryset(self):
         user = self.request.user
+        # Os serializers leem nome, e-mail e organização do usuário
+        queryset = Proposta.objects.select_related('usuario')
         if user.tipo_usuario == 'coordenador':
-            return Proposta.objects.all().order_by('-data_submissao')
+            return queryset.order_by('-data_submissao')
         else:  # comunidade externa
-            return Proposta.objects.filter(
+            return queryset.filter(
                 usuario=user
             ).order_by('-data_submissao')
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return PropostaListSerializer
+            if self.termo_de_busca():
+                return PropostaBuscaRapida
+            return PropostaListaRapida
         elif self.action == 'create':
             return PropostaCreateSerializer
         return PropostaSerializer
@@ -111,90 +245,305 @@ class PropostaViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsCoordenador])
     def aprovar(self, request, pk=None):
         proposta = self.get_object()
-        proposta.status = 'aprovada'
-        proposta.save()
-
-        # Criar projeto automaticamente a partir da proposta aprovada
-        projeto = Projeto.objects.create(
-            titulo=proposta.titulo,
-            descricao=proposta.descricao,
-            objetivos=proposta.problema_resolver,
-            impacto_esperado=proposta.relevancia_social,
-            proposta_origem=proposta,
-            data_inicio=timezone.now().date()
+        # Checagem barata antes de enfileirar; a tarefa confere de novo
+        if not pendente(proposta.pk):
+            motivo = motivos_para_ignorar([proposta.pk], [])[proposta.pk]
+            return Response(
+                {'message': motivo}, status=status.HTTP_409_CONFLICT
+            )
+        # O projeto é criado pela tarefa (resultado.resultados[].projeto_id)
+        return self.enfileirar_aprovacao(request, [proposta.pk])
+
+    def enfileirar_aprovacao(self, request, ids):
+        tarefa = tarefas.enfileirar(
+            'aprovar_propostas', {'ids': ids}, usuario=request.user
+        )
+        return Response(
+            {
+                'message': 'Aprovação enfileirada',
+                'tarefa': TarefaSerializer(tarefa).data,
+            },
+            status=status.HTTP_202_ACCEPTED,
+            headers={
+                'Location': reverse(
+                    'tarefas-detail', args=[tarefa.pk], request=request
+                ),
+            }
         )
-
-        return Response({
-            'message': 'Proposta aprovada e projeto criado com sucesso',
-            'projeto_id': projeto.id
-        })
 
     @action(detail=True, methods=['post'], permission_classes=[IsCoordenador])
     def rejeitar(self, request, pk=None):
         proposta = self.get_object()
-        proposta.status = 'rejeitada'
-        proposta.save()
+        [resultado] = rejeitar_propostas([proposta.pk])
+        if resultado['resultado'] == 'ignorada':
+            return Response(
+                {'message': resultado['motivo']},
+                status=status.HTTP_409_CONFLICT
+            )
         return Response({'message': 'Proposta rejeitada'})
 
+    @action(detail=False, methods=['post'], url_path='aprovar-lote',
+            permission_classes=[IsCoordenador])
+    def aprovar_lote(self, request):
+        lote = LoteSerializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+        return self.enfileirar_aprovacao(
+            request, list(dict.fromkeys(lote.validated_data['ids']))
+        )
+
+    @action(detail=False, methods=['post'], url_path='rejeitar-lote',
+            permission_classes=[IsCoordenador])
+    def rejeitar_lote(self, request):
+        lote = LoteSerializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+        return Response(
+            {'resultados': rejeitar_propostas(lote.validated_data['ids'])}
+        )
+
 
 # Atualizar ProjetoViewSet
-class ProjetoViewSet(viewsets.ModelViewSet):
+class ProjetoViewSet(LeituraRapidaMixin, SelecaoDeCamposMixin,
+                     RequisicaoCondicionalMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Projeto.objects.all().order_by('-data_inicio')
+    queryset = Projeto.objects.select_related(
+        'professor_responsavel', 'resumo'
+    ).order_by('-data_inicio')
+    ordenacao_cursor = ('-data_inicio', '-id')
+    # O progresso entra no ETag da listagem (validadores)
+    colunas_obrigatorias = (
+        'data_atualizacao', *ProjetoListaRapida.colunas_progresso
+    )
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return ProjetoListSerializer
+            return ProjetoListaRapida
         return ProjetoSerializer
 
+    # ?include=relatorios,atividades,entregas no detalhe (core.inclusoes)
+    def inclusoes(self):
+        if self.action != 'retrieve':
+            return []
+        return inclusoes_pedidas(self.request)
+
+    def get_queryset(self):
+        return incluir(super().get_queryset(), self.inclusoes())
+
+    def representar(self, instance):
+        dados = super().representar(instance)
+        dados.update(serializar_inclusoes(
+            instance, self.inclusoes(), self.request
+        ))
+        return dados
+
+    def validadores(self, objetos, *extras):
+        if self.action == 'list':
+            # Atividades e relatórios mudam o progresso da listagem sem
+            # tocar em data_atualizacao do projeto
+            extras += tuple(
+                ':'.join(
+                    str(projeto[coluna])
+                    for coluna in ProjetoListaRapida.colunas_progresso
+                )
+                for projeto in objetos
+            )
+        # Mudanças nos filhos incluídos também trocam o ETag
+        nomes = self.inclusoes()
+        for projeto in objetos:
+            extras += tuple(
+                f'{nome}={getattr(projeto, f"total_{nome}")}'
+                for nome in nomes
+            )
+        objetos = [
+            *objetos, *(
+                filho for projeto in objetos
+                for filho in filhos_incluidos(projeto, nomes)
+            )
+        ]
+        return super().validadores(objetos, *extras)
+
     @action(detail=True, methods=['get'])
     def relatorios(self, request, pk=None):
-        projeto = self.get_object()
-        relatorios = projeto.relatorios.all()
-        serializer = RelatorioSerializer(relatorios, many=True)
-        return Response(serializer.data)
+        """Relatórios do projeto; filtros: publico, desde, ate."""
+        return self.listar_filhos(request, 'relatorios')
 
     @action(detail=True, methods=['get'])
     def atividades(self, request, pk=None):
+        """Atividades do projeto; filtros: status, desde, ate."""
+        return self.listar_filhos(request, 'atividades')
+
+    @action(detail=True, methods=['get'])
+    def entregas(self, request, pk=None):
+        """Entregas do projeto; filtros: desde, ate."""
+        return self.listar_filhos(request, 'entregas')
+
+    def listar_filhos(self, request, nome):
+        inclusao = INCLUSOES[nome]
+        filtro = FiltroFilhosSerializer(
+            data=request.query_params, context={'inclusao': inclusao}
+        )
+        filtro.is_valid(raise_exception=True)
         projeto = self.get_object()
-        atividades = projeto.atividades.all()
-        serializer = AtividadeSerializer(atividades, many=True)
-        return Response(serializer.data)
+        queryset = inclusao.filtrar(
+            getattr(projeto, nome).all(), **filtro.validated_data
+        )
+        # O paginador em modo cursor lê a ordenação da view
+        self.ordenacao_cursor = inclusao.ordenacao
+        pagina = self.paginate_queryset(queryset)
+        serializer = inclusao.serializer(
+            pagina, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
 
 
 # Views públicas (sem autenticação necessária)
-class ProjetoPublicoViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjetoPublicoViewSet(LeituraRapidaMixin, SelecaoDeCamposMixin,
+                            CachePublicoMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
-    queryset = Projeto.objects.filter(
+    cache_namespace = 'projetos'
+    usar_replica = True
+    queryset = Projeto.objects.select_related(
+        'professor_responsavel', 'resumo'
+    ).filter(
         status='em_execucao'
     ).order_by('-data_inicio')
-    serializer_class = ProjetoListSerializer
+    ordenacao_cursor = ('-data_inicio', '-id')
+    serializer_class = ProjetoPublicoListSerializer
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProjetoPublicoListaRapida
+        return ProjetoPublicoListSerializer
 
     @action(detail=True, methods=['get'])
     def detalhes(self, request, pk=None):
+        return self.responder_com_cache(request, self.gerar_detalhes, pk=pk)
+
+    def gerar_detalhes(self, request, pk=None):
         projeto = self.get_object()
         serializer = ProjetoSerializer(projeto)
         return Response(serializer.data)
 
 
-class RelatorioPublicoViewSet(viewsets.ReadOnlyModelViewSet):
+class RelatorioPublicoViewSet(LeituraRapidaMixin, SelecaoDeCamposMixin,
+                              BuscaTextualMixin, CachePublicoMixin,
+                              viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
-    queryset = Relatorio.objects.filter(
+    cache_namespace = 'relatorios'
+    usar_replica = True
+    busca_indice = 'relatorio'
+    queryset = Relatorio.objects.select_related('projeto').filter(
         publico=True
     ).order_by('-data_relatorio')
+    ordenacao_cursor = ('-data_relatorio', '-id')
     serializer_class = RelatorioPublicoSerializer
 
+    def get_serializer_class(self):
+        if self.action != 'list':
+            return RelatorioPublicoSerializer
+        if self.termo_de_busca():
+            return RelatorioPublicoBuscaRapido
+        return RelatorioPublicoRapido
+
 
-class RelatorioViewSet(viewsets.ModelViewSet):
-    queryset = Relatorio.objects.all()
+class RelatorioViewSet(SelecaoDeCamposMixin, RequisicaoCondicionalMixin,
+                       viewsets.ModelViewSet):
+    queryset = Relatorio.objects.select_related('projeto')
     serializer_class = RelatorioSerializer
 
 
-class EntregaViewSet(viewsets.ModelViewSet):
-    queryset = Entrega.objects.all()
+class EntregaViewSet(SelecaoDeCamposMixin, RequisicaoCondicionalMixin,
+                     viewsets.ModelViewSet):
+    queryset = Entrega.objects.select_related('projeto')
     serializer_class = EntregaSerializer
 
 
-class AtividadeViewSet(viewsets.ModelViewSet):
-    queryset = Atividade.objects.all()
+class AtividadeViewSet(SelecaoDeCamposMixin, RequisicaoCondicionalMixin,
+                       viewsets.ModelViewSet):
+    queryset = Atividade.objects.select_related('projeto')
     serializer_class = AtividadeSerializer
+
+
+class EnvioViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                   mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                   viewsets.GenericViewSet):
+    """Envio retomável em pedaços; o protocolo está em core.envios."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = EnvioParcialSerializer
+
+    def get_queryset(self):
+        return EnvioParcial.objects.filter(
+            usuario=self.request.user
+        ).order_by('-data_criacao')
+
+    def perform_create(self, serializer):
+        dados = serializer.validated_data
+        objeto = arquivos.buscar(dados['alvo'], dados['objeto_id'])
+        if objeto is None:
+            raise ValidationError({'objeto_id': 'Objeto não encontrado.'})
+        if not arquivos.pode_alterar(self.request.user, objeto):
+            raise PermissionDenied(
+                'Você não pode alterar o arquivo deste objeto.'
+            )
+        envios.iniciar(serializer.save(usuario=self.request.user))
+
+    def retrieve(self, request, *args, **kwargs):
+        # Também atende HEAD: o cliente lê Upload-Offset para retomar
+        envio = self.get_object()
+        return self.responder(envio)
+
+    def partial_update(self, request, *args, **kwargs):
+        envio = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'Upload-Offset': 'Informe os bytes já aceitos.'}
+            )
+        checksum = envios.ler_checksum(request.headers.get('Upload-Checksum'))
+        # O pedaço é lido de request.stream em blocos, nunca inteiro
+        tamanho = int(request.META.get('CONTENT_LENGTH') or 0)
+        try:
+            montagem = envios.receber_pedaco(
+                envio, request.stream, offset, tamanho, checksum
+            )
+        except envios.Conflito as erro:
+            return self.responder(
+                envio, {'message': str(erro)}, status.HTTP_409_CONFLICT
+            )
+        if montagem is not None:
+            # Último pedaço: a montagem roda em segundo plano
+            return self.responder(envio, {
+                **self.get_serializer(envio).data, 'tarefa_id': montagem.pk,
+            }, status.HTTP_202_ACCEPTED)
+        return self.responder(envio)
+
+    def perform_destroy(self, instance):
+        envios.cancelar(instance)
+
+    def responder(self, envio, dados=None, codigo=status.HTTP_200_OK):
+        if dados is None:
+            dados = self.get_serializer(envio).data
+        return Response(dados, status=codigo, headers={
+            'Upload-Offset': str(envio.recebido),
+            'Upload-Length': str(envio.tamanho),
+            'Cache-Control': 'no-store',
+        })
+
+
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Estado das tarefas em segundo plano; filtros ``?status=`` e
+    ``?tipo=``. Cada usuário vê as que pediu; coordenadores, todas."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TarefaSerializer
+
+    def get_queryset(self):
+        queryset = Tarefa.objects.order_by('-data_criacao', '-id')
+        if self.request.user.tipo_usuario != 'coordenador':
+            queryset = queryset.filter(usuario=self.request.user)
+        for campo in ('status', 'tipo'):
+            valor = self.request.query_params.get(campo)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        return queryset
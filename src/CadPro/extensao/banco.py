@@ -0,0 +1,179 @@
+"""Perfil do banco de dados montado a partir de variáveis de ambiente.
+
+``CADPRO_DB=sqlite`` (padrão) usa o arquivo ``db.sqlite3`` ajustado para
+escrita concorrente: WAL, ``synchronous=NORMAL``, espera pelo lock em vez
+de falhar com "database is locked", mmap e cache de páginas maior.
+``CADPRO_DB=postgres`` é o perfil de produção. Nos dois, cada requisição
+abre e fecha a sua conexão, como no padrão do Django; conexões persistentes
+são opt-in por ``CADPRO_DB_CONN_MAX_AGE`` e, quando ligadas, verificadas
+antes de cada reuso (``CONN_HEALTH_CHECKS``).
+
+Variáveis:
+
+* ``CADPRO_DB_NAME`` (arquivo do SQLite ou nome do banco no PostgreSQL),
+  ``CADPRO_DB_CONN_MAX_AGE`` (segundos; padrão 0, fecha a cada
+  requisição);
+* SQLite: ``CADPRO_SQLITE_TIMEOUT`` (segundos), ``CADPRO_SQLITE_MMAP``
+  (bytes), ``CADPRO_SQLITE_CACHE`` (``PRAGMA cache_size``);
+* PostgreSQL: ``CADPRO_DB_USER``, ``CADPRO_DB_PASSWORD``,
+  ``CADPRO_DB_HOST``, ``CADPRO_DB_PORT``, ``CADPRO_DB_CONNECT_TIMEOUT`` e
+  ``CADPRO_DB_PGBOUNCER=1`` atrás de um PgBouncer em modo transaction;
+* ``CADPRO_DB_REPLICAS``: réplicas de leitura separadas por vírgula
+  (arquivos no SQLite, ``host[:porta]`` no PostgreSQL), com os aliases
+  ``replica_1``, ``replica_2``... usados por ``core.roteamento``.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+PERFIS = ('sqlite', 'postgres')
+
+# Executados em cada conexão nova (OPTIONS['init_command'])
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negativo = tamanho em KiB, não em páginas
+    'cache_size': -64 * 1024,
+}
+
+
+def inteiro(ambiente, nome, padrao):
+    valor = ambiente.get(nome)
+    if valor in (None, ''):
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        raise ImproperlyConfigured(f'{nome} deve ser um número inteiro.')
+
+
+def conexao(ambiente):
+    """Conexões persistentes só se pedidas, com health check no reuso.
+
+    Uma conexão parada por mais de ``CONN_MAX_AGE`` pode ter sido derrubada
+    pelo servidor ou por um PgBouncer; sem o health check a primeira
+    consulta da requisição seguinte falharia.
+    """
+    return {
+        'CONN_MAX_AGE': inteiro(ambiente, 'CADPRO_DB_CONN_MAX_AGE', 0),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def sqlite(ambiente, base_dir):
+    pragmas = {
+        **PRAGMAS_SQLITE,
+        'mmap_size': inteiro(
+            ambiente, 'CADPRO_SQLITE_MMAP', PRAGMAS_SQLITE['mmap_size']
+        ),
+        'cache_size': inteiro(
+            ambiente, 'CADPRO_SQLITE_CACHE', PRAGMAS_SQLITE['cache_size']
+        ),
+    }
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ambiente.get('CADPRO_DB_NAME') or base_dir / 'db.sqlite3',
+        **conexao(ambiente),
+        'OPTIONS': {
+            # busy_timeout, em segundos
+            'timeout': inteiro(ambiente, 'CADPRO_SQLITE_TIMEOUT', 20),
+            # As transações de escrita (aprovação em lote, semeadura) pegam
+            # o lock no BEGIN e esperam o timeout, em vez de falhar ao
+            # promover um lock de leitura no meio da transação
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(
+                f'PRAGMA {nome}={valor}' for nome, valor in pragmas.items()
+            ),
+        },
+    }
+
+
+def postgres(ambiente):
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': ambiente.get('CADPRO_DB_NAME', 'cadpro'),
+        'USER': ambiente.get('CADPRO_DB_USER', 'cadpro'),
+        'PASSWORD': ambiente.get('CADPRO_DB_PASSWORD', ''),
+        'HOST': ambiente.get('CADPRO_DB_HOST', 'localhost'),
+        'PORT': ambiente.get('CADPRO_DB_PORT', '5432'),
+        **conexao(ambiente),
+        # Exportação e feeds percorrem o queryset com .iterator(), que no
+        # PostgreSQL vira cursor do lado do servidor. O PgBouncer em modo
+        # transaction não os suporta: CADPRO_DB_PGBOUNCER=1 desliga.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            ambiente.get('CADPRO_DB_PGBOUNCER') == '1'
+        ),
+        'OPTIONS': {
+            'connect_timeout': inteiro(
+                ambiente, 'CADPRO_DB_CONNECT_TIMEOUT', 5
+            ),
+            'application_name': 'cadpro',
+        },
+    }
+
+
+def configurar(ambiente, base_dir):
+    """``DATABASES['default']`` para o perfil escolhido em ``CADPRO_DB``."""
+    perfil = ambiente.get('CADPRO_DB', 'sqlite')
+    if perfil == 'sqlite':
+        return sqlite(ambiente, base_dir)
+    if perfil == 'postgres':
+        return postgres(ambiente)
+    raise ImproperlyConfigured(
+        f'CADPRO_DB inválido: {perfil}. Use {" ou ".join(PERFIS)}.'
+    )
+
+
+def enderecos_replicas(ambiente):
+    return [
+        endereco.strip()
+        for endereco in ambiente.get('CADPRO_DB_REPLICAS', '').split(',')
+        if endereco.strip()
+    ]
+
+
+def aliases_replicas(ambiente):
+    return [
+        f'replica_{numero}'
+        for numero in range(1, len(enderecos_replicas(ambiente)) + 1)
+    ]
+
+
+def replica(principal, endereco):
+    """Configuração do primário apontando para ``endereco``."""
+    config = {**principal, 'OPTIONS': {**principal['OPTIONS']}}
+    if principal['ENGINE'] == 'django.db.backends.sqlite3':
+        config['NAME'] = f'file:{endereco}?mode=ro'
+        # Conexão só de leitura: sem BEGIN IMMEDIATE nem troca de journal
+        config['OPTIONS'].pop('transaction_mode', None)
+        config['OPTIONS']['init_command'] = ';'.join(
+            comando for comando in config['OPTIONS']['init_command'].split(';')
+            if 'journal_mode' not in comando
+        )
+    else:
+        host, _, porta = endereco.partition(':')
+        config['HOST'] = host
+        config['PORT'] = porta or principal['PORT']
+    return config
+
+
+def bancos(ambiente, base_dir):
+    """``DATABASES`` completo: primário e réplicas.
+
+    As réplicas de ``CADPRO_DB_REPLICAS`` espelham o primário nos testes.
+    No SQLite há ainda o alias ``replica``, o próprio arquivo aberto só
+    para leitura; ele não recebe tráfego a menos que entre em
+    ``REPLICAS['ALIASES']``, e nos testes vira um segundo banco em memória,
+    a réplica substituta de ``RoteamentoDeReplicasTests``.
+    """
+    principal = configurar(ambiente, base_dir)
+    databases = {'default': principal}
+    for alias, endereco in zip(
+        aliases_replicas(ambiente), enderecos_replicas(ambiente)
+    ):
+        databases[alias] = {
+            **replica(principal, endereco), 'TEST': {'MIRROR': 'default'},
+        }
+    if principal['ENGINE'] == 'django.db.backends.sqlite3':
+        databases['replica'] = replica(principal, principal['NAME'])
+    return databases
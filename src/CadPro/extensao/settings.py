@@ -1,5 +1,9 @@
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from . import banco
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +36,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
+    'core.middleware.CompressaoMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,22 +48,159 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 # Configurar Django REST Framework para usar autenticação
+# JSON com orjson (core.renderers) e MessagePack negociado por Accept /
+# Content-Type quando a biblioteca msgpack estiver instalada
+MSGPACK = (
+    os.environ.get('CADPRO_MSGPACK', '1') == '1' and
+    find_spec('msgpack') is not None
+)
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.OrjsonRenderer',
+        *(['core.renderers.MessagePackRenderer'] if MSGPACK else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.OrjsonParser',
+        *(['core.renderers.MessagePackParser'] if MSGPACK else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Sem BasicAuthentication, que era padrão do DRF: ela calcularia o hash
+    # da senha a cada requisição, fora dos limites de core.throttling. Os
+    # clientes usam o token de /api/auth/login/.
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CacheTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',  # Mudar para exigir autenticação
+        'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.PaginacaoPadrao',
+    'PAGE_SIZE': 20,
+    # Tentativas de login/registro (core.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'autenticacao': os.environ.get('CADPRO_LIMITE_AUTENTICACAO', '60/min'),
+        'login_usuario': os.environ.get('CADPRO_LIMITE_LOGIN', '10/min'),
+    },
+}
+
+# Login por usuário e senha com o hash no pool de core.senhas
+AUTHENTICATION_BACKENDS = ['core.authentication.SenhaEmProcessoBackend']
+
+# Hash de senhas (core.senhas): PROCESSOS processos por worker (0 = na
+# própria thread), no máximo CONCORRENCIA hashes ao mesmo tempo; quem
+# espera mais que ESPERA_MAXIMA segundos recebe 503.
+SENHAS = {
+    'PROCESSOS': int(os.environ.get('CADPRO_SENHAS_PROCESSOS', 2)),
+    'CONCORRENCIA': int(os.environ.get('CADPRO_SENHAS_CONCORRENCIA', 2)),
+    'ESPERA_MAXIMA': float(os.environ.get('CADPRO_SENHAS_ESPERA', 5)),
+}
+
+# Cache das buscas token -> usuário (core.authentication). Sem ALIAS o
+# cache é local ao processo; com vários workers use um alias compartilhado.
+AUTH_TOKEN_CACHE = {
+    'MAX_ENTRADAS': int(os.environ.get('CADPRO_AUTH_CACHE_MAX', 10000)),
+    'TTL': int(os.environ.get('CADPRO_AUTH_CACHE_TTL', 60)),
+    'ALIAS': os.environ.get('CADPRO_AUTH_CACHE_ALIAS') or None,
+}
+
+# Compressão das respostas (core.middleware.CompressaoMiddleware): Brotli
+# quando o cliente aceita e o pacote está instalado, senão gzip.
+COMPRESSAO = {
+    'MINIMO_BYTES': int(os.environ.get('CADPRO_COMPRESSAO_MINIMO', 1024)),
+    'ALGORITMOS': os.environ.get('CADPRO_COMPRESSAO', 'br,gzip').split(','),
+    'NIVEL_BROTLI': int(os.environ.get('CADPRO_NIVEL_BROTLI', 5)),
+}
+
+# Arquivos enviados. O padrão mantém o comportamento anterior (caminhos
+# relativos à pasta do projeto).
+MEDIA_ROOT = Path(os.environ.get('CADPRO_MEDIA_ROOT', BASE_DIR))
+MEDIA_URL = 'media/'
+
+# Envios retomáveis em pedaços (core.envios). Com PASTA no mesmo sistema
+# de arquivos do MEDIA_ROOT, a montagem final é um rename atômico.
+ENVIOS = {
+    'PASTA': Path(os.environ.get(
+        'CADPRO_ENVIOS_PASTA', BASE_DIR / 'envios_parciais'
+    )),
+    'TAMANHO_MAXIMO': int(
+        os.environ.get('CADPRO_ENVIO_MAXIMO', 4 * 1024 ** 3)
+    ),
+    'TAMANHO_MAXIMO_PEDACO': int(
+        os.environ.get('CADPRO_ENVIO_PEDACO', 16 * 1024 ** 2)
+    ),
+    'EXPIRACAO_HORAS': int(os.environ.get('CADPRO_ENVIO_EXPIRACAO', 24)),
+}
+
+# Download dos arquivos (core.downloads). SENDFILE vazio: o Django
+# transmite; 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache) entregam
+# a transferência ao proxy depois da checagem de permissão.
+ARQUIVOS = {
+    'SENDFILE': os.environ.get('CADPRO_SENDFILE') or None,
+    'PREFIXO_INTERNO': os.environ.get(
+        'CADPRO_SENDFILE_PREFIXO', '/arquivos-protegidos/'
+    ),
+}
+
+# Fila de tarefas em segundo plano (core.tarefas), executada por
+# "manage.py processar_tarefas". Falhas esperam ESPERA_BASE * 2^(n-1)
+# segundos (até ESPERA_MAXIMA) antes da próxima tentativa; tarefas
+# reservadas há mais de PRAZO segundos voltam para a fila.
+TAREFAS = {
+    'CONCORRENCIA': int(os.environ.get('CADPRO_TAREFAS_CONCORRENCIA', 2)),
+    'INTERVALO_SEGUNDOS': float(
+        os.environ.get('CADPRO_TAREFAS_INTERVALO', 1)
+    ),
+    'MAX_TENTATIVAS': int(os.environ.get('CADPRO_TAREFAS_TENTATIVAS', 5)),
+    'ESPERA_BASE_SEGUNDOS': 10,
+    'ESPERA_MAXIMA_SEGUNDOS': 3600,
+    'PRAZO_SEGUNDOS': int(os.environ.get('CADPRO_TAREFAS_PRAZO', 600)),
+}
+
+# E-mails das tarefas (core.notificacoes). O padrão só escreve no console;
+# em produção use django.core.mail.backends.smtp.EmailBackend.
+EMAIL_BACKEND = os.environ.get(
+    'CADPRO_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+EMAIL_HOST = os.environ.get('CADPRO_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('CADPRO_EMAIL_PORTA', 25))
+EMAIL_HOST_USER = os.environ.get('CADPRO_EMAIL_USUARIO', '')
+EMAIL_HOST_PASSWORD = os.environ.get('CADPRO_EMAIL_SENHA', '')
+EMAIL_USE_TLS = os.environ.get('CADPRO_EMAIL_TLS') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get(
+    'CADPRO_EMAIL_REMETENTE', 'nao-responda@cadpro.local'
+)
+
+# Métricas por rota (/api/metrics/) e log de requisições lentas. O scrape
+# envia "Authorization: Bearer <TOKEN>"; sem TOKEN a rota só responde com
+# DEBUG ligado.
+METRICAS = {
+    'LIMITE_LENTO_MS': int(os.environ.get('CADPRO_LIMITE_LENTO_MS', 500)),
+    'TOKEN': os.environ.get('CADPRO_METRICAS_TOKEN') or None,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 LOGIN_URL = '/api/auth/login/'
 LOGOUT_URL = '/api/auth/logout/'
 
-ROOT_URLCONF = 'extensao.urls'
+# CADPRO_ASYNC=1 (só sob ASGI): as leituras mais acessadas usam as views
+# async de core.assincrono. Desligado por padrão; veja lá quando compensa.
+ROOT_URLCONF = (
+    'extensao.urls_asgi' if os.environ.get('CADPRO_ASYNC') == '1'
+    else 'extensao.urls'
+)
 
 TEMPLATES = [
     {
@@ -78,12 +222,39 @@ WSGI_APPLICATION = 'extensao.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# CADPRO_DB=sqlite (padrão, WAL) ou postgres; conexões persistentes só com
+# CADPRO_DB_CONN_MAX_AGE > 0, sempre com CONN_HEALTH_CHECKS. As demais
+# variáveis CADPRO_DB_* estão documentadas em extensao/banco.py.
 
-DATABASES = {
+DATABASES = banco.bancos(os.environ, BASE_DIR)
+
+# Leituras dos viewsets públicos vão para as réplicas (core.roteamento).
+# Quem escreve fica no primário por JANELA_SEGUNDOS (read-your-writes).
+DATABASE_ROUTERS = ['core.roteamento.RoteadorReplicas']
+REPLICAS = {
+    'ALIASES': banco.aliases_replicas(os.environ),
+    'JANELA_SEGUNDOS': int(os.environ.get('CADPRO_REPLICA_JANELA', 10)),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# O alias 'publico' guarda as respostas das views públicas. Em produção,
+# aponte CADPRO_CACHE_BACKEND para um backend compartilhado entre processos
+# (ex.: django.core.cache.backends.redis.RedisCache ou FileBasedCache).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'publico': {
+        'BACKEND': os.environ.get(
+            'CADPRO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CADPRO_CACHE_LOCATION', 'cadpro-publico'),
+        'TIMEOUT': int(os.environ.get('CADPRO_CACHE_TIMEOUT', 3600)),
+    },
 }
 
 
@@ -124,11 +295,3 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-# Django REST Framework
-REST_FRAMEWORK = {
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.AllowAny',
-    ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
-}
\ No newline at end of file
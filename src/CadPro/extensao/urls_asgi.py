@@ -0,0 +1,12 @@
+"""URLconf do ASGI: as rotas de ``extensao.urls`` com as views nativas
+async de ``core.assincrono`` na frente das views do DRF."""
+from django.urls import include, path
+
+from core.assincrono import rotas
+
+from . import urls
+
+urlpatterns = [
+    path('api/', include(rotas())),
+    *urls.urlpatterns,
+]